@@ -1,10 +1,17 @@
 import random
 from typing import List, Tuple, Union
 
+import pandas as pd
 import streamlit as st
 from langchain_core.messages import AIMessage, HumanMessage
+import services.answer_cache as answer_cache
 import services.chat_service as chat_svc
 import services.opensearch_service as os_svc
+import services.sql_executor as sql_executor
+import services.tracing as tracing
+
+# SQL 결과 표에서 한 페이지에 보여줄 행 수입니다.
+sql_result_page_size = 20
 
 
 def set_page_config() -> None:
@@ -26,10 +33,11 @@ def init_chat_data() -> None:
 
     st.session_state.messages = []
     st.session_state["langchain_messages"] = []
+    st.session_state.pop("langchain_summary", None)
     st.session_state.messages.append(init_message)
 
 
-def get_sidebar_params() -> Tuple[float, float, int, int, int, str]:
+def get_sidebar_params() -> Tuple[float, float, int, int, int, str, bool]:
     """
     Get inference parameters from the sidebar.
     """
@@ -97,7 +105,19 @@ def get_sidebar_params() -> Tuple[float, float, int, int, int, str]:
                     key=f"{st.session_state['widget_key']}_Memory_Window",
                 )
 
-    return temperature, top_p, top_k, max_tokens, memory_window, model_id
+        use_answer_cache = st.toggle(
+            "Semantic Answer Cache",
+            value=False,
+            help="Normal / RAG Chat 에서 비슷한 질문의 이전 답변을 재사용합니다.",
+            key=f"{st.session_state['widget_key']}_Answer_Cache",
+        )
+        if use_answer_cache:
+            cache_stats = answer_cache.stats()
+            st.caption(f"Hit rate {cache_stats['hit_rate']:.0%} "
+                       f"({cache_stats['hits']}/{cache_stats['lookups']}) · "
+                       f"saved {cache_stats['saved_latency']:.1f}s")
+
+    return temperature, top_p, top_k, max_tokens, memory_window, model_id, use_answer_cache
 
 
 def set_file_uploader():
@@ -110,7 +130,13 @@ def set_file_uploader():
         btn = st.sidebar.button("Upload to OpenSearch", type="secondary")
         if btn:
             st.session_state.uploader_key += 1
-            os_svc.create_index_from_pdf_file(uploaded_file=uploaded_file)
+            progress_bar = st.sidebar.progress(0.0, text="Uploading...")
+
+            def on_progress(done: int, total: int) -> None:
+                if total:
+                    progress_bar.progress(min(done / total, 1.0), text=f"Uploading... {done}/{total} pages")
+
+            os_svc.create_index_from_pdf_file(uploaded_file=uploaded_file, on_progress=on_progress)
             st.rerun()
 
 
@@ -126,15 +152,58 @@ def set_mode_selector():
     return mode
 
 
+def display_sql_result(result: sql_executor.QueryResult, key: str) -> None:
+    """
+    Display a SQL result as a paginated table.
+    """
+    if result.error or not result.columns:
+        return
+    pages = max(1, -(-result.row_count // sql_result_page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, value=1, step=1,
+                               key=f"sql_result_page_{key}")
+    st.dataframe(pd.DataFrame(result.page(page - 1, sql_result_page_size), columns=result.columns),
+                 use_container_width=True, hide_index=True)
+    if result.truncated:
+        st.caption(f"Showing the first {result.row_count} rows; the query returned more.")
+
+
+def display_latency_metrics() -> None:
+    """
+    Display the stage timings of the last turn and p50/p95 over recent turns in the sidebar.
+    """
+    if not st.sidebar.toggle("Latency Metrics", value=False, help="턴마다 단계별 실행 시간과 토큰 사용량을 보여줍니다.",
+                             key=f"{st.session_state['widget_key']}_Latency_Metrics"):
+        return
+    traces = tracing.recent_traces()
+    if not traces:
+        st.sidebar.caption("No traced turns yet.")
+        return
+    last = traces[-1]
+    lines = [f"**Last turn** · {last.mode} · {last.duration * 1000:.0f} ms · "
+             f"{last.input_tokens} in / {last.output_tokens} out tokens", "",
+             "| Stage | Start | ms |", "| --- | ---: | ---: |"]
+    for span in sorted(last.spans, key=lambda span: span.start):
+        ttft = f" (ttft {span.attributes['ttft_ms']:.0f})" if "ttft_ms" in span.attributes else ""
+        lines.append(f"| {span.name} | {span.start * 1000:.0f} | {span.duration * 1000:.0f}{ttft} |")
+    lines += ["", f"**Last {len(traces)} turns**", "", "| Stage | n | p50 ms | p95 ms |", "| --- | ---: | ---: | ---: |"]
+    for name, stats in tracing.aggregates(traces).items():
+        lines.append(f"| {name} | {stats['count']} | {stats['p50_ms']:.0f} | {stats['p95_ms']:.0f} |")
+    st.sidebar.markdown("\n".join(lines))
+
+
 def display_history_messages() -> None:
     """
     Display chat messages and uploaded images in the Streamlit app.
     """
-    for message in st.session_state.messages:
+    for index, message in enumerate(st.session_state.messages):
         message_role = message["role"]
         with st.chat_message(message_role):
             message_content = message["content"]
             st.markdown(message_content)
+            if "sql_result" in message:
+                display_sql_result(message["sql_result"], key=str(index))
 
 
 def main() -> None:
@@ -153,7 +222,7 @@ def main() -> None:
         st.session_state["widget_key"] = str(random.randint(1, 1000000))
 
     # Set/Get sidebar params
-    temperature, top_p, top_k, max_tokens, memory_window, model_id = get_sidebar_params()
+    temperature, top_p, top_k, max_tokens, memory_window, model_id, use_answer_cache = get_sidebar_params()
     model_kwargs = {
         "temperature": temperature,
         "top_p": top_p,
@@ -173,6 +242,9 @@ def main() -> None:
     # Set new chat button
     st.sidebar.button("Start New Chat", on_click=init_chat_data, type="primary")
 
+    # Display latency metrics of recent turns
+    display_latency_metrics()
+
     # Display all history messages
     display_history_messages()
 
@@ -184,11 +256,14 @@ def main() -> None:
 
     # Generate a new response if last message is not from assistant
     if st.session_state.messages[-1]["role"] != "assistant":
+        query_result = None
+
         # Get response
         with st.chat_message("assistant"):
             if "Normal Chat" in mode:
                 response = chat_svc.get_chat_response(model_id=model_id, content=content,
-                                                      model_kwargs=model_kwargs)
+                                                      model_kwargs=model_kwargs,
+                                                      use_answer_cache=use_answer_cache)
 
             if "History Chat" in mode:
                 response = chat_svc.get_conversation_chat_response(model_id=model_id, content=content,
@@ -196,20 +271,23 @@ def main() -> None:
                                                                    model_kwargs=model_kwargs)
             elif "RAG Chat" in mode:
                 response, context = chat_svc.get_rag_chat_response(model_id=model_id, content=content,
-                                                                   model_kwargs=model_kwargs)
+                                                                   model_kwargs=model_kwargs,
+                                                                   use_answer_cache=use_answer_cache)
                 context = ":memo: ***Context*** :memo: \n\n" + context
                 response = response + "\n\n" + context
 
             elif "SQL Chat" in mode:
-                answer, sql_query, sql_result = chat_svc.get_sql_chat_response(model_id=model_id,
-                                                                               content=content,
-                                                                               model_kwargs=model_kwargs)
+                answer, sql_query, query_result = chat_svc.get_sql_chat_response(model_id=model_id,
+                                                                                 content=content,
+                                                                                 model_kwargs=model_kwargs)
                 sql_query = ":memo: ***Query*** :memo: \n ``` \n " + sql_query + "\n ```"
-                sql_result = ":memo: ***Result*** :memo: \n ``` \n " + sql_result + "\n ```"
+                sql_result = ":memo: ***Result*** :memo: " + query_result.describe()
                 response = answer + "\n\n" + sql_query + "\n\n" + sql_result
 
         # Store LLM generated responses
         message = {"role": "assistant", "content": response}
+        if query_result is not None:
+            message["sql_result"] = query_result
         st.session_state.messages.append(message)
         st.rerun()
 
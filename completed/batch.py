@@ -0,0 +1,93 @@
+"""
+Headless batch runner: answers a JSONL file of questions through chat_service
+without Streamlit, with bounded concurrency, and writes answers, retrieved
+context, SQL and timings as JSON lines.
+
+Each input line is {"question": ..., "id": ..., "mode": ..., "conversation": ...};
+only "question" is required, "mode" defaults to --mode.
+
+Run from the `completed` directory:
+    python batch.py questions.jsonl --mode rag --concurrency 8 --output results.jsonl
+    python batch.py questions.jsonl --mode normal --stub-bedrock --vector-store local
+"""
+import argparse
+import contextlib
+import statistics
+import sys
+import time
+
+import services.async_runner as async_runner
+import services.headless as headless
+import services.stub_bedrock as stub_bedrock
+import services.vector_store as vector_store
+
+MODEL_MAP = {
+    "sonnet": "anthropic.claude-3-sonnet-20240229-v1:0",
+    "haiku": "anthropic.claude-3-haiku-20240307-v1:0",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of questions, '-' for stdin")
+    parser.add_argument("--mode", choices=headless.MODES, default="normal")
+    parser.add_argument("--model", default="sonnet", help="sonnet, haiku or a Bedrock model id")
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--max-tokens", type=int, default=1024)
+    parser.add_argument("--memory-window", type=int, default=headless.headless_memory_window)
+    parser.add_argument("--concurrency", type=int, default=headless.headless_concurrency)
+    parser.add_argument("--answer-cache", action="store_true", help="use the semantic answer cache")
+    parser.add_argument("--output", default="-", help="results JSONL file (appended), '-' for stdout")
+    parser.add_argument("--quiet", action="store_true", help="no per-question progress on stderr")
+    parser.add_argument("--vector-store", choices=["opensearch", "local"], default=vector_store.vector_store_backend)
+    parser.add_argument("--stub-bedrock", action="store_true", help="answer from the local Bedrock stub")
+    parser.add_argument("--stub-latency", type=float, default=0.0)
+    parser.add_argument("--stub-token-latency", type=float, default=0.0)
+    parser.add_argument("--stub-sql", help="SQL the stub returns for SQL generation prompts")
+    args = parser.parse_args()
+
+    # 1. 질문을 읽습니다.
+    with (contextlib.nullcontext(sys.stdin) if args.input == "-" else open(args.input, encoding="utf-8")) as f:
+        requests = headless.read_requests(f, args.mode)
+
+    # 2. backend 를 설정합니다.
+    # - ChatBedrock 의 비동기 호출은 이벤트 루프의 스레드 풀에서 실행되므로 동시 실행 수보다 넉넉하게 둡니다.
+    vector_store.vector_store_backend = args.vector_store
+    async_runner.async_executor_workers = max(async_runner.async_executor_workers, args.concurrency * 2)
+    server = None
+    if args.stub_bedrock:
+        server = stub_bedrock.StubBedrockServer(latency=args.stub_latency, token_latency=args.stub_token_latency,
+                                                sql_answer=args.stub_sql).start()
+        stub_bedrock.use_stub_bedrock(server)
+
+    # 3. 결과를 JSONL 로 쓰고, 진행 상황은 stderr 에 출력합니다.
+    # - 결과를 stdout 으로 쓸 때는 서비스의 print 출력이 섞이지 않도록 stderr 로 돌립니다.
+    sinks = [headless.JsonlSink(sys.stdout if args.output == "-" else args.output)]
+    if not args.quiet:
+        sinks.append(headless.ConsoleSink(sys.stderr))
+    chat = headless.HeadlessChat(model_id=MODEL_MAP.get(args.model, args.model),
+                                 model_kwargs={"temperature": args.temperature, "max_tokens": args.max_tokens},
+                                 sinks=sinks, concurrency=args.concurrency, memory_window=args.memory_window,
+                                 use_answer_cache=args.answer_cache)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stderr) if args.output == "-" else contextlib.nullcontext():
+            results = chat.run_batch(requests)
+    finally:
+        chat.close()
+        if server is not None:
+            server.stop()
+    elapsed = time.perf_counter() - start
+
+    # 4. 전체 요약을 출력합니다.
+    latencies = sorted(result.latency_ms for result in results)
+    errors = sum(result.error is not None for result in results)
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, round(0.95 * (len(latencies) - 1)))]
+        print(f"{len(results)} questions in {elapsed:.1f} s ({len(results) / elapsed:.1f}/s), {errors} errors | "
+              f"latency p50 {statistics.median(latencies):.0f} ms, p95 {p95:.0f} ms", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.outputs import Generation, LLMResult
+
+import services.bedrock_service as bedrock_svc
+
+# 시맨틱 답변 캐시 설정입니다. (opt-in)
+# - 질문 임베딩의 코사인 유사도가 answer_cache_threshold 이상인 이전 질문이 있으면 그 답변을 재사용합니다.
+# - 같은 모델, 같은 답변 파라미터(model_kwargs), RAG 의 경우 같은 인덱스 generation 안에서만 재사용합니다.
+answer_cache_enabled = False
+answer_cache_threshold = 0.95
+answer_cache_ttl_seconds = 60 * 60
+answer_cache_max_entries = 512
+
+# 답변을 다시 보여줄 때 토큰 사이에 기다리는 시간입니다. 0 이면 기다리지 않습니다.
+answer_cache_replay_delay = 0.0
+
+_REPLAY_TOKEN = re.compile(r"\S+\s*|\s+")
+
+
+class CachedAnswer:
+    """
+    A cached answer plus whatever the chat mode returned alongside it
+    (e.g. the RAG context) and how long the original generation took.
+    """
+
+    def __init__(self, question: str, answer: str, extra: Optional[Dict], latency: float) -> None:
+        self.question = question
+        self.answer = answer
+        self.extra = extra or {}
+        self.latency = latency
+        self.created_at = time.time()
+
+
+class SemanticAnswerCache:
+    """
+    In-process semantic cache of answers, partitioned by scope.
+
+    Each scope holds a matrix of L2-normalized question embeddings so a lookup
+    is one matrix-vector product. Entries expire after ttl_seconds; when the
+    cache is full the oldest entry across all scopes is dropped.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None) -> None:
+        self.threshold = answer_cache_threshold if threshold is None else threshold
+        self.ttl_seconds = answer_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.max_entries = max_entries or answer_cache_max_entries
+        self.lookups = 0
+        self.hits = 0
+        self.saved_latency = 0.0
+        self._scopes: Dict[Tuple, Tuple[List[np.ndarray], List[CachedAnswer]]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, scope: Tuple, vector: List[float]) -> Optional[CachedAnswer]:
+        query = _normalize(vector)
+        with self._lock:
+            self.lookups += 1
+            self._expire(scope)
+            vectors, entries = self._scopes.get(scope, ([], []))
+            if not entries:
+                return None
+            scores = np.stack(vectors) @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            self.hits += 1
+            self.saved_latency += entries[best].latency
+            return entries[best]
+
+    def put(self, scope: Tuple, vector: List[float], entry: CachedAnswer) -> None:
+        with self._lock:
+            vectors, entries = self._scopes.setdefault(scope, ([], []))
+            vectors.append(_normalize(vector))
+            entries.append(entry)
+            while sum(len(e) for _, e in self._scopes.values()) > self.max_entries:
+                self._drop_oldest()
+
+    # scope 에서 answer 가 같은 항목을 모두 지우고 지운 수를 돌려줍니다.
+    def discard(self, scope: Tuple, answer: str) -> int:
+        with self._lock:
+            vectors, entries = self._scopes.get(scope, ([], []))
+            keep = [i for i, entry in enumerate(entries) if entry.answer != answer]
+            removed = len(entries) - len(keep)
+            if removed:
+                if keep:
+                    self._scopes[scope] = ([vectors[i] for i in keep], [entries[i] for i in keep])
+                else:
+                    del self._scopes[scope]
+            return removed
+
+    def _expire(self, scope: Tuple) -> None:
+        if scope not in self._scopes:
+            return
+        vectors, entries = self._scopes[scope]
+        deadline = time.time() - self.ttl_seconds
+        keep = [i for i, entry in enumerate(entries) if entry.created_at >= deadline]
+        if len(keep) != len(entries):
+            self._scopes[scope] = ([vectors[i] for i in keep], [entries[i] for i in keep])
+
+    def _drop_oldest(self) -> None:
+        scope = min((s for s, (_, e) in self._scopes.items() if e), key=lambda s: self._scopes[s][1][0].created_at)
+        vectors, entries = self._scopes[scope]
+        del vectors[0], entries[0]
+        if not entries:
+            del self._scopes[scope]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "entries": sum(len(e) for _, e in self._scopes.values()),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "saved_latency": self.saved_latency,
+            }
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+_answer_cache = SemanticAnswerCache()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    return _answer_cache
+
+
+# 캐시를 나누는 범위를 만듭니다.
+# - RAG 는 generation 을 넣어서 문서가 바뀌면 이전 답변을 쓰지 않도록 합니다.
+def make_scope(mode: str, model_id: str, model_kwargs: Optional[Dict], generation: Optional[int] = None) -> Tuple:
+    return mode, model_id, json.dumps(model_kwargs or {}, sort_keys=True), generation
+
+
+# 비슷한 질문의 캐시된 답변을 찾습니다.
+# - 질문 임베딩(vector)을 이미 계산했다면 넘겨서 다시 계산하지 않도록 합니다.
+def lookup(scope: Tuple, question: str, vector: Optional[List[float]] = None) -> Optional[CachedAnswer]:
+    if vector is None:
+        vector = bedrock_svc.get_embeddings().embed_query(question)
+    return _answer_cache.lookup(scope, vector)
+
+
+# 생성한 답변을 캐시에 저장합니다.
+def store(scope: Tuple, question: str, answer: str, latency: float, extra: Optional[Dict] = None,
+          vector: Optional[List[float]] = None) -> None:
+    if vector is None:
+        vector = bedrock_svc.get_embeddings().embed_query(question)
+    _answer_cache.put(scope, vector, CachedAnswer(question, answer, extra, latency))
+
+
+# 캐시된 답변을 토큰 단위로 콜백 핸들러에 흘려보내서, 화면에는 생성할 때와 같은 방식으로 보이게 합니다.
+def replay(answer: str, handler) -> None:
+    run_id = uuid.uuid4()
+    for token in _REPLAY_TOKEN.findall(answer):
+        handler.on_llm_new_token(token, run_id=run_id)
+        if answer_cache_replay_delay:
+            time.sleep(answer_cache_replay_delay)
+    handler.on_llm_end(LLMResult(generations=[[Generation(text=answer)]]), run_id=run_id)
+
+
+async def areplay(answer: str, handler) -> None:
+    run_id = uuid.uuid4()
+    for token in _REPLAY_TOKEN.findall(answer):
+        handler.on_llm_new_token(token, run_id=run_id)
+        if answer_cache_replay_delay:
+            await asyncio.sleep(answer_cache_replay_delay)
+    handler.on_llm_end(LLMResult(generations=[[Generation(text=answer)]]), run_id=run_id)
+
+
+def stats() -> Dict[str, float]:
+    return _answer_cache.stats()
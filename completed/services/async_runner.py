@@ -0,0 +1,58 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Callable, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 동기 코드에서 코루틴을 기다리는 동안 on_wait 를 호출하는 간격(초)입니다.
+async_poll_interval = 0.05
+
+# 블로킹 호출(boto3 Bedrock 호출, SQLite 등)을 실행할 스레드 수입니다.
+# - ChatBedrock 은 네이티브 비동기 호출이 없어서 ainvoke 가 이 스레드 풀에서 실행되므로, 동시 요청 수에 맞춰서 조정합니다.
+async_executor_workers = 32
+
+# 프로세스 전체에서 공유하는 이벤트 루프입니다.
+# - 백그라운드 스레드 하나에서 계속 실행되므로 여러 세션의 요청이 같은 루프에서 동시에 진행되고,
+#   루프에 묶이는 비동기 Client(커넥션 풀)를 요청마다 다시 만들지 않아도 됩니다.
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+
+
+# 공유 이벤트 루프를 가져옵니다. 처음 호출할 때 루프 스레드를 시작합니다.
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _thread
+    if _loop is not None:
+        return _loop
+
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=async_executor_workers,
+                                                                            thread_name_prefix="async-runner"))
+            _thread = threading.Thread(target=loop.run_forever, name="async-runner", daemon=True)
+            _thread.start()
+            _loop = loop
+    return _loop
+
+
+# 코루틴을 공유 이벤트 루프에서 실행하고 결과를 기다립니다.
+# - 기다리는 동안 호출한 스레드에서 on_wait 를 주기적으로 호출합니다. (예: Streamlit 화면 갱신)
+# - 호출한 쪽이 중단되면 (Streamlit rerun 등) 실행 중인 코루틴도 취소합니다.
+def run(coro: Coroutine[Any, Any, T], on_wait: Optional[Callable[[], None]] = None) -> T:
+    loop = get_event_loop()
+    if threading.current_thread() is _thread:
+        raise RuntimeError("async_runner.run() cannot be called from the event loop thread")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        while True:
+            done, _ = concurrent.futures.wait([future], timeout=async_poll_interval)
+            if on_wait:
+                on_wait()
+            if done:
+                return future.result()
+    except BaseException:
+        future.cancel()
+        raise
@@ -0,0 +1,112 @@
+import json
+import threading
+from typing import Dict, Optional
+
+import boto3
+from botocore.config import Config
+from langchain_aws import ChatBedrock
+from langchain_community.embeddings import BedrockEmbeddings
+from langchain_core.embeddings import Embeddings
+
+import services.embedding_cache as embedding_cache
+
+# Bedrock 정보를 설정합니다.
+# - region_name / endpoint_url 이 None 이면 AWS 기본 설정(환경 변수, ~/.aws/config)을 사용합니다.
+bedrock_region_name: Optional[str] = None
+bedrock_endpoint_url: Optional[str] = None
+bedrock_embedding_model_id = "amazon.titan-embed-g1-text-02"
+
+# bedrock-runtime 커넥션 풀과 재시도 설정입니다.
+# - max_pool_connections 는 동시에 스트리밍할 수 있는 요청 수보다 크게 잡습니다.
+# - adaptive 모드는 Throttling 응답을 받으면 클라이언트 쪽에서 요청 속도를 줄여줍니다.
+bedrock_max_pool_connections = 32
+bedrock_max_attempts = 5
+bedrock_retry_mode = "adaptive"
+bedrock_read_timeout = 300
+
+# 프로세스 전체에서 공유하는 bedrock-runtime Client 와 모델 캐시입니다.
+_lock = threading.Lock()
+_bedrock_runtime_client = None
+_chat_models = {}
+_embeddings = {}
+
+
+# 공유 bedrock-runtime Client 를 가져옵니다.
+# - boto3 Client 는 thread-safe 하므로 모든 ChatBedrock / BedrockEmbeddings 가 같은 Client 를 사용합니다.
+def get_bedrock_runtime_client():
+    global _bedrock_runtime_client
+    if _bedrock_runtime_client is not None:
+        return _bedrock_runtime_client
+
+    with _lock:
+        if _bedrock_runtime_client is None:
+            config = Config(
+                max_pool_connections=bedrock_max_pool_connections,
+                read_timeout=bedrock_read_timeout,
+                retries={"max_attempts": bedrock_max_attempts, "mode": bedrock_retry_mode},
+            )
+            client_params = {"config": config}
+            if bedrock_region_name:
+                client_params["region_name"] = bedrock_region_name
+            if bedrock_endpoint_url:
+                client_params["endpoint_url"] = bedrock_endpoint_url
+            _bedrock_runtime_client = boto3.session.Session().client("bedrock-runtime", **client_params)
+    return _bedrock_runtime_client
+
+
+# 공유 Client 와 캐시된 모델을 모두 비웁니다. 설정을 바꾼 뒤 다시 연결할 때 사용합니다.
+def reset_bedrock_clients():
+    global _bedrock_runtime_client
+    with _lock:
+        _bedrock_runtime_client = None
+        _chat_models.clear()
+        _embeddings.clear()
+
+
+# model_kwargs 를 캐시 키로 사용할 수 있도록 정렬된 문자열로 바꿉니다.
+def _model_kwargs_key(model_kwargs: Optional[Dict]) -> str:
+    return json.dumps(model_kwargs or {}, sort_keys=True)
+
+
+# (model_id, model_kwargs, streaming) 별로 ChatBedrock 인스턴스를 한 번만 생성해서 재사용합니다.
+# - 스트리밍 출력용 콜백은 인스턴스에 고정하지 않고 호출할 때 config={"callbacks": [...]} 로 전달합니다.
+def get_chat_model(model_id: str, model_kwargs: Optional[Dict] = None, streaming: bool = True) -> ChatBedrock:
+    key = (model_id, _model_kwargs_key(model_kwargs), streaming)
+    llm = _chat_models.get(key)
+    if llm is not None:
+        return llm
+
+    client = get_bedrock_runtime_client()
+    with _lock:
+        llm = _chat_models.get(key)
+        if llm is None:
+            llm = ChatBedrock(
+                client=client,
+                model_id=model_id,
+                model_kwargs=dict(model_kwargs or {}),
+                streaming=streaming,
+            )
+            _chat_models[key] = llm
+    return llm
+
+
+# model_id 별로 BedrockEmbeddings 인스턴스를 한 번만 생성해서 재사용합니다.
+# - 임베딩 캐시가 켜져 있으면 디스크 캐시로 감싸서, 이미 임베딩한 텍스트는 Bedrock 을 호출하지 않습니다.
+def get_embeddings(model_id: Optional[str] = None) -> Embeddings:
+    model_id = model_id or bedrock_embedding_model_id
+    embedding = _embeddings.get(model_id)
+    if embedding is not None:
+        return embedding
+
+    client = get_bedrock_runtime_client()
+    with _lock:
+        embedding = _embeddings.get(model_id)
+        if embedding is None:
+            embedding = BedrockEmbeddings(
+                client=client,
+                model_id=model_id
+            )
+            if embedding_cache.embedding_cache_enabled:
+                embedding = embedding_cache.CachedEmbeddings(embedding, model_id=model_id)
+            _embeddings[model_id] = embedding
+    return embedding
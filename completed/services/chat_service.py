@@ -1,107 +1,273 @@
+import asyncio
+import copy
+import logging
+import threading
+import time
 from abc import ABC
-from typing import Dict
+from typing import Dict, Optional
 import streamlit as st
 
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_aws import ChatBedrock
-from langchain_community.chat_message_histories import StreamlitChatMessageHistory
-from langchain_community.tools import QuerySQLDataBaseTool
+from langchain_community.chat_message_histories import ChatMessageHistory, StreamlitChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.messages import HumanMessage
-from langchain_community.utilities import SQLDatabase
 
+import services.answer_cache as answer_cache
+import services.async_runner as async_runner
+import services.bedrock_service as bedrock_svc
+import services.chunking_service as chunking_svc
+import services.conversation_memory as conversation_memory
+import services.database_service as db_svc
+import services.hybrid_retrieval as hybrid_retrieval
 import services.opensearch_service as os_svc
+import services.schema_pruning as schema_pruning
+import services.sql_cache as sql_cache
+import services.sql_executor as sql_executor
+import services.tracing as tracing
+
+# 체인에 넣는 전체 프롬프트는 이 로거의 레벨이 DEBUG 일 때만 출력합니다.
+logger = logging.getLogger(__name__)
+
+# 스트리밍 출력 설정입니다.
+# - 토큰마다 전체 텍스트를 다시 그리지 않고, stream_render_interval 초가 지났거나 stream_render_tokens 개 토큰이 모였을 때 그립니다.
+# - stream_render_blocks 이면 끝난 문단(코드 블록 밖의 빈 줄 앞)은 한 번만 그리고, 이후에는 마지막 문단만 다시 그립니다.
+stream_render_interval = 0.1
+stream_render_tokens = 32
+stream_render_blocks = True
 
 
 # 토큰 단위로 생성되는 스트리밍 텍스트를 출력하기 위한 콜백 핸들러 클래스를 정의합니다.
 class StreamHandler(BaseCallbackHandler, ABC):
     """
     Callback handler to stream the generated text to Streamlit.
+
+    Rendering is throttled by time and token count, and finished paragraphs
+    are frozen into their own elements so only the last one is re-sent.
+    `render_calls` and `rendered_bytes` count what was pushed to Streamlit.
     """
 
     # 생성자에서는 Streamlit 컨테이너와 빈 문자열을 초기화합니다.
-    def __init__(self, container: st.container) -> None:
+    # - 핸들러를 만든 스레드(Streamlit 스크립트 스레드)만 화면을 갱신할 수 있습니다.
+    def __init__(self, container: st.container, interval: Optional[float] = None, max_tokens: Optional[int] = None,
+                 blocks: Optional[bool] = None) -> None:
         self.container = container
         self.text = ""
+        self.interval = stream_render_interval if interval is None else interval
+        self.max_tokens = max_tokens or stream_render_tokens
+        self.blocks = stream_render_blocks if blocks is None else blocks
+        self.render_calls = 0
+        self.rendered_bytes = 0
+        self._rendered = ""
+        self._frozen = 0
+        self._body = None
+        self._tail = container
+        self._pending_tokens = 0
+        self._last_render = 0.0
+        self._finished = False
+        self._owner = threading.current_thread()
+        self._lock = threading.Lock()
 
     # 새로운 토큰이 생성될 때마다 호출되며, 생성된 텍스트에 토큰을 추가하고 Streamlit 컨테이너를 업데이트합니다.
+    # - 다른 스레드(비동기 실행)에서 호출되면 텍스트만 추가하고, 화면은 스크립트 스레드가 flush 할 때 갱신합니다.
     def on_llm_new_token(self, token: str, **kwargs) -> None:
         """
         Append the new token to the text and update the Streamlit container.
         """
-        self.text += token
-        self.container.markdown(self.text)
+        with self._lock:
+            self.text += token
+            self._pending_tokens += 1
+        if threading.current_thread() is self._owner:
+            self.flush()
+
+    # 생성이 끝나면 남은 텍스트를 모두 출력합니다.
+    def on_llm_end(self, response, **kwargs) -> None:
+        with self._lock:
+            self._finished = True
+        if threading.current_thread() is self._owner:
+            self.flush(force=True)
+
+    # 아직 화면에 반영되지 않은 텍스트를 Streamlit 컨테이너에 출력합니다.
+    # - force 가 아니면 마지막 출력 후 interval 초가 지났거나 max_tokens 개 토큰이 모였을 때만 출력합니다.
+    def flush(self, force: bool = False) -> None:
+        """
+        Render pending text. Must be called from the Streamlit script thread.
+        """
+        with self._lock:
+            text = self.text
+            due = (force or self._finished or self._pending_tokens >= self.max_tokens
+                   or time.perf_counter() - self._last_render >= self.interval)
+            if text == self._rendered or not due:
+                return
+            self._pending_tokens = 0
+        self._render(text)
+        self._rendered = text
+        self._last_render = time.perf_counter()
+
+    def _render(self, text: str) -> None:
+        if self.blocks:
+            boundary = _block_boundary(text, self._frozen)
+            if boundary > self._frozen:
+                # 끝난 문단은 지금 보이는 요소에 마지막으로 그리고, 이후 텍스트는 새 요소에 그립니다.
+                if self._body is None:
+                    self._body = self.container.container()
+                    self._tail = self._body.empty()
+                self._markdown(self._tail, text[self._frozen:boundary])
+                self._tail = self._body.empty()
+                self._frozen = boundary
+        tail = text[self._frozen:]
+        if tail:
+            self._markdown(self._tail, tail)
+
+    def _markdown(self, element, text: str) -> None:
+        element.markdown(text)
+        self.render_calls += 1
+        self.rendered_bytes += len(text.encode("utf-8"))
+
+
+# start 이후에서 마지막으로 끝난 문단의 끝 위치를 찾습니다. 없으면 start 를 돌려줍니다.
+# - 코드 블록(```) 안의 빈 줄과, 들여쓰기로 이어지는 문단(목록의 하위 내용 등) 앞의 빈 줄에서는 나누지 않습니다.
+def _block_boundary(text: str, start: int) -> int:
+    position = len(text)
+    while True:
+        position = text.rfind("\n\n", start, position)
+        if position < 0:
+            return start
+        end = position + 2
+        following = text[end:end + 1]
+        if following and not following.isspace() and text.count("```", 0, end) % 2 == 0:
+            return end
+
+
+# 시맨틱 답변 캐시를 사용할지 결정합니다. 호출할 때 지정하지 않으면 answer_cache 의 설정을 따릅니다.
+def _use_answer_cache(use_answer_cache: Optional[bool]) -> bool:
+    return answer_cache.answer_cache_enabled if use_answer_cache is None else use_answer_cache
 
 
 # 일반 응답을 생성합니다.
-def get_chat_response(model_id: str, content: str, model_kwargs: Dict):
-    # 1. ChatBedrock 인스턴스를 생성합니다.
-    llm = ChatBedrock(
-        model_id=model_id,
-        model_kwargs=model_kwargs,
-        streaming=True,
-        callbacks=[StreamHandler(st.empty())]
-    )
-
-    # 2. ChatBedrock 에 전송할 메시지를 정의합니다.
+# - tracing 을 켜면 턴마다 단계별 실행 시간과 토큰 사용량이 Trace 로 기록됩니다.
+@tracing.traced("normal")
+async def aget_chat_response(model_id: str, content: str, model_kwargs: Dict, handler: BaseCallbackHandler,
+                             use_answer_cache: Optional[bool] = None) -> str:
+    # 1. 시맨틱 답변 캐시에 비슷한 질문의 답변이 있으면 스트리밍과 같은 방식으로 보여주고 바로 돌려줍니다.
+    use_cache = _use_answer_cache(use_answer_cache)
+    if use_cache:
+        scope = answer_cache.make_scope("normal", model_id, model_kwargs)
+        with tracing.span("answer_cache") as attributes:
+            vector = await bedrock_svc.get_embeddings().aembed_query(content)
+            cached = answer_cache.lookup(scope, content, vector=vector)
+            attributes["hit"] = cached is not None
+        if cached is not None:
+            await answer_cache.areplay(cached.answer, handler)
+            return cached.answer
+    start = time.perf_counter()
+
+    # 2. 캐시된 ChatBedrock 인스턴스를 가져옵니다.
+    # - 스트리밍 출력용 콜백은 호출할 때마다 새로 만들어서 전달합니다.
+    llm = bedrock_svc.get_chat_model(model_id=model_id, model_kwargs=model_kwargs, streaming=True)
+
+    # 3. ChatBedrock 에 전송할 메시지를 정의합니다.
     messages = [
         HumanMessage(
             content=content
         )
     ]
 
-    # 3. ChatBedrock 을 호출해서 응답을 생성합니다.
-    response = llm.invoke(messages)
+    # 4. ChatBedrock 을 호출해서 응답을 생성합니다.
+    response = await llm.ainvoke(messages, config={"callbacks": [handler, *tracing.llm_callbacks("generation")]})
     answer = response.content
+
+    # 5. 생성한 답변을 시맨틱 답변 캐시에 저장합니다.
+    if use_cache:
+        answer_cache.store(scope, content, answer, latency=time.perf_counter() - start, vector=vector)
     return answer
 
 
+def get_chat_response(model_id: str, content: str, model_kwargs: Dict, use_answer_cache: Optional[bool] = None):
+    handler = StreamHandler(st.empty())
+    return async_runner.run(aget_chat_response(model_id, content, model_kwargs, handler, use_answer_cache),
+                            on_wait=handler.flush)
+
+
 # History 를 기억하는 응답을 생성합니다.
-def get_conversation_chat_response(
-        model_id: str, content: str, memory_window: int, model_kwargs: Dict
+@tracing.traced("history")
+async def aget_conversation_chat_response(
+        model_id: str, content: str, memory_window: int, model_kwargs: Dict,
+        handler: BaseCallbackHandler, history: BaseChatMessageHistory,
+        memory_state: Optional[conversation_memory.SummaryState] = None
 ) -> str:
     """
     Generate a response from the conversation chain with the given input.
     """
-    # 1. ChatBedrock 인스턴스를 생성합니다.
-    llm = ChatBedrock(
-        model_id=model_id,
-        model_kwargs=model_kwargs,
-        streaming=True,
-        callbacks=[StreamHandler(st.empty())]
-    )
+    # 1. 캐시된 ChatBedrock 인스턴스를 가져옵니다.
+    llm = bedrock_svc.get_chat_model(model_id=model_id, model_kwargs=model_kwargs, streaming=True)
 
     # 2. 대화를 하고 메모리에서 대화 히스토리를 로드하는 체인을 생성합니다.
-    # StreamlitChatMessageHistory will store messages in Streamlit session state at the specified key=.
-    # The default key is "langchain_messages".
+    # - summary 메모리는 최근 대화만 그대로 보내고, 토큰 예산을 넘는 이전 대화는 요약해서 보냅니다.
     conversation_chain = ConversationChain(
         llm=llm,
-        memory=ConversationBufferWindowMemory(
-            k=memory_window,
-            ai_prefix='Assistant',
-            chat_memory=StreamlitChatMessageHistory(),
-            return_messages=True
-        ),
-        verbose=True
+        memory=conversation_memory.create_memory(history, memory_window, memory_state),
+        verbose=logger.isEnabledFor(logging.DEBUG)
     )
 
     # 3. ConversationChain 을 호출해서 응답을 생성합니다.
-    answer = conversation_chain.predict(input=content)
+    # - 호출할 때 전달한 콜백은 체인 내부의 ChatBedrock 호출까지 전달됩니다.
+    answer = await conversation_chain.apredict(input=content,
+                                               callbacks=[handler, *tracing.llm_callbacks("generation")])
+    return answer
+
+
+def get_conversation_chat_response(
+        model_id: str, content: str, memory_window: int, model_kwargs: Dict
+) -> str:
+    # StreamlitChatMessageHistory will store messages in Streamlit session state at the specified key=.
+    # The default key is "langchain_messages".
+    # - session state 는 스크립트 스레드에서만 읽고 쓸 수 있으므로, 복사본으로 실행한 뒤 새 메시지만 다시 저장합니다.
+    # - 대화 요약도 같은 방식으로 "langchain_summary" 에 보관합니다.
+    history = StreamlitChatMessageHistory()
+    snapshot = ChatMessageHistory(messages=list(history.messages))
+    memory_state = copy.copy(st.session_state.get("langchain_summary") or conversation_memory.SummaryState())
+    handler = StreamHandler(st.empty())
+    answer = async_runner.run(
+        aget_conversation_chat_response(model_id, content, memory_window, model_kwargs, handler, snapshot,
+                                        memory_state),
+        on_wait=handler.flush,
+    )
+    history.add_messages(snapshot.messages[len(history.messages):])
+    st.session_state["langchain_summary"] = memory_state
     return answer
 
 
 # Knowledge DB 로 부터 Context를 검색해서 응답을 생성합니다.
-def get_rag_chat_response(
-        model_id: str, content: str, model_kwargs: Dict
+@tracing.traced("rag")
+async def aget_rag_chat_response(
+        model_id: str, content: str, model_kwargs: Dict, handler: BaseCallbackHandler,
+        use_answer_cache: Optional[bool] = None
 ) -> tuple[str, str]:
-    # 1. OpenSearch 에서 파일이 업로드 되어서 생성된 index 가 있는지 확인합니다.
-    # - 업로드 된 파일이 없는 경우 리젝 응답이 나갑니다.
-    if not os_svc.check_if_index_exists():
+    # 1. 파일이 업로드 되어서 생성된 index 가 있는지 확인합니다.
+    # - 인덱스 상태는 캐시되어 있으므로 대부분 OpenSearch 호출 없이 바로 확인됩니다.
+    # - 업로드 된 파일이 없는 경우 질문 임베딩과 검색 없이 리젝 응답이 나갑니다.
+    if not await os_svc.acheck_if_index_exists():
         return "업로드된 파일이 없습니다.", ""
-
-    # 2. OpenSearch 에 Vector Search 를 해서 질문과 가장 관련된 Document 를 k 개 검색합니다.
-    docs = os_svc.get_most_similar_docs_by_query(query=content, k=2)
+    vector = await os_svc.aembed_query(content)
+
+    # 시맨틱 답변 캐시에 같은 인덱스 상태에서 한 비슷한 질문의 답변이 있으면 검색과 생성을 모두 건너뜁니다.
+    use_cache = _use_answer_cache(use_answer_cache)
+    if use_cache:
+        scope = answer_cache.make_scope(f"rag:{hybrid_retrieval.retrieval_mode}", model_id, model_kwargs,
+                                        os_svc.get_index_generation())
+        with tracing.span("answer_cache") as attributes:
+            cached = answer_cache.lookup(scope, content, vector=vector)
+            attributes["hit"] = cached is not None
+        if cached is not None:
+            await answer_cache.areplay(cached.answer, handler)
+            return cached.answer, cached.extra.get("context", "")
+    start = time.perf_counter()
+
+    # 2. 설정된 검색 방식(hybrid / vector)으로 질문과 가장 관련된 Document 를 k 개 검색합니다.
+    with tracing.span("retrieval", mode=hybrid_retrieval.retrieval_mode) as attributes:
+        docs = await os_svc.aget_most_similar_docs_by_query(query=content, k=2, vector=vector)
+        attributes["docs"] = len(docs)
 
     # 3. 가져온 Document 의 내용을 모아서 응답시 참고할 Context 를 만듭니다.
     context = ""
@@ -109,13 +275,8 @@ def get_rag_chat_response(
         context += doc.page_content
         context += "\n\n"
 
-    # 3. ChatBedrock 인스턴스를 생성합니다.
-    llm = ChatBedrock(
-        model_id=model_id,
-        model_kwargs=model_kwargs,
-        streaming=True,
-        callbacks=[StreamHandler(st.empty())]
-    )
+    # 3. 캐시된 ChatBedrock 인스턴스를 가져옵니다.
+    llm = bedrock_svc.get_chat_model(model_id=model_id, model_kwargs=model_kwargs, streaming=True)
 
     # 4. 프롬프트를 정의합니다.
     # - context 에는 검색한 내용이 들어갑니다.
@@ -137,33 +298,42 @@ def get_rag_chat_response(
     ]
 
     # 6. ChatBedrock 을 호출해서 응답을 생성합니다.
-    response = llm.invoke(messages)
+    response = await llm.ainvoke(messages, config={"callbacks": [handler, *tracing.llm_callbacks("generation")]})
     answer = response.content
 
+    # 7. 생성한 답변과 context 를 시맨틱 답변 캐시에 저장합니다.
+    if use_cache:
+        answer_cache.store(scope, content, answer, latency=time.perf_counter() - start,
+                           extra={"context": context}, vector=vector)
     return answer, context
 
 
-# SQL 을 생성해서 데이터를 검색한 뒤 응답을 생성합니다.
-def get_sql_chat_response(
-        model_id: str, content: str, model_kwargs: Dict
-) -> tuple[str, str, str]:
-    """
-    Generate a response from the conversation chain with the given input.
-    """
+def get_rag_chat_response(
+        model_id: str, content: str, model_kwargs: Dict, use_answer_cache: Optional[bool] = None
+) -> tuple[str, str]:
+    handler = StreamHandler(st.empty())
+    return async_runner.run(aget_rag_chat_response(model_id, content, model_kwargs, handler, use_answer_cache),
+                            on_wait=handler.flush)
 
-    # 1. ChatBedrock 인스턴스를 생성합니다.
-    # - 출력은 모아서 할 예정이기 때문에 Streaming 없이 생성합니다.
-    llm = ChatBedrock(
-        model_id=model_id,
-        model_kwargs=model_kwargs,
-        streaming=False
-    )
 
-    # 2. DB instance 를 생성합니다.
-    db = SQLDatabase.from_uri("sqlite:///db/Chinook.db")
-    dialect = db.dialect
-    table_info = db.table_info
-    question = content
+# SQL 을 생성해서 데이터를 검색한 뒤 응답을 생성합니다.
+# 질문에 답할 SQL 을 ChatBedrock 으로 생성합니다.
+# - feedback 에는 이전에 실패한 SQL 과 오류가 들어가며, 프롬프트에 넣어서 다시 작성하게 합니다.
+async def _agenerate_sql_query(model_id: str, model_kwargs: Dict, database, question: str,
+                               feedback: Optional[str] = None) -> str:
+    # 1. 캐시된 ChatBedrock 인스턴스를 가져옵니다.
+    # - 출력은 모아서 할 예정이기 때문에 Streaming 없이 생성합니다.
+    llm = bedrock_svc.get_chat_model(model_id=model_id, model_kwargs=model_kwargs, streaming=False)
+    dialect = database.dialect
+
+    # 2. 질문과 관련된 테이블과 FK 이웃 테이블의 스키마만 프롬프트에 넣습니다.
+    with tracing.span("schema_pruning") as attributes:
+        table_info, tables = schema_pruning.get_pruned_table_info(database, question)
+        attributes["tables"] = len(tables)
+    # - 전체 스키마의 토큰 수는 로그에만 쓰이므로 debug 로그가 켜져 있을 때만 계산합니다.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("schema tables: %s (~%d of ~%d tokens)", ", ".join(tables),
+                     chunking_svc.estimate_tokens(table_info), chunking_svc.estimate_tokens(database.table_info))
 
     # 3. SQL 생성을 위한 프롬프트를 정의합니다.
     # - dialect 에는 'sql' 이 들어갑니다.
@@ -188,6 +358,12 @@ def get_sql_chat_response(
         Question: {question}
         SQL Query:
         """
+    if feedback:
+        prompt += f"""
+        이전에 작성한 SQL 쿼리는 아래 오류로 실행되지 않았습니다. 오류를 해결한 SQL 쿼리를 다시 작성하세요.
+        <previous_attempt> {feedback} </previous_attempt>
+        SQL Query:
+        """
 
     # 4. ChatBedrock 에 전송할 사용자 메시지를 정의합니다.
     messages = [
@@ -197,26 +373,80 @@ def get_sql_chat_response(
     ]
 
     # 5. ChatBedrock 을 호출해서 SQL 생성을 요청합니다.
-    sql_query = llm.invoke(
+    return (await llm.ainvoke(
         messages,
-    ).content
-
-    # 6. SQL을 실행해서 데이터를 검색합니다.
-    execute_query = QuerySQLDataBaseTool(db=db)
-    sql_result = execute_query.invoke(sql_query)
-
-    # 7. 최종 응답 생성을 위한 ChatBedrock 인스턴스를 생성합니다.
-    llm = ChatBedrock(
-        model_id=model_id,
-        model_kwargs=model_kwargs,
-        streaming=True,
-        callbacks=[StreamHandler(st.empty())]
-    )
+        config={"callbacks": tracing.llm_callbacks("sql_generation")},
+    )).content
+
+
+# SQL 을 스레드에서 실행하고 실행 시간과 결과 행 수를 span 으로 기록합니다.
+async def _aexecute_query(database, sql_query: str) -> sql_executor.QueryResult:
+    with tracing.span("sql_execution") as attributes:
+        query_result = await asyncio.to_thread(sql_executor.execute_query, database, sql_query)
+        attributes.update(rows=len(query_result.rows), error_code=query_result.error_code)
+    return query_result
+
+
+@tracing.traced("sql")
+async def aget_sql_chat_response(
+        model_id: str, content: str, model_kwargs: Dict, handler: BaseCallbackHandler
+) -> tuple[str, str, sql_executor.QueryResult]:
+    """
+    Generate a response from the conversation chain with the given input.
+    """
+
+    # 1. 캐시된 DB instance 와 스키마 설명을 가져옵니다.
+    # - 엔진과 reflect 한 스키마는 프로세스 전체에서 재사용하고, DB 파일이 바뀌었을 때만 다시 reflect 합니다.
+    # - DB 파일 확인은 블로킹 작업이므로 스레드에서 실행합니다.
+    start = time.perf_counter()
+    with tracing.span("schema_load"):
+        database = await asyncio.to_thread(db_svc.get_database)
+    logger.debug("schema load: %.1f ms (reflection took %.1f ms when loaded)",
+                 (time.perf_counter() - start) * 1000, database.reflect_seconds * 1000)
+    question = content
 
-    # 8. 최종 응답을 생성하기 위한 프롬프트를 작성합니다
+    # 2. 같은 질문에 대해 이전에 생성해서 실행에 성공한 SQL 이 있으면 SQL 생성 호출을 건너뜁니다.
+    # - 캐시 키에는 모델과 스키마 fingerprint 가 들어가므로 스키마가 바뀌면 다시 생성합니다.
+    # - 질문 임베딩 비교를 켜면 임베딩 호출이 필요하므로 스레드에서 실행합니다.
+    with tracing.span("sql_cache") as attributes:
+        cached_sql = await asyncio.to_thread(sql_cache.lookup, question, model_id, database.fingerprint)
+        attributes["hit"] = cached_sql is not None
+    if cached_sql is not None:
+        logger.debug("sql cache hit")
+        sql_query = cached_sql
+    else:
+        start = time.perf_counter()
+        sql_query = await _agenerate_sql_query(model_id, model_kwargs, database, question)
+        generation_seconds = time.perf_counter() - start
+
+    # 3. SQL을 실행해서 데이터를 검색합니다.
+    # - 결과는 행 수/크기 예산만큼만 가져오고, 답변 프롬프트에는 컬럼별 요약과 일부 행만 넣습니다.
+    # - 실행 계획 확인에서 거절되거나 실패하면 오류를 넣어서 SQL 을 다시 생성합니다.
+    query_result = await _aexecute_query(database, sql_query)
+    for _ in range(sql_executor.sql_max_retries):
+        if not query_result.error:
+            break
+        logger.warning("sql retry after %s: %s", query_result.error_code, query_result.error)
+        start = time.perf_counter()
+        sql_query = await _agenerate_sql_query(model_id, model_kwargs, database, question, query_result.feedback())
+        generation_seconds = time.perf_counter() - start
+        query_result = await _aexecute_query(database, sql_query)
+    sql_result = query_result.summary()
+
+    # 실행에 성공한 SQL 만 캐시에 저장하고, 캐시된 SQL 이 실패하면 그 SQL 을 돌려준 항목을 캐시에서 지웁니다.
+    if cached_sql is not None and (sql_query != cached_sql or query_result.error):
+        sql_cache.discard(question, model_id, database.fingerprint, cached_sql)
+    if sql_query != cached_sql and not query_result.error:
+        await asyncio.to_thread(sql_cache.store, question, model_id, database.fingerprint, sql_query,
+                                generation_seconds)
+
+    # 4. 최종 응답 생성을 위한 캐시된 ChatBedrock 인스턴스를 가져옵니다.
+    llm = bedrock_svc.get_chat_model(model_id=model_id, model_kwargs=model_kwargs, streaming=True)
+
+    # 5. 최종 응답을 생성하기 위한 프롬프트를 작성합니다
     # - question 에는 사용자 질문이 들어갑니다.
     # - sql_query 에는 실행한 query 가 들어갑니다.
-    # - sql_result 에는 검색한 데이터가 들어갑니다.
+    # - sql_result 에는 검색한 데이터의 요약이 들어갑니다.
     answer_prompt = f"""
     주어진 사용자의 질문에 대해서 아래 해당 SQL 쿼리 및 SQL 결과를 참고해서 답변해주세요.
     
@@ -225,15 +455,23 @@ def get_sql_chat_response(
     SQL Result: {sql_result}
     """
 
-    # 9. ChatBedrock 에 전송할 사용자 메시지를 정의합니다.
+    # 6. ChatBedrock 에 전송할 사용자 메시지를 정의합니다.
     messages = [
         HumanMessage(
             content=answer_prompt
         )
     ]
 
-    # 10. ChatBedrock 을 호출해서 최종 응답을 생성합니다.
-    response = llm.invoke(messages)
+    # 7. ChatBedrock 을 호출해서 최종 응답을 생성합니다.
+    response = await llm.ainvoke(messages, config={"callbacks": [handler, *tracing.llm_callbacks("generation")]})
     answer = response.content
 
-    return answer, sql_query, sql_result
+    return answer, sql_query, query_result
+
+
+def get_sql_chat_response(
+        model_id: str, content: str, model_kwargs: Dict
+) -> tuple[str, str, sql_executor.QueryResult]:
+    handler = StreamHandler(st.empty())
+    return async_runner.run(aget_sql_chat_response(model_id, content, model_kwargs, handler),
+                            on_wait=handler.flush)
@@ -0,0 +1,137 @@
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+# Chunking 설정입니다.
+# - "token" 은 토큰 예산 안에서 문단/문장 경계를 지키며 페이지를 넘나드는 sliding window 로 chunk 를 만듭니다.
+# - "page" 는 기존처럼 페이지 하나를 chunk 하나로 사용합니다.
+chunking_strategy = "token"
+chunk_max_tokens = 400
+chunk_overlap_tokens = 50
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?。？！])\s+")
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+# 텍스트의 토큰 수를 추정합니다.
+# - 영어 단어는 대략 4/3 토큰, 한글 등 그 밖의 문자는 글자당 1 토큰으로 계산합니다.
+def estimate_tokens(text: str) -> int:
+    count = 0.0
+    for token in _TOKEN_PATTERN.findall(text):
+        if token[0].isascii() and token[0].isalnum():
+            count += max(1.0, len(token) / 4)
+        else:
+            count += 1.0
+    return int(count + 0.5)
+
+
+# 줄바꿈과 연속된 공백을 공백 하나로 바꿉니다.
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+# 텍스트를 문단 → 문장 순서로 나누고, 그래도 예산보다 긴 문장은 단어 단위로 자릅니다.
+def split_units(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> Iterator[str]:
+    for paragraph in _PARAGRAPH_SPLIT.split(text):
+        for sentence in _SENTENCE_SPLIT.split(_normalize(paragraph)):
+            if not sentence:
+                continue
+            if count_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            piece = []
+            piece_tokens = 0
+            for word in sentence.split(" "):
+                word_tokens = count_tokens(word)
+                if piece and piece_tokens + word_tokens > max_tokens:
+                    yield " ".join(piece)
+                    piece, piece_tokens = [], 0
+                piece.append(word)
+                piece_tokens += word_tokens
+            if piece:
+                yield " ".join(piece)
+
+
+# 페이지 하나를 chunk 하나로 만듭니다. (기존 방식)
+def chunk_by_page(documents: Iterable[Document], **kwargs) -> Iterator[Document]:
+    for doc in documents:
+        yield Document(page_content=_normalize(doc.page_content), metadata=dict(doc.metadata))
+
+
+# 토큰 예산 기반 sliding window 로 chunk 를 만듭니다.
+# - 같은 source 의 연속된 페이지는 하나의 chunk 로 합칠 수 있고, metadata 에 시작/끝 페이지를 남깁니다.
+# - 다음 chunk 는 이전 chunk 의 마지막 문장들(overlap_tokens 이내)로 시작합니다.
+# - 입력을 순서대로 한 번만 읽으므로 메모리 사용량은 chunk 하나 크기로 제한됩니다.
+def chunk_by_tokens(documents: Iterable[Document], max_tokens: Optional[int] = None,
+                    overlap_tokens: Optional[int] = None,
+                    count_tokens: Callable[[str], int] = estimate_tokens) -> Iterator[Document]:
+    max_tokens = max_tokens or chunk_max_tokens
+    overlap_tokens = chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    window: List[tuple] = []  # (sentence, tokens, page)
+    window_tokens = 0
+    window_has_new = False
+    metadata = None
+
+    def emit() -> Document:
+        chunk_metadata = dict(metadata)
+        pages = [page for _, _, page in window if page is not None]
+        if pages:
+            chunk_metadata["page"] = pages[0]
+            chunk_metadata["page_end"] = pages[-1]
+        return Document(page_content=" ".join(sentence for sentence, _, _ in window), metadata=chunk_metadata)
+
+    def carry_overlap():
+        kept, kept_tokens = [], 0
+        for unit in reversed(window):
+            if kept_tokens + unit[1] > overlap_tokens:
+                break
+            kept.insert(0, unit)
+            kept_tokens += unit[1]
+        return kept, kept_tokens
+
+    for doc in documents:
+        # source 가 바뀌면 이전 chunk 를 내보내고 새로 시작합니다.
+        if metadata is not None and doc.metadata.get("source") != metadata.get("source"):
+            if window_has_new:
+                yield emit()
+            window, window_tokens, window_has_new = [], 0, False
+        if not window_has_new:
+            metadata = {key: value for key, value in doc.metadata.items() if key not in ("page", "page_end")}
+
+        page = doc.metadata.get("page")
+        for sentence in split_units(doc.page_content, max_tokens, count_tokens):
+            tokens = count_tokens(sentence)
+            if window_has_new and window_tokens + tokens > max_tokens:
+                yield emit()
+                window, window_tokens = carry_overlap()
+                window_has_new = False
+                metadata = {key: value for key, value in doc.metadata.items() if key not in ("page", "page_end")}
+            window.append((sentence, tokens, page))
+            window_tokens += tokens
+            window_has_new = True
+
+    if window_has_new:
+        yield emit()
+
+
+_CHUNKERS: Dict[str, Callable[..., Iterator[Document]]] = {
+    "page": chunk_by_page,
+    "token": chunk_by_tokens,
+}
+
+
+# 이름으로 chunker 를 등록합니다. chunker 는 Document iterable 을 받아서 chunk Document 를 돌려주는 함수입니다.
+def register_chunker(name: str, chunker: Callable[..., Iterator[Document]]) -> None:
+    _CHUNKERS[name] = chunker
+
+
+# 설정된 전략으로 Document 들을 chunk 로 나눕니다.
+def iter_chunks(documents: Iterable[Document], strategy: Optional[str] = None, **kwargs) -> Iterator[Document]:
+    strategy = strategy or chunking_strategy
+    if strategy not in _CHUNKERS:
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+    return _CHUNKERS[strategy](documents, **kwargs)
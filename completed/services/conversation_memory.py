@@ -0,0 +1,170 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from langchain.memory import ConversationBufferWindowMemory
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import BaseMessage, HumanMessage, get_buffer_string
+
+import services.bedrock_service as bedrock_svc
+import services.chunking_service as chunking_svc
+import services.tracing as tracing
+
+logger = logging.getLogger(__name__)
+
+# History Chat 의 메모리 설정입니다.
+# - "window": 최근 memory_window 턴을 그대로 보냅니다. (길이 제한 없음)
+# - "summary": 최근 턴은 그대로 두고, 토큰 예산이나 memory_window 를 넘는 이전 턴은 요약으로 합칩니다.
+memory_mode = "summary"
+
+# 그대로 보내는 최근 대화의 토큰 예산입니다. 넘으면 memory_compact_ratio 만큼 남을 때까지 오래된 턴부터 요약합니다.
+# - 매 턴마다 요약하지 않도록 예산의 일부만 남기고 한 번에 요약합니다.
+memory_token_budget = 2000
+memory_compact_ratio = 0.5
+
+# 요약은 저렴한 모델로 이전 요약에 새로 밀려난 대화만 합쳐서 갱신합니다.
+memory_summary_model_id = "anthropic.claude-3-haiku-20240307-v1:0"
+memory_summary_max_tokens = 400
+memory_summary_max_words = 200
+
+AI_PREFIX = "Assistant"
+
+
+def _tokens(messages: List[BaseMessage]) -> int:
+    return sum(chunking_svc.estimate_tokens(message.content) for message in messages)
+
+
+def _turns(messages: List[BaseMessage]) -> int:
+    return sum(isinstance(message, HumanMessage) for message in messages)
+
+
+class SummaryState:
+    """
+    Running summary of a conversation and how many of its messages it covers.
+    """
+
+    def __init__(self) -> None:
+        self.summary = ""
+        self.summarized = 0
+
+    def reset(self) -> None:
+        self.summary = ""
+        self.summarized = 0
+
+
+class SummaryBufferMemory(BaseChatMemory):
+    """
+    Chat memory that keeps recent turns verbatim within a token budget and
+    folds older turns into a running summary.
+
+    `state` holds the summary and how many messages of `chat_memory` it
+    already covers, so it can be stored next to the history between runs.
+    """
+
+    state: SummaryState
+    max_turns: int
+    token_budget: int = memory_token_budget
+    memory_key: str = "history"
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _recent(self) -> List[BaseMessage]:
+        messages = self.chat_memory.messages
+        # 히스토리가 비워졌으면 (새 대화) 요약도 버립니다.
+        if self.state.summarized > len(messages):
+            self.state.reset()
+        return messages[self.state.summarized:]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        recent = self._recent()
+        parts = []
+        if self.state.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.state.summary}\n")
+        if recent:
+            parts.append(get_buffer_string(recent, ai_prefix=AI_PREFIX))
+        return {self.memory_key: "\n".join(parts)}
+
+    # 최근 대화가 토큰 예산이나 턴 수를 넘으면 요약할 메시지 수를 돌려줍니다.
+    # - 마지막 턴(질문과 답변)은 항상 그대로 둡니다.
+    def _compact_count(self) -> int:
+        recent = self._recent()
+        if _tokens(recent) <= self.token_budget and _turns(recent) <= self.max_turns:
+            return 0
+        target_tokens = self.token_budget * memory_compact_ratio
+        target_turns = max(1, self.max_turns // 2)
+        count = 0
+        while len(recent) - count > 2 and (_tokens(recent[count:]) > target_tokens
+                                           or _turns(recent[count:]) > target_turns):
+            # 턴 중간에서 나누지 않도록 다음 질문까지 넘깁니다.
+            count += 1
+            while count < len(recent) - 2 and not isinstance(recent[count], HumanMessage):
+                count += 1
+        return count
+
+    def _summary_prompt(self, messages: List[BaseMessage]) -> str:
+        return f"""
+        아래는 사용자와 Assistant 의 이전 대화 요약과, 그 뒤에 이어진 대화입니다.
+        이전 요약에 새 대화 내용을 합쳐서 요약을 갱신하세요.
+        이름, 숫자, 사용자의 선호와 결정 같은 사실은 빠뜨리지 말고 {memory_summary_max_words} 단어 이내로 작성하세요.
+        요약만 작성하고 다른 것은 작성하지 마세요.
+
+        <summary> {self.state.summary} </summary>
+        <conversation> {get_buffer_string(messages, ai_prefix=AI_PREFIX)} </conversation>
+        """
+
+    def _apply_summary(self, summary: str, count: int) -> None:
+        self.state.summary = summary.strip()
+        self.state.summarized += count
+        logger.info("memory: summarized %d messages, history now ~%d tokens", count,
+                    chunking_svc.estimate_tokens(self.load_memory_variables({})[self.memory_key]))
+
+    def compact(self) -> None:
+        count = self._compact_count()
+        if count:
+            messages = self._recent()[:count]
+            llm = _get_summary_model()
+            response = llm.invoke([HumanMessage(content=self._summary_prompt(messages))],
+                                  config={"callbacks": tracing.llm_callbacks("memory_summary")})
+            self._apply_summary(response.content, count)
+
+    async def acompact(self) -> None:
+        count = self._compact_count()
+        if count:
+            messages = self._recent()[:count]
+            llm = _get_summary_model()
+            response = await llm.ainvoke([HumanMessage(content=self._summary_prompt(messages))],
+                                         config={"callbacks": tracing.llm_callbacks("memory_summary")})
+            self._apply_summary(response.content, count)
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        self.compact()
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        await super().asave_context(inputs, outputs)
+        await self.acompact()
+
+    def clear(self) -> None:
+        super().clear()
+        self.state.reset()
+
+
+def _get_summary_model():
+    return bedrock_svc.get_chat_model(model_id=memory_summary_model_id, streaming=False,
+                                      model_kwargs={"max_tokens": memory_summary_max_tokens, "temperature": 0})
+
+
+# 설정된 memory_mode 에 맞는 메모리를 만듭니다.
+# - summary 모드의 state 는 호출한 쪽에서 히스토리와 함께 보관합니다.
+def create_memory(history, memory_window: int, state: Optional[SummaryState] = None) -> BaseChatMemory:
+    if memory_mode == "window":
+        return ConversationBufferWindowMemory(k=memory_window, ai_prefix=AI_PREFIX, chat_memory=history,
+                                              return_messages=True)
+    if memory_mode == "summary":
+        return SummaryBufferMemory(chat_memory=history, max_turns=memory_window,
+                                   state=SummaryState() if state is None else state)
+    raise ValueError(f"Unknown memory mode: {memory_mode}")
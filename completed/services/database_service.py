@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from langchain_community.utilities import SQLDatabase
+
+# SQL Chat 에서 사용할 데이터베이스 정보를 설정합니다.
+database_uri = "sqlite:///db/Chinook.db"
+
+# 스키마 설명(table_info)에 포함할 테이블별 예시 행 수입니다. (SQLDatabase 기본값과 같습니다.)
+database_sample_rows = 3
+
+_registry_lock = threading.Lock()
+_registry: Dict[str, "DatabaseHandle"] = {}
+
+
+class DatabaseHandle:
+    """
+    A reflected SQLDatabase plus its rendered table_info, cached per URI.
+
+    `version` identifies the database state the handle was built from
+    (file mtime/size and SQLite schema_version); `fingerprint` hashes the
+    schema DDL only, so it stays stable across data-only changes.
+    """
+
+    def __init__(self, uri: str, db: SQLDatabase, table_info: str, version: Tuple,
+                 fingerprint: str, reflect_seconds: float) -> None:
+        self.uri = uri
+        self.db = db
+        self.table_info = table_info
+        self.version = version
+        self.fingerprint = fingerprint
+        self.reflect_seconds = reflect_seconds
+        self.loaded_at = time.time()
+        self._table_infos: Dict[str, str] = {}
+
+    @property
+    def dialect(self) -> str:
+        return self.db.dialect
+
+    # 일부 테이블의 스키마 설명을 만듭니다. 테이블별로 한 번만 만들고 재사용합니다.
+    def get_table_info(self, table_names: List[str]) -> str:
+        for name in table_names:
+            if name not in self._table_infos:
+                self._table_infos[name] = self.db.get_table_info([name])
+        return "\n\n".join(self._table_infos[name] for name in table_names)
+
+
+# sqlite URI 에서 파일 경로를 가져옵니다. sqlite 파일이 아니면 None 을 돌려줍니다.
+def get_sqlite_path(uri: str) -> Optional[str]:
+    prefix = "sqlite:///"
+    if not uri.startswith(prefix) or uri[len(prefix):] in ("", ":memory:"):
+        return None
+    return uri[len(prefix):]
+
+
+# 데이터베이스 파일의 상태를 가져옵니다. 파일이 바뀌었는지 확인하는데 사용합니다.
+def _file_version(uri: str) -> Tuple:
+    path = get_sqlite_path(uri)
+    if path is None or not os.path.exists(path):
+        return ()
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _schema_version(db: SQLDatabase) -> Optional[int]:
+    if db.dialect != "sqlite":
+        return None
+    with db._engine.connect() as connection:
+        return connection.exec_driver_sql("PRAGMA schema_version").scalar()
+
+
+def _schema_fingerprint(db: SQLDatabase) -> str:
+    if db.dialect == "sqlite":
+        with db._engine.connect() as connection:
+            rows = connection.exec_driver_sql(
+                "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name").fetchall()
+        ddl = "\n".join(f"{kind}:{name}:{sql}" for kind, name, sql in rows)
+    else:
+        ddl = db.get_table_info_no_throw()
+    return hashlib.sha256(ddl.encode("utf-8")).hexdigest()[:16]
+
+
+# 데이터베이스에 연결하고 스키마를 reflect 해서 table_info 를 만듭니다.
+def _load(uri: str) -> DatabaseHandle:
+    start = time.perf_counter()
+    db = SQLDatabase.from_uri(uri, sample_rows_in_table_info=database_sample_rows)
+    table_info = db.table_info
+    reflect_seconds = time.perf_counter() - start
+    version = _file_version(uri) + (_schema_version(db),)
+    return DatabaseHandle(uri, db, table_info, version, _schema_fingerprint(db), reflect_seconds)
+
+
+# 캐시된 데이터베이스를 가져옵니다.
+# - 처음 호출할 때 엔진을 만들고 스키마를 reflect 한 뒤, 이후에는 같은 엔진과 table_info 를 재사용합니다.
+# - sqlite 파일의 mtime/크기나 schema_version 이 바뀌었으면 다시 reflect 합니다.
+def get_database(uri: Optional[str] = None) -> DatabaseHandle:
+    uri = uri or database_uri
+    handle = _registry.get(uri)
+    if handle is not None and handle.version == _file_version(uri) + (_schema_version(handle.db),):
+        return handle
+
+    with _registry_lock:
+        current = _registry.get(uri)
+        if current is not handle and current is not None:
+            return current
+        if handle is not None:
+            handle.db._engine.dispose()
+        handle = _load(uri)
+        _registry[uri] = handle
+    return handle
+
+
+# 캐시된 데이터베이스를 비웁니다. 파일 외의 방법으로 스키마를 바꾼 뒤 다시 읽을 때 사용합니다.
+def invalidate_database(uri: Optional[str] = None) -> None:
+    with _registry_lock:
+        handles = list(_registry.values()) if uri is None else [_registry.get(uri)]
+        for handle in handles:
+            if handle is not None:
+                handle.db._engine.dispose()
+                _registry.pop(handle.uri, None)
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# 임베딩 캐시 설정입니다.
+# - 벡터는 차원별 float32 memory-mapped 파일에, 키 인덱스는 SQLite 에 저장합니다.
+# - embedding_cache_max_entries 를 넘으면 가장 오래 사용하지 않은 벡터부터 삭제합니다.
+embedding_cache_enabled = True
+embedding_cache_dir = os.path.join(".cache", "embeddings")
+embedding_cache_max_entries = 200_000
+
+_INITIAL_ROWS = 1024
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model_id, sha256(text)).
+
+    Vectors live in one float32 memory-mapped matrix per dimension; a SQLite
+    table maps keys to matrix rows and tracks last access for LRU eviction.
+    Freed rows are reused, so the matrix stays close to max_entries rows.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None) -> None:
+        self.path = path or embedding_cache_dir
+        self.max_entries = max_entries or embedding_cache_max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._matrices: Dict[int, np.memmap] = {}
+
+        os.makedirs(self.path, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS free_slots (dim INTEGER NOT NULL, slot INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS next_slots (dim INTEGER PRIMARY KEY, next_slot INTEGER NOT NULL);
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    # 차원별 벡터 행렬을 열고, 필요하면 파일 크기를 두 배씩 늘립니다.
+    def _matrix(self, dim: int, min_rows: int = 0) -> np.memmap:
+        matrix = self._matrices.get(dim)
+        if matrix is not None and matrix.shape[0] >= min_rows:
+            return matrix
+
+        file_path = os.path.join(self.path, f"vectors_{dim}.f32")
+        row_bytes = dim * 4
+        rows = os.path.getsize(file_path) // row_bytes if os.path.exists(file_path) else 0
+        if rows < max(min_rows, 1):
+            rows = max(min_rows, rows * 2, _INITIAL_ROWS)
+            if matrix is not None:
+                matrix.flush()
+            with open(file_path, "ab") as f:
+                f.truncate(rows * row_bytes)
+        matrix = np.memmap(file_path, dtype=np.float32, mode="r+", shape=(rows, dim))
+        self._matrices[dim] = matrix
+        return matrix
+
+    # 캐시에서 벡터들을 가져옵니다. 없는 텍스트는 None 으로 돌려줍니다.
+    def get_many(self, model_id: str, texts: List[str]) -> List[Optional[List[float]]]:
+        keys = [self.make_key(model_id, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        with self._lock:
+            found = {}
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, dim, slot FROM entries WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update({key: (dim, slot) for key, dim, slot in rows})
+
+            for i, key in enumerate(keys):
+                if key in found:
+                    dim, slot = found[key]
+                    results[i] = self._matrix(dim)[slot].tolist()
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                     [(now, key) for key in found])
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return results
+
+    def get(self, model_id: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model_id, [text])[0]
+
+    # 벡터들을 캐시에 저장합니다.
+    # - 벡터를 먼저 파일에 쓰고 flush 한 뒤 인덱스를 commit 하므로, 중간에 멈춰도 인덱스가 빈 행을 가리키지 않습니다.
+    def put_many(self, model_id: str, texts: List[str], vectors: List[List[float]]) -> None:
+        if not texts:
+            return
+        with self._lock:
+            now = time.time()
+            rows = []
+            keys = set()
+            touched = set()
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(model_id, text)
+                if key in keys or self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone():
+                    continue
+                keys.add(key)
+                dim = len(vector)
+                slot = self._allocate_slot(dim)
+                self._matrix(dim, slot + 1)[slot] = np.asarray(vector, dtype=np.float32)
+                touched.add(dim)
+                rows.append((key, dim, slot, now))
+
+            for dim in touched:
+                self._matrices[dim].flush()
+            self._db.executemany("INSERT OR REPLACE INTO entries (key, dim, slot, last_access) VALUES (?, ?, ?, ?)",
+                                 rows)
+            self._evict()
+            self._db.commit()
+
+    def put(self, model_id: str, text: str, vector: List[float]) -> None:
+        self.put_many(model_id, [text], [vector])
+
+    def _allocate_slot(self, dim: int) -> int:
+        row = self._db.execute("SELECT rowid, slot FROM free_slots WHERE dim = ? LIMIT 1", (dim,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM free_slots WHERE rowid = ?", (row[0],))
+            return row[1]
+        row = self._db.execute("SELECT next_slot FROM next_slots WHERE dim = ?", (dim,)).fetchone()
+        slot = row[0] if row else 0
+        self._db.execute("INSERT OR REPLACE INTO next_slots (dim, next_slot) VALUES (?, ?)", (dim, slot + 1))
+        return slot
+
+    # 최대 개수를 넘은 만큼 가장 오래 사용하지 않은 항목을 삭제하고, 그 행을 재사용 목록에 넣습니다.
+    def _evict(self) -> None:
+        count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+        victims = self._db.execute("SELECT key, dim, slot FROM entries ORDER BY last_access LIMIT ?",
+                                   (overflow,)).fetchall()
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _, _ in victims])
+        self._db.executemany("INSERT INTO free_slots (dim, slot) VALUES (?, ?)",
+                             [(dim, slot) for _, dim, slot in victims])
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.executescript("DELETE FROM entries; DELETE FROM free_slots; DELETE FROM next_slots;")
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            for matrix in self._matrices.values():
+                matrix.flush()
+            self._matrices.clear()
+            self._db.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingCache
+    and only calls the underlying model for misses.
+    """
+
+    def __init__(self, embedding: Embeddings, model_id: str, cache: Optional[EmbeddingCache] = None) -> None:
+        self.embedding = embedding
+        self.model_id = model_id
+        self.cache = cache or get_embedding_cache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(self.model_id, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embedding.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+            self.cache.put_many(self.model_id, [texts[i] for i in missing], computed)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get(self.model_id, text)
+        if vector is None:
+            vector = self.embedding.embed_query(text)
+            self.cache.put(self.model_id, text, vector)
+        return vector
+
+
+_cache_lock = threading.Lock()
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+# 프로세스 전체에서 공유하는 임베딩 캐시를 가져옵니다.
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
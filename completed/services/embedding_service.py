@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+import services.bedrock_service as bedrock_svc
+
+# 병렬 임베딩 설정입니다.
+# - embedding_max_workers 는 동시에 Bedrock 에 보내는 임베딩 요청 수입니다.
+# - 재시도는 Throttling 에 대해서만 하고, 그 외 에러는 바로 올려보냅니다.
+embedding_max_workers = 8
+embedding_max_retries = 8
+embedding_base_delay = 0.2
+embedding_max_delay = 10.0
+
+_THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+
+# 예외가 Bedrock Throttling 때문인지 확인합니다.
+# - BedrockEmbeddings 는 원래 예외를 ValueError 로 감싸기 때문에 __cause__ / __context__ 까지 확인합니다.
+def is_throttling_error(error: BaseException) -> bool:
+    while error is not None:
+        if isinstance(error, ClientError):
+            return error.response.get("Error", {}).get("Code") in _THROTTLING_CODES
+        if any(code in str(error) for code in _THROTTLING_CODES):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class AdaptiveBackoff:
+    """
+    Shared backoff state for all embedding workers.
+
+    Each throttled call doubles the delay every worker waits before its next
+    request; each success halves it, so the pool settles just under the rate
+    Bedrock accepts.
+    """
+
+    def __init__(self, base_delay: float = None, max_delay: float = None) -> None:
+        self.base_delay = embedding_base_delay if base_delay is None else base_delay
+        self.max_delay = embedding_max_delay if max_delay is None else max_delay
+        self.delay = 0.0
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        delay = self.delay
+        if delay > 0:
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay / 2 >= self.base_delay else 0.0
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.throttled_count += 1
+            self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+
+
+# 텍스트 하나를 임베딩합니다. Throttling 이 발생하면 backoff 후 재시도합니다.
+def _embed_with_backoff(embedding, text: str, backoff: AdaptiveBackoff, max_retries: int) -> List[float]:
+    attempt = 0
+    while True:
+        backoff.wait()
+        try:
+            vector = embedding.embed_query(text)
+        except Exception as e:
+            if not is_throttling_error(e) or attempt >= max_retries:
+                raise
+            attempt += 1
+            backoff.on_throttle()
+            continue
+        backoff.on_success()
+        return vector
+
+
+# 텍스트들을 thread pool 로 병렬 임베딩하고, 입력 순서대로 (index, vector) 를 하나씩 돌려줍니다.
+# - 동시에 처리 중인 요청은 max_workers * 2 개로 제한되므로 입력이 generator 여도 메모리가 일정합니다.
+# - 앞쪽 결과가 끝나는 대로 바로 yield 하므로 호출하는 쪽에서 색인을 같이 진행할 수 있습니다.
+def iter_embeddings(
+        texts: Iterable[str],
+        embedding=None,
+        max_workers: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[AdaptiveBackoff] = None,
+) -> Iterator[Tuple[int, List[float]]]:
+    embedding = embedding or bedrock_svc.get_embeddings()
+    max_workers = max_workers or embedding_max_workers
+    max_retries = embedding_max_retries if max_retries is None else max_retries
+    backoff = backoff or AdaptiveBackoff()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embedding") as executor:
+        pending = deque()
+        try:
+            for index, text in enumerate(texts):
+                pending.append((index, executor.submit(_embed_with_backoff, embedding, text, backoff, max_retries)))
+                if len(pending) >= max_workers * 2:
+                    first_index, future = pending.popleft()
+                    yield first_index, future.result()
+            while pending:
+                first_index, future = pending.popleft()
+                yield first_index, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+# 텍스트 리스트를 병렬로 임베딩해서 입력 순서대로 벡터 리스트를 돌려줍니다.
+def embed_texts(texts: List[str], embedding=None, max_workers: Optional[int] = None,
+                on_progress: Optional[Callable[[int, int], None]] = None) -> List[List[float]]:
+    vectors = []
+    for index, vector in iter_embeddings(texts, embedding=embedding, max_workers=max_workers):
+        vectors.append(vector)
+        if on_progress:
+            on_progress(index + 1, len(texts))
+    return vectors
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.callbacks import BaseCallbackHandler
+
+import services.async_runner as async_runner
+import services.chat_service as chat_svc
+import services.conversation_memory as conversation_memory
+import services.tracing as tracing
+
+# Streamlit 없이 chat_service 를 실행하는 헤드리스 실행 설정입니다.
+# - 동시에 실행하는 질문 수입니다. History 모드에서 같은 대화의 질문은 순서대로 실행합니다.
+headless_concurrency = 4
+headless_memory_window = 10
+
+MODES = ("normal", "history", "rag", "sql")
+
+
+class ChatRequest:
+    """
+    One question of a headless run. In History mode, requests with the same
+    `conversation` share a chat history; without one each request starts a
+    new conversation.
+    """
+
+    def __init__(self, question: str, mode: str, request_id: Optional[str] = None,
+                 conversation: Optional[str] = None) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        self.question = question
+        self.mode = mode
+        self.request_id = request_id
+        self.conversation = conversation
+
+    # JSONL 한 줄({"question": ..., "id": ..., "mode": ..., "conversation": ...})로 요청을 만듭니다.
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], default_mode: str) -> "ChatRequest":
+        conversation = data.get("conversation")
+        return cls(question=data["question"], mode=data.get("mode", default_mode),
+                   request_id=None if data.get("id") is None else str(data["id"]),
+                   conversation=None if conversation is None else str(conversation))
+
+
+class ChatResult:
+    """
+    Answer, retrieved context or SQL, and timings of one headless request.
+    """
+
+    def __init__(self, request: ChatRequest) -> None:
+        self.request = request
+        self.answer = ""
+        self.context: Optional[str] = None
+        self.sql: Optional[str] = None
+        self.sql_rows: Optional[int] = None
+        self.sql_error: Optional[str] = None
+        self.error: Optional[str] = None
+        self.latency_ms = 0.0
+        self.ttft_ms: Optional[float] = None
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.stages_ms: Dict[str, float] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.request.request_id, "mode": self.request.mode,
+                "conversation": self.request.conversation, "question": self.request.question,
+                "answer": self.answer, "context": self.context, "sql": self.sql, "sql_rows": self.sql_rows,
+                "sql_error": self.sql_error, "error": self.error, "latency_ms": round(self.latency_ms, 2),
+                "ttft_ms": None if self.ttft_ms is None else round(self.ttft_ms, 2),
+                "input_tokens": self.input_tokens, "output_tokens": self.output_tokens,
+                "stages_ms": {name: round(ms, 2) for name, ms in self.stages_ms.items()}}
+
+
+class OutputSink:
+    """
+    Receives the output of a headless run: streamed tokens as they arrive and
+    each finished result. Tokens of concurrent requests interleave, so they
+    come with their request.
+    """
+
+    def on_token(self, request: ChatRequest, token: str) -> None:
+        pass
+
+    def write(self, result: ChatResult) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlSink(OutputSink):
+    """
+    Writes one JSON line per result to a file path or an open stream.
+    """
+
+    def __init__(self, target) -> None:
+        self._owned = isinstance(target, str)
+        self._file: TextIO = open(target, "a", encoding="utf-8") if self._owned else target
+        self._lock = threading.Lock()
+
+    def write(self, result: ChatResult) -> None:
+        with self._lock:
+            self._file.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._owned:
+            self._file.close()
+
+
+class ConsoleSink(OutputSink):
+    """
+    Prints a one-line summary per result.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream = stream or sys.stderr
+
+    def write(self, result: ChatResult) -> None:
+        outcome = f"ERROR {result.error}" if result.error else result.answer.replace("\n", " ")[:80]
+        print(f"[{result.request.mode}] {result.request.request_id or '-'} | {result.latency_ms:8.1f} ms | {outcome}",
+              file=self.stream, flush=True)
+
+
+class MemorySink(OutputSink):
+    """
+    Keeps results and streamed text in memory, e.g. for notebooks and checks.
+    """
+
+    def __init__(self) -> None:
+        self.results: List[ChatResult] = []
+        self.streamed: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def on_token(self, request: ChatRequest, token: str) -> None:
+        with self._lock:
+            self.streamed[id(request)] = self.streamed.get(id(request), "") + token
+
+    def write(self, result: ChatResult) -> None:
+        with self._lock:
+            self.results.append(result)
+
+
+class _SinkHandler(BaseCallbackHandler):
+    """
+    Streams the tokens of one request to the sinks and records the time to
+    first token. Used in place of the Streamlit StreamHandler.
+    """
+
+    run_inline = True
+
+    def __init__(self, request: ChatRequest, sinks: List[OutputSink]) -> None:
+        self.request = request
+        self.sinks = sinks
+        self.first_token: Optional[float] = None
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        for sink in self.sinks:
+            sink.on_token(self.request, token)
+
+
+class HeadlessChat:
+    """
+    Runs chat requests through chat_service without Streamlit and sends the
+    results to the given sinks. Conversation histories for History mode live
+    on the instance.
+    """
+
+    def __init__(self, model_id: str, model_kwargs: Dict, sinks: Iterable[OutputSink] = (),
+                 concurrency: Optional[int] = None, memory_window: Optional[int] = None,
+                 use_answer_cache: Optional[bool] = None) -> None:
+        self.model_id = model_id
+        self.model_kwargs = model_kwargs
+        self.sinks = list(sinks)
+        self.concurrency = concurrency or headless_concurrency
+        self.memory_window = memory_window or headless_memory_window
+        self.use_answer_cache = use_answer_cache
+        self._conversations: Dict[str, Tuple[ChatMessageHistory, conversation_memory.SummaryState]] = {}
+
+    def _conversation(self, key: Optional[str]) -> Tuple[ChatMessageHistory, conversation_memory.SummaryState]:
+        if key is None:
+            return ChatMessageHistory(), conversation_memory.SummaryState()
+        if key not in self._conversations:
+            self._conversations[key] = ChatMessageHistory(), conversation_memory.SummaryState()
+        return self._conversations[key]
+
+    async def _arespond(self, request: ChatRequest, handler: BaseCallbackHandler, result: ChatResult) -> None:
+        model_id, model_kwargs, question = self.model_id, self.model_kwargs, request.question
+        if request.mode == "normal":
+            result.answer = await chat_svc.aget_chat_response(model_id, question, model_kwargs, handler,
+                                                              self.use_answer_cache)
+        elif request.mode == "history":
+            history, state = self._conversation(request.conversation)
+            result.answer = await chat_svc.aget_conversation_chat_response(
+                model_id, question, self.memory_window, model_kwargs, handler, history, state)
+        elif request.mode == "rag":
+            result.answer, result.context = await chat_svc.aget_rag_chat_response(
+                model_id, question, model_kwargs, handler, self.use_answer_cache)
+        else:
+            result.answer, result.sql, query_result = await chat_svc.aget_sql_chat_response(
+                model_id, question, model_kwargs, handler)
+            result.sql_rows, result.sql_error = query_result.row_count, query_result.error
+
+    # 요청 하나를 실행합니다. 실패해도 예외를 올리지 않고 결과의 error 에 기록합니다.
+    async def arun(self, request: ChatRequest) -> ChatResult:
+        result = ChatResult(request)
+        handler = _SinkHandler(request, self.sinks)
+        start = time.perf_counter()
+        with tracing.start_trace(request.mode, self.model_id) as trace:
+            try:
+                await self._arespond(request, handler, result)
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+        result.latency_ms = (time.perf_counter() - start) * 1000
+        if handler.first_token is not None:
+            result.ttft_ms = (handler.first_token - start) * 1000
+        if trace is not None:
+            result.input_tokens, result.output_tokens = trace.input_tokens, trace.output_tokens
+            result.stages_ms = {name: seconds * 1000 for name, seconds in trace.stage_seconds().items()}
+        for sink in self.sinks:
+            sink.write(result)
+        return result
+
+    # 요청들을 최대 concurrency 개씩 동시에 실행하고, 입력 순서대로 결과를 돌려줍니다.
+    # - History 모드에서 같은 conversation 의 요청은 앞의 답변이 히스토리에 들어간 뒤에 실행합니다.
+    async def arun_batch(self, requests: List[ChatRequest]) -> List[ChatResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: List[Optional[ChatResult]] = [None] * len(requests)
+        groups: Dict[Any, List[int]] = {}
+        for index, request in enumerate(requests):
+            key = request.conversation if request.mode == "history" and request.conversation is not None \
+                else ("request", index)
+            groups.setdefault(key, []).append(index)
+
+        async def run_group(indexes: List[int]) -> None:
+            for index in indexes:
+                async with semaphore:
+                    results[index] = await self.arun(requests[index])
+
+        await asyncio.gather(*(run_group(indexes) for indexes in groups.values()))
+        return results
+
+    # 동기 코드에서 공유 이벤트 루프로 배치를 실행합니다.
+    def run_batch(self, requests: List[ChatRequest]) -> List[ChatResult]:
+        return async_runner.run(self.arun_batch(requests))
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+# JSONL 파일(또는 스트림)에서 요청을 읽습니다. 빈 줄은 건너뜁니다.
+def read_requests(lines: Iterable[str], default_mode: str) -> List[ChatRequest]:
+    requests = []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        data.setdefault("id", str(number))
+        requests.append(ChatRequest.from_dict(data, default_mode))
+    return requests
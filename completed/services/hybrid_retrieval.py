@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+# RAG 검색 방식 설정입니다.
+# - "vector": k-NN 벡터 검색만 사용합니다. (기본값)
+# - "hybrid": BM25 키워드 검색과 k-NN 벡터 검색 결과를 합칩니다. (제품 코드, 에러 ID 같은 키워드 질문에 유리합니다.)
+retrieval_mode = "vector"
+
+# 검색 결과를 합치는 방식입니다.
+# - "rrf": reciprocal rank fusion. 점수 대신 순위만 사용하므로 BM25 와 벡터 점수의 scale 차이에 영향을 받지 않습니다.
+# - "weighted": 각 결과의 점수를 min-max 정규화한 뒤 가중합합니다.
+hybrid_fusion = "rrf"
+hybrid_bm25_weight = 0.5
+hybrid_vector_weight = 0.5
+hybrid_rrf_k = 60
+
+# 합치기 전에 각 검색에서 가져올 후보 수의 최솟값입니다. 실제 후보 수는 max(k, hybrid_candidate_k) 입니다.
+hybrid_candidate_k = 20
+
+ScoredDocuments = Sequence[Tuple[Document, float]]
+
+
+def candidate_k(k: int) -> int:
+    return max(k, hybrid_candidate_k)
+
+
+# 같은 chunk 를 찾기 위한 키입니다. chunk ID 와 같이 source 와 내용으로 만듭니다.
+def _doc_key(doc: Document) -> Tuple:
+    return doc.metadata.get("source"), doc.page_content
+
+
+def _rrf_scores(results: ScoredDocuments) -> List[float]:
+    return [1.0 / (hybrid_rrf_k + rank) for rank in range(1, len(results) + 1)]
+
+
+def _min_max_scores(results: ScoredDocuments) -> List[float]:
+    scores = [score for _, score in results]
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+# BM25 검색 결과와 벡터 검색 결과를 하나의 순위로 합쳐서 상위 k 개를 돌려줍니다.
+# - 각 결과는 점수가 높은 순서로 정렬된 (Document, score) 리스트입니다.
+def fuse(bm25_results: ScoredDocuments, vector_results: ScoredDocuments, k: int,
+         fusion: Optional[str] = None, bm25_weight: Optional[float] = None,
+         vector_weight: Optional[float] = None) -> List[Document]:
+    fusion = fusion or hybrid_fusion
+    bm25_weight = hybrid_bm25_weight if bm25_weight is None else bm25_weight
+    vector_weight = hybrid_vector_weight if vector_weight is None else vector_weight
+    if fusion == "rrf":
+        normalize = _rrf_scores
+    elif fusion == "weighted":
+        normalize = _min_max_scores
+    else:
+        raise ValueError(f"Unknown hybrid fusion: {fusion}")
+
+    docs: Dict[Tuple, Document] = {}
+    fused: Dict[Tuple, float] = {}
+    for results, weight in ((bm25_results, bm25_weight), (vector_results, vector_weight)):
+        for (doc, _), score in zip(results, normalize(results)):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + weight * score
+
+    ranked = sorted(fused, key=fused.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
@@ -0,0 +1,266 @@
+import os
+import re
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+
+import services.database_service as db_svc
+import services.query_log as query_log
+from services.sql_executor import table_aliases
+
+# 인덱스 추천 설정입니다.
+# - 쿼리 로그에서 min_count 번 이상 반복된 전체 스캔, 자동 인덱스, 임시 B-tree 정렬을 찾아 CREATE INDEX 를 제안합니다.
+# - 제안한 인덱스는 DB 복사본에만 적용하고, 로그의 쿼리를 다시 실행해서 실행 시간을 비교합니다.
+index_advisor_min_count = 2
+index_advisor_max_indexes = 10
+index_advisor_replay_repeats = 5
+
+_AUTOMATIC_INDEX = re.compile(r"^SEARCH (\w+) USING AUTOMATIC (?:PARTIAL )?(?:COVERING )?INDEX \((.+)\)")
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+_TEMP_B_TREE = re.compile(r"^USE TEMP B-TREE FOR (?:RIGHT PART OF )?(ORDER BY|GROUP BY)")
+_PREDICATE = re.compile(r"(?:\b(\w+)\.)?\b(\w+)\s*(==|=|\bIN\b|\bBETWEEN\b|<=|>=|<(?!>)|>)", re.IGNORECASE)
+_CLAUSE_END = r"(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bHAVING\b|\bLIMIT\b|\bWINDOW\b|$)"
+_WHERE = re.compile(r"\bWHERE\b(.*?)" + _CLAUSE_END, re.IGNORECASE | re.DOTALL)
+_ORDER_BY = re.compile(r"\bORDER\s+BY\b(.*?)" + _CLAUSE_END, re.IGNORECASE | re.DOTALL)
+_GROUP_BY = re.compile(r"\bGROUP\s+BY\b(.*?)" + _CLAUSE_END, re.IGNORECASE | re.DOTALL)
+_COLUMN = re.compile(r"^(?:(\w+)\.)?(\w+)(?:\s+(?:ASC|DESC))?$", re.IGNORECASE)
+_EQUALITY = {"=", "==", "in"}
+
+
+class IndexSuggestion:
+    """
+    A proposed index plus the logged queries that would use it.
+
+    `before_ms`/`after_ms` are filled by `evaluate` with the replayed latency
+    of those queries (weighted by how often they were logged).
+    """
+
+    def __init__(self, table: str, columns: Tuple[str, ...], reason: str) -> None:
+        self.table = table
+        self.columns = columns
+        self.reason = reason
+        self.queries: Dict[str, int] = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.before_ms: Optional[float] = None
+        self.after_ms: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return f"advisor_{self.table}_{'_'.join(self.columns)}".lower()
+
+    def statement(self) -> str:
+        columns = ", ".join(f'"{column}"' for column in self.columns)
+        return f'CREATE INDEX IF NOT EXISTS "{self.name}" ON "{self.table}" ({columns});'
+
+
+def _connect_read_only(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+
+
+# 테이블별 컬럼과 기존 인덱스(컬럼 목록)를 가져옵니다. INTEGER PRIMARY KEY 도 인덱스로 봅니다.
+def _schema(connection: sqlite3.Connection) -> Tuple[Dict[str, List[str]], Dict[str, List[Tuple[str, ...]]]]:
+    columns, indexes = {}, {}
+    tables = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        info = connection.execute(f'PRAGMA table_info("{table}")').fetchall()
+        columns[table] = [row[1] for row in info]
+        indexes[table] = [tuple(row[1] for row in sorted(info, key=lambda row: row[5]) if row[5])]
+        for index in connection.execute(f'PRAGMA index_list("{table}")').fetchall():
+            indexes[table].append(tuple(row[2] for row in connection.execute(f'PRAGMA index_info("{index[1]}")')))
+    return columns, indexes
+
+
+# 컬럼 참조(별칭.컬럼 또는 컬럼)를 테이블 이름으로 바꿉니다. 어느 테이블인지 알 수 없으면 None 입니다.
+def _resolve(qualifier: Optional[str], column: str, aliases: Dict[str, str],
+             columns: Dict[str, List[str]]) -> Optional[str]:
+    if qualifier:
+        table = aliases.get(qualifier, qualifier)
+        return table if column in columns.get(table, []) else None
+    candidates = {table for table in aliases.values() if column in columns.get(table, [])}
+    return candidates.pop() if len(candidates) == 1 else None
+
+
+# WHERE 절에서 테이블별로 인덱스에 쓸 수 있는 조건 컬럼을 찾습니다. (같음 조건을 앞에, 범위 조건은 하나만)
+def _predicate_columns(sql: str, aliases: Dict[str, str], columns: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    where = _WHERE.search(sql)
+    if not where:
+        return {}
+    equality: Dict[str, List[str]] = {}
+    ranges: Dict[str, List[str]] = {}
+    for qualifier, column, operator in _PREDICATE.findall(where.group(1)):
+        table = _resolve(qualifier, column, aliases, columns)
+        if table is None:
+            continue
+        target = equality if operator.lower() in _EQUALITY else ranges
+        if column not in target.setdefault(table, []):
+            target[table].append(column)
+    result = {}
+    for table in set(equality) | set(ranges):
+        eq = equality.get(table, [])
+        rng = [column for column in ranges.get(table, []) if column not in eq]
+        result[table] = eq + rng[:1]
+    return result
+
+
+# ORDER BY / GROUP BY 의 컬럼이 모두 한 테이블의 컬럼이면 (테이블, 컬럼들) 을 돌려줍니다.
+def _sort_columns(clause: re.Pattern, sql: str, aliases: Dict[str, str],
+                  columns: Dict[str, List[str]]) -> Optional[Tuple[str, List[str]]]:
+    match = clause.search(sql)
+    if not match:
+        return None
+    tables, names = set(), []
+    for item in match.group(1).split(","):
+        column = _COLUMN.match(item.strip())
+        if not column:
+            return None
+        table = _resolve(column.group(1), column.group(2), aliases, columns)
+        if table is None:
+            return None
+        tables.add(table)
+        names.append(column.group(2))
+    return (tables.pop(), names) if len(tables) == 1 else None
+
+
+# 한 쿼리의 실행 계획에서 인덱스 후보를 찾습니다.
+def _candidates(entry: Dict, columns: Dict[str, List[str]]) -> List[Tuple[str, Tuple[str, ...], str]]:
+    sql = entry["sql"]
+    aliases = table_aliases(sql)
+    predicates = _predicate_columns(sql, aliases, columns)
+    candidates = []
+    for detail in entry.get("plan", []):
+        automatic = _AUTOMATIC_INDEX.match(detail)
+        if automatic:
+            table = aliases.get(automatic.group(1), automatic.group(1))
+            names = tuple(re.split(r"[=<>]", term)[0] for term in automatic.group(2).split(" AND "))
+            if table in columns and all(name in columns[table] for name in names):
+                candidates.append((table, names, "automatic index"))
+            continue
+        scan = _FULL_SCAN.match(detail)
+        if scan:
+            table = aliases.get(scan.group(1), scan.group(1))
+            if predicates.get(table):
+                candidates.append((table, tuple(predicates[table]), "full scan"))
+            continue
+        temp = _TEMP_B_TREE.match(detail)
+        if temp:
+            clause = _ORDER_BY if temp.group(1) == "ORDER BY" else _GROUP_BY
+            sort = _sort_columns(clause, sql, aliases, columns)
+            if sort:
+                table, names = sort
+                leading = [column for column in predicates.get(table, []) if column not in names]
+                candidates.append((table, tuple(leading + names), f"temp b-tree for {temp.group(1).lower()}"))
+    return candidates
+
+
+# 기존 인덱스가 같은 컬럼들로 시작하면 새 인덱스가 필요 없습니다.
+def _covered(names: Tuple[str, ...], existing: List[Tuple[str, ...]]) -> bool:
+    return any(index[:len(names)] == names for index in existing)
+
+
+# 쿼리 로그를 모아서 인덱스를 제안합니다.
+# - 실패한 쿼리는 제외하고, min_count 번 이상 나온 후보를 쿼리 실행 시간 합계 순으로 정렬합니다.
+# - 다른 후보의 앞부분과 같은 후보는 더 긴 후보에 합칩니다.
+def analyze(entries: List[Dict], path: Optional[str] = None, min_count: Optional[int] = None,
+            max_indexes: Optional[int] = None) -> List[IndexSuggestion]:
+    path = path or db_svc.get_sqlite_path(db_svc.database_uri)
+    min_count = index_advisor_min_count if min_count is None else min_count
+    max_indexes = max_indexes or index_advisor_max_indexes
+    with closing(_connect_read_only(path)) as connection:
+        columns, indexes = _schema(connection)
+
+    suggestions: Dict[Tuple[str, Tuple[str, ...]], IndexSuggestion] = {}
+    for entry in entries:
+        if entry.get("error_code"):
+            continue
+        for table, names, reason in _candidates(entry, columns):
+            if _covered(names, indexes.get(table, [])):
+                continue
+            suggestion = suggestions.setdefault((table, names), IndexSuggestion(table, names, reason))
+            suggestion.count += 1
+            suggestion.total_ms += entry["elapsed_ms"]
+            suggestion.queries[entry["sql"]] = suggestion.queries.get(entry["sql"], 0) + 1
+
+    for key, suggestion in list(suggestions.items()):
+        longer = [other for other in suggestions.values() if other is not suggestion
+                  and other.table == suggestion.table and len(other.columns) > len(suggestion.columns)
+                  and other.columns[:len(suggestion.columns)] == suggestion.columns]
+        if longer:
+            target = max(longer, key=lambda other: other.count)
+            target.count += suggestion.count
+            target.total_ms += suggestion.total_ms
+            for sql, count in suggestion.queries.items():
+                target.queries[sql] = target.queries.get(sql, 0) + count
+            del suggestions[key]
+
+    ranked = sorted((s for s in suggestions.values() if s.count >= min_count), key=lambda s: s.total_ms, reverse=True)
+    return ranked[:max_indexes]
+
+
+# 제안한 인덱스를 만듭니다. 원본 DB 가 아닌 복사본 경로를 넘겨야 합니다.
+def apply(suggestions: List[IndexSuggestion], path: str) -> None:
+    connection = sqlite3.connect(path)
+    try:
+        for suggestion in suggestions:
+            connection.execute(suggestion.statement())
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _replay(path: str, sql: str, repeats: int) -> float:
+    with closing(_connect_read_only(path)) as connection:
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            connection.execute(sql).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+# DB 복사본에 인덱스를 적용하고 로그의 쿼리를 원본과 복사본에서 다시 실행해서 비교합니다.
+# - 쿼리별 실행 시간은 repeats 번 실행한 중앙값이며, 로그에 나온 횟수만큼 가중합니다.
+def evaluate(suggestions: List[IndexSuggestion], entries: List[Dict], path: Optional[str] = None,
+             repeats: Optional[int] = None) -> Dict:
+    path = path or db_svc.get_sqlite_path(db_svc.database_uri)
+    repeats = repeats or index_advisor_replay_repeats
+    workload: Dict[str, int] = {}
+    for entry in entries:
+        if not entry.get("error_code"):
+            workload[entry["sql"]] = workload.get(entry["sql"], 0) + 1
+
+    workdir = tempfile.mkdtemp()
+    copy = os.path.join(workdir, os.path.basename(path))
+    try:
+        shutil.copy(path, copy)
+        apply(suggestions, copy)
+        queries = []
+        for sql, count in workload.items():
+            before, after = _replay(path, sql, repeats), _replay(copy, sql, repeats)
+            queries.append({"sql": sql, "count": count, "before_ms": before, "after_ms": after})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    timings = {query["sql"]: query for query in queries}
+    for suggestion in suggestions:
+        suggestion.before_ms = sum(timings[sql]["before_ms"] * count for sql, count in suggestion.queries.items())
+        suggestion.after_ms = sum(timings[sql]["after_ms"] * count for sql, count in suggestion.queries.items())
+    return {
+        "queries": queries,
+        "before_ms": sum(query["before_ms"] * query["count"] for query in queries),
+        "after_ms": sum(query["after_ms"] * query["count"] for query in queries),
+    }
+
+
+# 쿼리 로그에서 인덱스를 제안하고 효과를 확인합니다.
+def advise(log_path: Optional[str] = None, path: Optional[str] = None) -> Tuple[List[IndexSuggestion], Dict]:
+    path = path or db_svc.get_sqlite_path(db_svc.database_uri)
+    fingerprint = db_svc.get_database(f"sqlite:///{path}").fingerprint
+    entries = query_log.read(log_path, fingerprint=fingerprint)
+    suggestions = analyze(entries, path)
+    return suggestions, evaluate(suggestions, entries, path)
@@ -0,0 +1,150 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+# k-NN 인덱스 프로파일 설정입니다.
+# - engine / space_type / m / ef_construction / ef_search / shards / replicas 는 OpenSearch 인덱스 매핑과 설정에 그대로 들어갑니다.
+# - data_type 은 벡터 저장 타입입니다. "float"(32bit), "fp16"(faiss SQ 인코더, 메모리 1/2), "byte"(int8, 메모리 1/4)
+# - nprobe 는 로컬 vector store 에서 ef_search 에 해당하는 값입니다. (IVF 에서 검색할 bucket 수)
+# - "default" 는 LangChain 기본 매핑과 같은 HNSW 파라미터입니다.
+index_template_profile = "default"
+index_template_dimension = 1536
+
+index_profiles: Dict[str, Dict] = {
+    "default": {
+        "engine": "nmslib", "space_type": "l2", "m": 16, "ef_construction": 512, "ef_search": 512,
+        "shards": 1, "replicas": 1, "data_type": "float", "nprobe": 16,
+    },
+    "fast": {
+        "engine": "faiss", "space_type": "l2", "m": 16, "ef_construction": 128, "ef_search": 64,
+        "shards": 1, "replicas": 1, "data_type": "float", "nprobe": 4,
+    },
+    "fp16": {
+        "engine": "faiss", "space_type": "l2", "m": 16, "ef_construction": 256, "ef_search": 128,
+        "shards": 1, "replicas": 1, "data_type": "fp16", "nprobe": 8,
+    },
+    "byte": {
+        "engine": "lucene", "space_type": "cosinesimil", "m": 16, "ef_construction": 256, "ef_search": 128,
+        "shards": 1, "replicas": 1, "data_type": "byte", "nprobe": 8,
+    },
+}
+
+# 인덱스 문서의 필드 이름입니다. LangChain OpenSearchVectorSearch 의 기본값과 같습니다.
+vector_field = "vector_field"
+text_field = "text"
+
+_DATA_TYPES = {"float": np.float32, "fp16": np.float16, "byte": np.int8}
+_BYTE_CLIP_SIGMA = 4.0
+
+
+# 프로파일을 가져옵니다. 이름이 없으면 index_template_profile 을 사용합니다.
+def get_profile(name: Optional[str] = None) -> Dict:
+    name = name or index_template_profile
+    if name not in index_profiles:
+        raise ValueError(f"Unknown index profile: {name}")
+    profile = dict(index_profiles[name])
+    validate_profile(profile)
+    return profile
+
+
+# 엔진이 지원하지 않는 벡터 타입 조합을 막습니다.
+def validate_profile(profile: Dict) -> None:
+    data_type = profile["data_type"]
+    if data_type not in _DATA_TYPES:
+        raise ValueError(f"Unknown vector data_type: {data_type}")
+    if data_type == "fp16" and profile["engine"] != "faiss":
+        raise ValueError("fp16 vectors require the faiss engine")
+    if data_type == "byte" and profile["engine"] not in ("lucene", "faiss"):
+        raise ValueError("byte vectors require the lucene or faiss engine")
+
+
+# 프로파일로 OpenSearch 인덱스 생성 body(settings + mappings)를 만듭니다.
+def build_index_body(profile: Optional[Dict] = None, dimension: Optional[int] = None) -> Dict:
+    profile = profile or get_profile()
+    validate_profile(profile)
+
+    # 1. HNSW 파라미터와 벡터 인코딩을 설정합니다.
+    parameters = {"m": profile["m"], "ef_construction": profile["ef_construction"]}
+    if profile["data_type"] == "fp16":
+        parameters["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+
+    vector_mapping = {
+        "type": "knn_vector",
+        "dimension": dimension or index_template_dimension,
+        "method": {
+            "name": "hnsw",
+            "engine": profile["engine"],
+            "space_type": profile["space_type"],
+            "parameters": parameters,
+        },
+    }
+    if profile["data_type"] == "byte":
+        vector_mapping["data_type"] = "byte"
+
+    # 2. shard / replica 수와 검색 시 ef_search 를 설정합니다.
+    # - lucene 엔진은 ef_search 설정을 사용하지 않고 질의의 k 를 후보 수로 사용합니다.
+    index_settings = {
+        "knn": True,
+        "number_of_shards": profile["shards"],
+        "number_of_replicas": profile["replicas"],
+    }
+    if profile["engine"] != "lucene":
+        index_settings["knn.algo_param.ef_search"] = profile["ef_search"]
+
+    # 3. chunk ID 로 삭제할 때 사용하는 metadata.source.keyword 를 명시합니다.
+    return {
+        "settings": {"index": index_settings},
+        "mappings": {
+            "properties": {
+                vector_field: vector_mapping,
+                text_field: {"type": "text"},
+                "metadata": {
+                    "properties": {
+                        "source": {"type": "text", "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}},
+                    }
+                },
+            }
+        },
+    }
+
+
+# 벡터들을 L2 정규화합니다.
+def normalize(vectors) -> np.ndarray:
+    array = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return array / np.where(norms == 0, 1, norms)
+
+
+# byte 양자화에 사용할 scale 을 구합니다.
+# - 정규화된 d 차원 벡터의 각 성분은 대략 표준편차 1/sqrt(d) 이므로, ±4 sigma 를 [-127, 127] 에 맞춥니다.
+# - 차원에만 의존하는 고정 scale 이므로 저장 벡터와 질문 벡터의 내적 순서가 유지됩니다.
+def byte_scale(dimension: int) -> float:
+    return 127.0 / min(1.0, _BYTE_CLIP_SIGMA / np.sqrt(dimension))
+
+
+# 정규화된 float32 벡터를 data_type 으로 양자화합니다.
+def quantize(vectors: np.ndarray, data_type: str) -> np.ndarray:
+    if data_type == "byte":
+        scale = byte_scale(vectors.shape[-1])
+        return np.clip(np.rint(vectors * scale), -127, 127).astype(np.int8)
+    return vectors.astype(_DATA_TYPES[data_type])
+
+
+# 양자화된 벡터를 점수 계산용 float32 로 되돌립니다.
+def dequantize(vectors: np.ndarray, data_type: str) -> np.ndarray:
+    if data_type == "byte":
+        return vectors.astype(np.float32) / byte_scale(vectors.shape[-1])
+    return vectors.astype(np.float32, copy=False)
+
+
+def numpy_dtype(data_type: str):
+    return _DATA_TYPES[data_type]
+
+
+# OpenSearch 로 보낼 벡터를 프로파일에 맞게 변환합니다.
+# - byte 인덱스는 정수 벡터만 받으므로 정규화 후 양자화합니다. float / fp16 은 그대로 보내고 fp16 변환은 엔진이 합니다.
+def to_index_vector(vector, profile: Optional[Dict] = None):
+    profile = profile or get_profile()
+    if profile["data_type"] != "byte":
+        return vector
+    return quantize(normalize(vector), "byte")[0].tolist()
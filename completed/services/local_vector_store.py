@@ -0,0 +1,272 @@
+import json
+import re
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+import services.index_template as index_template
+from services.vector_store import VectorStore
+
+# 로컬 vector store 설정입니다.
+# - 벡터는 정규화된 행렬로 memory-mapped 파일에, 텍스트/metadata 는 SQLite 에 저장합니다.
+# - 벡터 저장 타입(float / fp16 / byte)과 nprobe 는 index_template 프로파일을 따릅니다.
+# - 살아있는 벡터 수가 local_ann_min_rows 이상이면 IVF 근사 인덱스로 후보를 줄인 뒤 점수로 정렬합니다.
+local_vector_store_dir = os.path.join(".cache", "vector_store")
+local_ann_enabled = True
+local_ann_min_rows = 20_000
+local_ann_rebuild_ratio = 0.2
+
+_INITIAL_ROWS = 1024
+_WORD = re.compile(r"\w+")
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate index over a normalized vector matrix.
+
+    Rows are bucketed by their nearest of ~sqrt(N) k-means centroids; a query
+    only scores rows in its `nprobe` closest buckets.
+    """
+
+    def __init__(self, vectors: np.ndarray, rows: np.ndarray, iterations: int = 8, seed: int = 0) -> None:
+        rng = np.random.default_rng(seed)
+        nlist = max(1, int(np.sqrt(len(rows))))
+        centroids = vectors[rng.choice(len(rows), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = vectors[assignment == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm else centroid
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+
+        self.centroids = centroids
+        self.lists = [rows[assignment == c] for c in range(nlist)]
+        self.size = len(rows)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = min(nprobe, len(self.lists))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.lists[p] for p in probes])
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store with brute-force cosine search over a
+    memory-mapped matrix, persisted under `path`.
+
+    Vectors are stored as float32, float16 or int8 depending on `data_type`;
+    the type is fixed when the first vector is added.
+    """
+
+    def __init__(self, path: Optional[str] = None, data_type: Optional[str] = None,
+                 ann_min_rows: Optional[int] = None, nprobe: Optional[int] = None) -> None:
+        profile = index_template.get_profile()
+        self.path = path or local_vector_store_dir
+        self.data_type = data_type or profile["data_type"]
+        self.ann_min_rows = local_ann_min_rows if ann_min_rows is None else ann_min_rows
+        self.nprobe = nprobe or profile["nprobe"]
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(self.path, "chunks.sqlite3"), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                row INTEGER NOT NULL UNIQUE,
+                source TEXT,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text);
+        """)
+        # 키워드 검색 테이블이 없던 이전 버전의 저장소는 한 번 채워줍니다. (chunks_fts 의 rowid 는 벡터 행 번호입니다.)
+        if self._db.execute("SELECT NOT EXISTS (SELECT 1 FROM chunks_fts) AND EXISTS (SELECT 1 FROM chunks)").fetchone()[0]:
+            self._db.execute("INSERT INTO chunks_fts (rowid, text) SELECT row, text FROM chunks")
+        self._db.commit()
+        self._matrix: Optional[np.memmap] = None
+        self._alive: Optional[np.ndarray] = None
+        self._ivf: Optional[IVFIndex] = None
+        self._unindexed: set = set()
+        self._load()
+
+    # 저장된 벡터 행렬과 살아있는 행 목록을 불러옵니다.
+    def _load(self) -> None:
+        dim = self._get_meta("dim")
+        if dim is None:
+            return
+        self.data_type = self._get_meta("data_type") or "float"
+        self._open_matrix(int(dim))
+        self._alive = np.zeros(self._matrix.shape[0], dtype=bool)
+        rows = [row for (row,) in self._db.execute("SELECT row FROM chunks")]
+        self._alive[rows] = True
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _vectors_path(self) -> str:
+        suffix = "f32" if self.data_type == "float" else self.data_type
+        return os.path.join(self.path, f"vectors.{suffix}")
+
+    def _open_matrix(self, dim: int, min_rows: int = 0) -> None:
+        file_path = self._vectors_path()
+        dtype = index_template.numpy_dtype(self.data_type)
+        row_bytes = dim * np.dtype(dtype).itemsize
+        rows = os.path.getsize(file_path) // row_bytes if os.path.exists(file_path) else 0
+        if rows < max(min_rows, 1):
+            rows = max(min_rows, rows * 2, _INITIAL_ROWS)
+            if self._matrix is not None:
+                self._matrix.flush()
+            with open(file_path, "ab") as f:
+                f.truncate(rows * row_bytes)
+        self._matrix = np.memmap(file_path, dtype=dtype, mode="r+", shape=(rows, dim))
+        if self._alive is not None and len(self._alive) < rows:
+            self._alive = np.concatenate([self._alive, np.zeros(rows - len(self._alive), dtype=bool)])
+
+    def index_exists(self) -> bool:
+        with self._lock:
+            return self._alive is not None and bool(self._alive.any())
+
+    def create_index(self) -> None:
+        pass
+
+    def delete_index(self) -> None:
+        with self._lock:
+            self._db.executescript("DELETE FROM chunks; DELETE FROM meta; DELETE FROM chunks_fts;")
+            self._db.commit()
+            self._matrix = None
+            self._alive = None
+            self._ivf = None
+            self._unindexed.clear()
+            file_path = self._vectors_path()
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def get_ids_by_source(self, source: str) -> set:
+        with self._lock:
+            return {chunk_id for (chunk_id,) in self._db.execute("SELECT id FROM chunks WHERE source = ?", (source,))}
+
+    def add(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict]) -> None:
+        if not ids:
+            return
+        array = index_template.quantize(index_template.normalize(vectors), self.data_type)
+
+        with self._lock:
+            if self._matrix is None:
+                self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                     [("dim", str(array.shape[1])), ("data_type", self.data_type)])
+                self._alive = np.zeros(0, dtype=bool)
+                self._open_matrix(array.shape[1])
+            elif array.shape[1] != self._matrix.shape[1]:
+                raise ValueError(f"Vector dimension {array.shape[1]} does not match index dimension "
+                                 f"{self._matrix.shape[1]}")
+
+            existing = dict(self._db.execute(
+                f"SELECT id, row FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall())
+            free_rows = iter(np.flatnonzero(~self._alive).tolist())
+            rows = []
+            for chunk_id in ids:
+                row = existing.get(chunk_id)
+                if row is None:
+                    row = next(free_rows, None)
+                    if row is None:
+                        # 빈 행이 없으면 행렬을 늘리고 늘어난 행들을 빈 행으로 사용합니다.
+                        size = len(self._alive)
+                        self._open_matrix(self._matrix.shape[1], size + 1)
+                        free_rows = iter(range(size, len(self._alive)))
+                        row = next(free_rows)
+                    self._alive[row] = True
+                    existing[chunk_id] = row
+                rows.append(row)
+
+            self._matrix[rows] = array
+            self._matrix.flush()
+            self._unindexed.update(rows)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (id, row, source, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                [(chunk_id, row, metadata.get("source"), text, json.dumps(metadata, default=str, ensure_ascii=False))
+                 for chunk_id, row, text, metadata in zip(ids, rows, texts, metadatas)])
+            self._db.executemany("DELETE FROM chunks_fts WHERE rowid = ?", [(row,) for row in rows])
+            self._db.executemany("INSERT INTO chunks_fts (rowid, text) VALUES (?, ?)", zip(rows, texts))
+            self._db.commit()
+
+    def delete(self, ids: List[str]) -> int:
+        ids = list(ids)
+        if not ids:
+            return 0
+        with self._lock:
+            rows = [row for (row,) in self._db.execute(
+                f"SELECT row FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids)]
+            self._db.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in ids])
+            self._db.executemany("DELETE FROM chunks_fts WHERE rowid = ?", [(row,) for row in rows])
+            self._db.commit()
+            if rows:
+                self._alive[rows] = False
+                self._unindexed.difference_update(rows)
+            return len(rows)
+
+    # 질문 벡터와 코사인 유사도가 가장 높은 k 개의 chunk 를 가져옵니다.
+    def similarity_search_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(vector, k)]
+
+    def similarity_search_with_score_by_vector(self, vector: List[float], k: int) -> List[tuple]:
+        query = index_template.normalize(vector)[0]
+
+        with self._lock:
+            if not self.index_exists():
+                return []
+            candidates = self._candidate_rows(query)
+            scores = index_template.dequantize(self._matrix[candidates], self.data_type) @ query
+            top = np.argsort(-scores)[:k] if len(candidates) <= k else np.argpartition(-scores, k)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows = [int(candidates[i]) for i in top]
+            return [(doc, float(scores[i])) for doc, i in zip(self._documents_by_rows(rows), top)]
+
+    # SQLite FTS5 의 BM25 로 질문의 단어가 들어있는 chunk 를 찾습니다.
+    # - 단어들을 OR 로 묶으므로 OpenSearch 의 match 질의와 같이 일부 단어만 있어도 검색됩니다.
+    # - FTS5 의 bm25() 는 낮을수록 관련도가 높으므로 부호를 바꿔서 돌려줍니다.
+    def keyword_search_with_score(self, query: str, k: int) -> List[tuple]:
+        terms = _WORD.findall(query)
+        if not terms:
+            return []
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        with self._lock:
+            hits = self._db.execute(
+                "SELECT c.text, c.metadata, bm25(chunks_fts) AS score FROM chunks_fts "
+                "JOIN chunks c ON c.row = chunks_fts.rowid WHERE chunks_fts MATCH ? "
+                "ORDER BY score LIMIT ?", (match, k)).fetchall()
+        return [(Document(page_content=text, metadata=json.loads(metadata)), -score) for text, metadata, score in hits]
+
+    # 검색할 후보 행을 고릅니다. 작은 인덱스는 전체를, 큰 인덱스는 IVF 로 고른 행과 아직 인덱싱되지 않은 행을 사용합니다.
+    def _candidate_rows(self, query: np.ndarray) -> np.ndarray:
+        alive_rows = np.flatnonzero(self._alive)
+        if not local_ann_enabled or len(alive_rows) < self.ann_min_rows:
+            return alive_rows
+
+        if self._ivf is None or len(self._unindexed) > local_ann_rebuild_ratio * self._ivf.size:
+            self._ivf = IVFIndex(index_template.dequantize(self._matrix[alive_rows], self.data_type), alive_rows)
+            self._unindexed.clear()
+        candidates = np.union1d(self._ivf.candidates(query, self.nprobe),
+                                np.fromiter(self._unindexed, dtype=np.int64, count=len(self._unindexed)))
+        return candidates[self._alive[candidates]]
+
+    def _documents_by_rows(self, rows: List[int]) -> List[Document]:
+        if not rows:
+            return []
+        found: Dict[int, Document] = {}
+        for row, text, metadata in self._db.execute(
+                f"SELECT row, text, metadata FROM chunks WHERE row IN ({','.join('?' * len(rows))})", rows):
+            found[row] = Document(page_content=text, metadata=json.loads(metadata))
+        return [found[row] for row in rows if row in found]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._alive.sum()) if self._alive is not None else 0
@@ -1,11 +1,33 @@
-import boto3
-import pdfplumber
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional
+
 from datetime import datetime
 from langchain_community.vectorstores import OpenSearchVectorSearch
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from langchain_community.embeddings import BedrockEmbeddings
+from opensearchpy import AsyncHttpConnection, AsyncOpenSearch, OpenSearch, RequestError, RequestsHttpConnection
+from opensearchpy.helpers import bulk, scan
 from langchain_core.documents import Document
 
+import services.bedrock_service as bedrock_svc
+import services.chunking_service as chunking_svc
+import services.embedding_service as embedding_svc
+import services.hybrid_retrieval as hybrid_retrieval
+import services.index_template as index_template
+import services.pdf_service as pdf_svc
+import services.pipeline as pipeline
+import services.retrieval_cache as retrieval_cache
+import services.tracing as tracing
+import services.vector_store as vector_store
+from services.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
 # OpenSearch 정보를 설정합니다.
 opensearch_user_id = "techcamp2024"
 opensearch_user_password = "Passw0rd1!"
@@ -15,122 +37,565 @@ opensearch_domain_name = "genai-techcamp-2024"
 opensearch_index_name = "genai-techcamp-2024-index"
 
 
+# OpenSearch 커넥션 풀 설정입니다.
+# - pool_maxsize 는 동시에 유지할 keep-alive 커넥션 수입니다. 동시 세션 수에 맞춰서 조정합니다.
+opensearch_pool_maxsize = 16
+opensearch_timeout = 30
+
+# 문서를 저장할 때 한 번의 bulk 요청에 담을 Document 수입니다.
+opensearch_bulk_size = 100
+
+# 프로세스 전체에서 공유하는 OpenSearch Client 와 인덱스 상태 캐시입니다.
+_client_lock = threading.Lock()
+_opensearch_client = None
+_opensearch_vector_clients = {}
+_async_opensearch_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenSearch]" = \
+    weakref.WeakKeyDictionary()
+
+_index_state_lock = threading.Lock()
+_index_generation = 0
+_index_state_cache = {}
+
+
 # OpenSearch Client 를 생성합니다.
+# - 최초 호출시에만 생성하고 이후에는 커넥션 풀을 가진 같은 Client 를 재사용합니다.
 def get_opensearch_client():
-    return OpenSearch(
-        hosts=[
-            {'host': opensearch_domain_endpoint.replace("https://", ""),
-             'port': 443
-             }
-        ],
-        http_auth=(opensearch_user_id, opensearch_user_password),  # Master username, Master password,
-        use_ssl=True,
-        verify_certs=True,
-        connection_class=RequestsHttpConnection
-    )
+    global _opensearch_client
+    if _opensearch_client is not None:
+        return _opensearch_client
+
+    with _client_lock:
+        if _opensearch_client is None:
+            _opensearch_client = OpenSearch(
+                hosts=[
+                    {'host': opensearch_domain_endpoint.replace("https://", ""),
+                     'port': 443
+                     }
+                ],
+                http_auth=(opensearch_user_id, opensearch_user_password),  # Master username, Master password,
+                use_ssl=True,
+                verify_certs=True,
+                connection_class=RequestsHttpConnection,
+                pool_maxsize=opensearch_pool_maxsize,
+                timeout=opensearch_timeout,
+            )
+    return _opensearch_client
+
+
+# 비동기 OpenSearch Client 를 가져옵니다.
+# - 비동기 Client 의 커넥션 풀은 이벤트 루프에 묶이므로 루프별로 한 번만 생성합니다.
+# - 루프는 약한 참조로 들고 있으므로, 없어진 루프의 Client 는 캐시에서 같이 빠집니다.
+def get_async_opensearch_client() -> AsyncOpenSearch:
+    loop = asyncio.get_running_loop()
+    client = _async_opensearch_clients.get(loop)
+    if client is not None:
+        return client
+
+    with _client_lock:
+        client = _async_opensearch_clients.get(loop)
+        if client is None:
+            client = AsyncOpenSearch(
+                hosts=[
+                    {'host': opensearch_domain_endpoint.replace("https://", ""),
+                     'port': 443
+                     }
+                ],
+                http_auth=(opensearch_user_id, opensearch_user_password),
+                use_ssl=True,
+                verify_certs=True,
+                connection_class=AsyncHttpConnection,
+                maxsize=opensearch_pool_maxsize,
+                timeout=opensearch_timeout,
+            )
+            _async_opensearch_clients[loop] = client
+    return client
+
+
+# 비동기 Client 를 자신이 만들어진 이벤트 루프에서 닫습니다. (aiohttp 세션은 그 루프에서만 닫을 수 있습니다.)
+# - 실행 중인 루프에는 close 를 예약만 하고, 멈춰 있는 루프는 close 가 끝날 때까지 실행합니다.
+def _close_async_opensearch_client(loop: asyncio.AbstractEventLoop, client: AsyncOpenSearch) -> None:
+    if loop.is_closed():
+        return
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+    else:
+        loop.run_until_complete(client.close())
+
+
+# 공유 Client 를 닫고 캐시를 비웁니다. 설정을 바꾼 뒤 다시 연결할 때 사용합니다.
+def reset_opensearch_clients():
+    global _opensearch_client
+    with _client_lock:
+        if _opensearch_client is not None:
+            _opensearch_client.close()
+        _opensearch_client = None
+        _opensearch_vector_clients.clear()
+        async_clients = list(_async_opensearch_clients.items())
+        _async_opensearch_clients.clear()
+    for loop, client in async_clients:
+        _close_async_opensearch_client(loop, client)
+    invalidate_index_state()
+
+
+# 현재 인덱스 generation 을 가져옵니다.
+# - 인덱스가 생성되거나 삭제될 때마다 1씩 증가하므로 다른 캐시의 무효화 기준으로 사용할 수 있습니다.
+def get_index_generation() -> int:
+    return _index_generation
+
+
+# 인덱스 상태 캐시를 무효화하고 generation 을 증가시킵니다.
+def invalidate_index_state():
+    global _index_generation
+    with _index_state_lock:
+        _index_generation += 1
+        _index_state_cache.clear()
 
 
-# OpenSearch 에 인덱스가 있는지 확인합니다.
+# 인덱스 상태 캐시를 조회합니다. (캐시 적중 여부, 값, 조회 시점의 generation) 을 돌려줍니다.
+def _read_index_state(key: str):
+    with _index_state_lock:
+        return key in _index_state_cache, _index_state_cache.get(key), _index_generation
+
+
+# 조회하는 동안 인덱스가 바뀌지 않았을 때만 값을 캐시에 넣습니다.
+def _store_index_state(key: str, value, generation: int):
+    with _index_state_lock:
+        if generation == _index_generation:
+            _index_state_cache[key] = value
+
+
+# 인덱스 상태를 캐시에서 가져오고, 없으면 loader 를 호출해서 채웁니다.
+def _get_cached_index_state(key: str, loader):
+    hit, value, generation = _read_index_state(key)
+    if hit:
+        return value
+    value = loader()
+    _store_index_state(key, value, generation)
+    return value
+
+
+async def _aget_cached_index_state(key: str, loader):
+    hit, value, generation = _read_index_state(key)
+    if hit:
+        return value
+    value = await loader()
+    _store_index_state(key, value, generation)
+    return value
+
+
+# 설정된 vector store 에 인덱스가 있는지 확인합니다.
 def check_if_index_exists() -> bool:
-    os_client = get_opensearch_client()
-    exists = os_client.indices.exists(opensearch_index_name)
-    return exists
+    backend = vector_store.vector_store_backend
+    with tracing.span("index_exists", backend=backend):
+        return _get_cached_index_state(f"exists:{backend}",
+                                       lambda: vector_store.get_vector_store(backend).index_exists())
+
 
+async def acheck_if_index_exists() -> bool:
+    backend = vector_store.vector_store_backend
+    with tracing.span("index_exists", backend=backend):
+        return await _aget_cached_index_state(f"exists:{backend}",
+                                              lambda: vector_store.get_vector_store(backend).aindex_exists())
 
-# OpenSearch 에 인덱스를 생성합니다.
+
+# 설정된 vector store 에 인덱스를 생성합니다.
 def create_index():
-    os_client = get_opensearch_client()
-    os_client.indices.create(index=opensearch_index_name)
+    try:
+        vector_store.get_vector_store().create_index()
+    finally:
+        invalidate_index_state()
 
 
-# OpenSearch 에 인덱스를 삭제합니다.
+# 설정된 vector store 의 인덱스를 삭제합니다.
 def delete_index():
-    os_client = get_opensearch_client()
-    return os_client.indices.delete(index=opensearch_index_name)
+    try:
+        return vector_store.get_vector_store().delete_index()
+    finally:
+        invalidate_index_state()
 
 
 # OpenSearch 에 인덱스 리스트를 가져옵니다.
 def get_index_list():
-    os_client = get_opensearch_client()
-    return os_client.indices.get_alias(index=opensearch_index_name)
+    def load():
+        os_client = get_opensearch_client()
+        return os_client.indices.get_alias(index=opensearch_index_name)
+
+    return _get_cached_index_state("alias", load)
 
 
 # OpenSearchVectorSearch Client 를 생성합니다.
-def get_opensearch_vector_client():
-    # BedrockEmbeddings 클래스를 생성합니다.
-    embedding = BedrockEmbeddings(
-        client=boto3.client(service_name='bedrock-runtime'),
-        model_id="amazon.titan-embed-g1-text-02"
-    )
+# - 인덱스 이름별로 한 번만 생성하고, 내부 Client 는 공유 커넥션 풀을 사용하도록 교체합니다.
+def get_opensearch_vector_client(index_name: str = opensearch_index_name):
+    osv_client = _opensearch_vector_clients.get(index_name)
+    if osv_client is not None:
+        return osv_client
 
-    # OpenSearchVectorSearch 클래스를 생성합니다.
-    return OpenSearchVectorSearch(
-        opensearch_url=opensearch_domain_endpoint,
-        index_name=opensearch_index_name,
-        embedding_function=embedding,
-        is_aoss=False,
-        connection_class=RequestsHttpConnection,
-        http_auth=(opensearch_user_id, opensearch_user_password),
-    )
+    with _client_lock:
+        osv_client = _opensearch_vector_clients.get(index_name)
+        if osv_client is None:
+            # 공유 bedrock-runtime Client 를 사용하는 BedrockEmbeddings 를 가져옵니다.
+            embedding = bedrock_svc.get_embeddings()
+
+            # OpenSearchVectorSearch 클래스를 생성합니다.
+            osv_client = OpenSearchVectorSearch(
+                opensearch_url=opensearch_domain_endpoint,
+                index_name=index_name,
+                embedding_function=embedding,
+                is_aoss=False,
+                connection_class=RequestsHttpConnection,
+                http_auth=(opensearch_user_id, opensearch_user_password),
+                pool_maxsize=opensearch_pool_maxsize,
+            )
+            _opensearch_vector_clients[index_name] = osv_client
+
+    if osv_client.client is not _opensearch_client:
+        osv_client.client = get_opensearch_client()
+    return osv_client
+
+
+class OpenSearchVectorStore(VectorStore):
+    """
+    VectorStore backed by the OpenSearch domain configured in this module.
+
+    The index is created from an index_template profile (HNSW parameters,
+    engine, shards and vector data type) instead of LangChain's default mapping.
+    """
+
+    def __init__(self, index_name: Optional[str] = None, profile: Optional[str] = None) -> None:
+        self.index_name = index_name or opensearch_index_name
+        self.profile = index_template.get_profile(profile)
+        self._index_ready = False
+
+    def index_exists(self) -> bool:
+        return get_opensearch_client().indices.exists(self.index_name)
+
+    # 프로파일로 만든 매핑으로 인덱스를 생성합니다.
+    def create_index(self, dimension: Optional[int] = None) -> None:
+        body = index_template.build_index_body(self.profile, dimension)
+        get_opensearch_client().indices.create(index=self.index_name, body=body)
+        self._index_ready = True
 
+    def delete_index(self):
+        self._index_ready = False
+        return get_opensearch_client().indices.delete(index=self.index_name)
 
-# PDF 파일을 읽어서 페이지 단위로 chunk 를 나눠서 Document 를 만들고 OpenSearch 에 저장합니다.
-def create_index_from_pdf_file(uploaded_file):
-    print(f"current_pdf_file : {uploaded_file}")
+    # 처음 저장하기 전에 인덱스가 없으면 벡터 차원에 맞춰서 생성합니다.
+    # - 다른 프로세스가 먼저 만든 경우(resource_already_exists_exception)는 그대로 사용합니다.
+    def _ensure_index(self, dimension: int) -> None:
+        if self._index_ready:
+            return
+        if not self.index_exists():
+            try:
+                self.create_index(dimension)
+            except RequestError as e:
+                if e.error != "resource_already_exists_exception":
+                    raise
+        self._index_ready = True
 
-    # 1. 사용될 변수를 정의하고 사용할 파일 이름과 타입을 추출합니다.
-    docs = []
-    source_name = uploaded_file.name.split('/')[-1]
+    def get_ids_by_source(self, source: str) -> set:
+        hits = scan(
+            get_opensearch_client(),
+            index=self.index_name,
+            query={"query": {"term": {"metadata.source.keyword": source}}, "_source": False},
+        )
+        return {hit["_id"] for hit in hits}
+
+    # chunk ID 를 문서 _id 로 사용하므로 같은 chunk 를 다시 저장하면 덮어쓰게 됩니다.
+    def add(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict]) -> None:
+        self._ensure_index(len(vectors[0]))
+        vectors = [index_template.to_index_vector(vector, self.profile) for vector in vectors]
+        get_opensearch_vector_client(self.index_name).add_embeddings(
+            text_embeddings=list(zip(texts, vectors)),
+            metadatas=metadatas,
+            ids=ids,
+            bulk_size=max(len(ids), opensearch_bulk_size),
+        )
+
+    def delete(self, ids: List[str]) -> int:
+        os_client = get_opensearch_client()
+        actions = ({"_op_type": "delete", "_index": self.index_name, "_id": _id} for _id in ids)
+        deleted, _ = bulk(os_client, actions, raise_on_error=False)
+        os_client.indices.refresh(index=self.index_name)
+        return deleted
+
+    def similarity_search_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        return get_opensearch_vector_client(self.index_name).similarity_search_by_vector(
+            index_template.to_index_vector(vector, self.profile),
+            k=k,
+        )
+
+    def _keyword_query(self, query: str, k: int) -> dict:
+        return {"size": k, "_source": {"excludes": [index_template.vector_field]},
+                "query": {"match": {index_template.text_field: {"query": query}}}}
+
+    def _knn_query(self, vector: List[float], k: int) -> dict:
+        return {"size": k, "_source": {"excludes": [index_template.vector_field]},
+                "query": {"knn": {index_template.vector_field: {
+                    "vector": index_template.to_index_vector(vector, self.profile), "k": k}}}}
+
+    @staticmethod
+    def _scored_documents(response: dict) -> List[tuple]:
+        if "error" in response:
+            raise RuntimeError(f"OpenSearch search failed: {response['error']}")
+        return [(Document(page_content=hit["_source"].get(index_template.text_field, ""),
+                          metadata=hit["_source"].get("metadata", {})), hit["_score"])
+                for hit in response["hits"]["hits"]]
+
+    def similarity_search_with_score_by_vector(self, vector: List[float], k: int) -> List[tuple]:
+        response = get_opensearch_client().search(index=self.index_name, body=self._knn_query(vector, k))
+        return self._scored_documents(response)
+
+    def keyword_search_with_score(self, query: str, k: int) -> List[tuple]:
+        response = get_opensearch_client().search(index=self.index_name, body=self._keyword_query(query, k))
+        return self._scored_documents(response)
+
+    # BM25 match 질의와 k-NN 질의를 한 번의 _msearch 요청으로 보내고 결과를 합칩니다.
+    def hybrid_search(self, query: str, vector: List[float], k: int) -> List[Document]:
+        depth = hybrid_retrieval.candidate_k(k)
+        header = {"index": self.index_name}
+        body = [header, self._keyword_query(query, depth), header, self._knn_query(vector, depth)]
+        bm25_response, knn_response = get_opensearch_client().msearch(body=body)["responses"]
+        return hybrid_retrieval.fuse(self._scored_documents(bm25_response), self._scored_documents(knn_response), k)
+
+    async def aindex_exists(self) -> bool:
+        return await get_async_opensearch_client().indices.exists(index=self.index_name)
+
+    async def asimilarity_search_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        response = await get_async_opensearch_client().search(index=self.index_name, body=self._knn_query(vector, k))
+        return [doc for doc, _ in self._scored_documents(response)]
+
+    async def ahybrid_search(self, query: str, vector: List[float], k: int) -> List[Document]:
+        depth = hybrid_retrieval.candidate_k(k)
+        header = {"index": self.index_name}
+        body = [header, self._keyword_query(query, depth), header, self._knn_query(vector, depth)]
+        bm25_response, knn_response = (await get_async_opensearch_client().msearch(body=body))["responses"]
+        return hybrid_retrieval.fuse(self._scored_documents(bm25_response), self._scored_documents(knn_response), k)
+
+
+# PDF 페이지를 하나씩 읽어서 페이지 단위 Document 를 만듭니다.
+# - 텍스트 추출 방식(한 프로세스 / 여러 프로세스)은 pdf_service 의 설정을 따릅니다.
+# - 문단/문장 경계를 chunker 가 사용할 수 있도록 줄바꿈은 그대로 둡니다.
+def iter_pdf_documents(path: str, source_name: str, type_name: str, total_pages: Optional[int] = None) -> Iterator[Document]:
+    for page_number, page_text in pdf_svc.iter_page_texts(path, total_pages=total_pages, source=source_name):
+        yield Document(
+            page_content=page_text,
+            metadata={
+                "source": source_name,
+                "type": type_name,
+                "page": page_number,
+                "timestamp": datetime.now()
+            }
+        )
+
+
+# PDF 파일을 읽어서 chunk 를 나눠서 Document 를 만들고 설정된 vector store 에 저장합니다.
+# - chunk 를 나누는 방식은 chunking_service 의 설정을 따릅니다.
+# - 텍스트 추출/chunking → 임베딩 → bulk 저장이 bounded 큐로 연결되어 동시에 진행됩니다.
+# - on_progress(done, total) 는 처리한 페이지 수와 전체 페이지 수로 호출됩니다.
+def create_index_from_pdf_file(uploaded_file, on_progress: Optional[Callable[[int, Optional[int]], None]] = None):
+    logger.info("current_pdf_file : %s", uploaded_file)
+
+    # 1. 사용할 파일 이름과 타입을 추출합니다.
+    source_name = os.path.basename(getattr(uploaded_file, "name", None) or os.fspath(uploaded_file))
     type_name = source_name.split('.')[-1]
 
-    # 2. 지정된 경로에서 파일을 읽고 페이지 단위로 chunk 를 나눕니다.
-    with pdfplumber.open(uploaded_file) as pdf:
-        for page_number, page in enumerate(pdf.pages, start=1):
-            page_text = page.extract_text()
-            chunk = Document(
-                page_content=page_text.replace('\n', ' '),
-                metadata={
-                    "source": source_name,
-                    "type": type_name,
-                    "timestamp": datetime.now()
-                }
-            )
-            docs.append(chunk)
+    # 2. 파일을 열고, 백그라운드에서 페이지 단위로 텍스트를 추출해서 chunk 로 나눕니다.
+    with pdf_svc.open_pdf_path(uploaded_file) as path:
+        total_pages = pdf_svc.get_page_count(path)
+        pages = iter_pdf_documents(path, source_name, type_name, total_pages)
+        docs = pipeline.iter_in_background(chunking_svc.iter_chunks(pages), name="pdf-extract")
 
-    # 3. 인덱스를 생성하고 document 를 벡터와 함께 저장합니다.
-    if len(docs) > 0:
-        create_index_from_documents(documents=docs)
+        # 3. 인덱스에 document 를 벡터와 함께 저장합니다. 이미 저장된 같은 파일의 chunk 는 변경분만 반영됩니다.
+        if total_pages > 0:
+            create_index_from_documents(documents=docs, on_progress=on_progress, total=total_pages,
+                                        progress_by_page=True)
 
 
-# OpenSearch 에 Document 리스트를 저장합니다.
-def create_index_from_documents(documents):
-    if check_if_index_exists():
-        delete_index()
+# Document 의 source 와 내용으로 content-addressed chunk ID 를 만듭니다.
+# - 같은 파일의 같은 내용은 항상 같은 ID 를 가지므로 다시 업로드해도 변경된 chunk 만 찾아낼 수 있습니다.
+def get_chunk_id(document: Document) -> str:
+    source = document.metadata.get("source", "")
+    return hashlib.sha256(f"{source}\n{document.page_content}".encode("utf-8")).hexdigest()
 
-    # BedrockEmbeddings 클래스를 생성합니다.
-    embedding = BedrockEmbeddings(
-        client=boto3.client(service_name='bedrock-runtime'),
-        model_id="amazon.titan-embed-g1-text-02"
-    )
 
-    # OpenSearchVectorSearch 클래스를 이용해서 인덱스를 생성하고 document 를 벡터와 함께 저장합니다.
-    return OpenSearchVectorSearch.from_documents(
-        documents=documents,
-        embedding=embedding,
-        opensearch_url=opensearch_domain_endpoint,
-        timeout=300,
-        use_ssl=True,
-        verify_certs=True,
-        connection_class=RequestsHttpConnection,
-        http_auth=(opensearch_user_id, opensearch_user_password),
-        index_name=opensearch_index_name,
-    )
+# vector store 에 저장된 source 의 chunk ID 들을 가져옵니다.
+def get_chunk_ids_by_source(source: str) -> set:
+    if not check_if_index_exists():
+        return set()
+    return vector_store.get_vector_store().get_ids_by_source(source)
+
 
+# vector store 에서 chunk ID 들을 삭제합니다.
+def delete_chunks(ids) -> int:
+    ids = list(ids)
+    if not ids:
+        return 0
+    return vector_store.get_vector_store().delete(ids)
 
-# OpenSearch 에서 vector 유사도를 사용해서 가장 유사한 Document 를 가져옵니다.
-def get_most_similar_docs_by_query(query: str, k: int):
-    osv_client = get_opensearch_vector_client()
-    return osv_client.similarity_search(
-        query,
-        k=k,
+
+# 임베딩이 끝난 (chunk ID, Document, vector) batch 를 vector store 에 저장합니다.
+def _bulk_write_embeddings(store: VectorStore, batch):
+    store.add(
+        ids=[chunk_id for chunk_id, _, _ in batch],
+        texts=[doc.page_content for _, doc, _ in batch],
+        vectors=[vector for _, _, vector in batch],
+        metadatas=[doc.metadata for _, doc, _ in batch],
     )
+
+
+# 설정된 vector store 에 Document 들을 저장합니다.
+# - 인덱스를 지우고 다시 만들지 않고, source 별로 바뀐 chunk 만 추가하거나 삭제합니다.
+# - progress_by_page 이면 chunk 의 마지막 페이지 번호로 진행 상황을 알립니다.
+# - documents 는 generator 여도 되며, 새 chunk 만 병렬로 임베딩하고 완료된 벡터를
+#   opensearch_bulk_size 개씩 모아서 백그라운드 스레드에서 bulk 저장합니다.
+def create_index_from_documents(documents: Iterable[Document],
+                                on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                                total: Optional[int] = None,
+                                progress_by_page: bool = False):
+    start = time.perf_counter()
+    if total is None and hasattr(documents, "__len__"):
+        total = len(documents)
+
+    existing_ids_by_source = {}
+    seen_ids = set()
+    in_flight = deque()
+    stats = {"read": 0, "added": 0, "skipped": 0, "deleted": 0}
+
+    def report_progress(doc: Document):
+        if on_progress:
+            done = stats["added"] + stats["skipped"]
+            if progress_by_page:
+                done = doc.metadata.get("page_end", doc.metadata.get("page", done))
+            on_progress(done, total)
+
+    # 1. chunk ID 를 계산해서 이미 저장된 chunk 와 같은 내용의 중복 chunk 는 건너뜁니다.
+    # - source 가 처음 나올 때 그 source 로 저장된 chunk ID 를 가져옵니다.
+    def iter_new_texts():
+        for doc in documents:
+            stats["read"] += 1
+            chunk_id = get_chunk_id(doc)
+            source = doc.metadata.get("source", "")
+            if source not in existing_ids_by_source:
+                existing_ids_by_source[source] = get_chunk_ids_by_source(source)
+            if chunk_id in seen_ids or chunk_id in existing_ids_by_source[source]:
+                seen_ids.add(chunk_id)
+                stats["skipped"] += 1
+                report_progress(doc)
+                continue
+            seen_ids.add(chunk_id)
+            in_flight.append((chunk_id, doc))
+            yield doc.page_content
+
+    # 2. 설정된 vector store 를 가져옵니다.
+    store = vector_store.get_vector_store()
+
+    # 3. 새 chunk 만 임베딩해서, 임베딩이 끝난 순서대로 batch 를 만들어서 bulk 로 저장합니다.
+    # - 새 버전에서 사라진 chunk 는 삭제합니다.
+    try:
+        with pipeline.BackgroundConsumer(lambda items: _bulk_write_embeddings(store, items),
+                                         maxsize=2, name="bulk-write") as writer:
+            # - 임베딩 결과는 입력 순서대로 나오므로 in_flight 의 맨 앞 chunk 와 짝이 맞습니다.
+            batch = []
+            for _, vector in embedding_svc.iter_embeddings(iter_new_texts()):
+                chunk_id, doc = in_flight.popleft()
+                batch.append((chunk_id, doc, vector))
+                stats["added"] += 1
+                report_progress(doc)
+                if len(batch) >= opensearch_bulk_size:
+                    writer.put(batch)
+                    batch = []
+            if batch:
+                writer.put(batch)
+
+        stale_ids = set().union(*existing_ids_by_source.values()) - seen_ids
+        stats["deleted"] = delete_chunks(stale_ids)
+    finally:
+        if stats["added"] or stats["deleted"]:
+            invalidate_index_state()
+
+    # 4. 처리 결과와 처리량을 로그로 남깁니다.
+    elapsed = time.perf_counter() - start
+    pages = total if progress_by_page and total else stats["read"]
+    logger.info("indexed %d new chunks, skipped %d unchanged, deleted %d stale in %.2fs (%.2f pages/sec)",
+                stats["added"], stats["skipped"], stats["deleted"], elapsed, pages / elapsed if elapsed > 0 else 0)
+    return store
+
+
+# 질문 임베딩을 가져옵니다. 질문 임베딩 캐시에 없으면 계산해서 저장합니다.
+def embed_query(query: str) -> List[float]:
+    model_id = bedrock_svc.bedrock_embedding_model_id
+    with tracing.span("query_embedding") as attributes:
+        vector = retrieval_cache.get_query_embedding(model_id, query)
+        attributes["cached"] = vector is not None
+        if vector is None:
+            vector = bedrock_svc.get_embeddings(model_id).embed_query(query)
+            retrieval_cache.put_query_embedding(model_id, query, vector)
+    return vector
+
+
+async def aembed_query(query: str) -> List[float]:
+    model_id = bedrock_svc.bedrock_embedding_model_id
+    with tracing.span("query_embedding") as attributes:
+        vector = retrieval_cache.get_query_embedding(model_id, query)
+        attributes["cached"] = vector is not None
+        if vector is None:
+            vector = await bedrock_svc.get_embeddings(model_id).aembed_query(query)
+            retrieval_cache.put_query_embedding(model_id, query, vector)
+    return vector
+
+
+def _check_retrieval_mode(mode: str) -> None:
+    if mode not in ("hybrid", "vector"):
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+
+
+# vector store 에서 질문과 가장 관련된 Document 를 가져옵니다.
+# - retrieval_mode 가 "hybrid" 이면 BM25 키워드 검색과 vector 검색 결과를 합치고, "vector" 이면 vector 유사도만 사용합니다.
+# - 같은 질문을 다시 하면 검색 결과 캐시에서 바로 돌려주므로 임베딩 호출과 vector store 검색을 모두 건너뜁니다.
+# - 인덱스가 바뀌어서 검색 결과 캐시가 비워졌어도, 질문 임베딩은 캐시에서 재사용합니다.
+# - 질문 임베딩(vector)을 이미 계산했다면 함께 넘겨서 다시 계산하지 않도록 합니다.
+def get_most_similar_docs_by_query(query: str, k: int, mode: Optional[str] = None,
+                                   vector: Optional[List[float]] = None):
+    # 1. 검색 결과 캐시를 확인합니다.
+    mode = mode or hybrid_retrieval.retrieval_mode
+    _check_retrieval_mode(mode)
+    generation = get_index_generation()
+    docs = retrieval_cache.get_documents(query, k, generation, mode)
+    if docs is not None:
+        return docs
+
+    # 2. 질문 임베딩을 가져옵니다.
+    if vector is None:
+        vector = embed_query(query)
+
+    # 3. 검색하고 결과를 캐시에 저장합니다.
+    store = vector_store.get_vector_store()
+    with tracing.span("search", mode=mode, k=k):
+        if mode == "hybrid":
+            docs = store.hybrid_search(query, vector, k=k)
+        else:
+            docs = store.similarity_search_by_vector(vector, k=k)
+    retrieval_cache.put_documents(query, k, generation, docs, mode)
+    return docs
+
+
+async def aget_most_similar_docs_by_query(query: str, k: int, mode: Optional[str] = None,
+                                          vector: Optional[List[float]] = None):
+    mode = mode or hybrid_retrieval.retrieval_mode
+    _check_retrieval_mode(mode)
+    generation = get_index_generation()
+    docs = retrieval_cache.get_documents(query, k, generation, mode)
+    if docs is not None:
+        return docs
+
+    if vector is None:
+        vector = await aembed_query(query)
+
+    store = vector_store.get_vector_store()
+    with tracing.span("search", mode=mode, k=k):
+        if mode == "hybrid":
+            docs = await store.ahybrid_search(query, vector, k=k)
+        else:
+            docs = await store.asimilarity_search_by_vector(vector, k=k)
+    retrieval_cache.put_documents(query, k, generation, docs, mode)
+    return docs
@@ -0,0 +1,124 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+# PDF 텍스트 추출 설정입니다.
+# - "serial" 은 한 프로세스에서 순서대로, "process" 는 페이지 범위를 나눠서 여러 프로세스에서 추출합니다.
+# - pdf_extract_workers 가 None 이면 CPU 코어 수만큼 프로세스를 사용합니다.
+pdf_extract_mode = "serial"
+pdf_extract_workers: Optional[int] = None
+pdf_pages_per_shard = 8
+
+
+# 업로드된 파일을 worker 프로세스가 각자 열 수 있도록 임시 파일로 저장하고 경로를 돌려줍니다.
+# - 이미 디스크에 있는 파일 경로라면 그대로 사용합니다.
+@contextmanager
+def open_pdf_path(uploaded_file) -> Iterator[str]:
+    if isinstance(uploaded_file, (str, os.PathLike)):
+        yield os.fspath(uploaded_file)
+        return
+
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        shutil.copyfileobj(uploaded_file, tmp)
+        path = tmp.name
+    try:
+        yield path
+    finally:
+        os.remove(path)
+
+
+# PDF 의 전체 페이지 수를 가져옵니다.
+def get_page_count(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+# PDF 의 [first_page, last_page] 범위에서 페이지별 텍스트를 추출합니다.
+# - 페이지 하나에서 에러가 나도 나머지 페이지는 계속 추출하고, 에러는 결과에 담아서 돌려줍니다.
+# - worker 프로세스에서 실행되므로 PDF 를 직접 엽니다.
+def extract_page_range(path: str, first_page: int, last_page: int) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    results = []
+    with pdfplumber.open(path, pages=range(first_page, last_page + 1)) as pdf:
+        for page in pdf.pages:
+            try:
+                results.append((page.page_number, page.extract_text() or "", None))
+            except Exception as e:
+                results.append((page.page_number, None, f"{type(e).__name__}: {e}"))
+            finally:
+                page.close()
+    return results
+
+
+# 한 프로세스에서 페이지를 하나씩 추출합니다.
+def _iter_page_results_serial(path: str):
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            try:
+                yield page.page_number, page.extract_text() or "", None
+            except Exception as e:
+                yield page.page_number, None, f"{type(e).__name__}: {e}"
+            finally:
+                page.close()
+
+
+# 페이지 범위를 여러 프로세스에 나눠서 추출하고, 페이지 순서대로 결과를 돌려줍니다.
+# - 동시에 처리 중인 범위는 workers * 2 개로 제한되어 메모리가 문서 크기에 비례해서 늘지 않습니다.
+def _iter_page_results_parallel(path: str, total_pages: int, workers: int, pages_per_shard: int):
+    shards = [(first, min(first + pages_per_shard - 1, total_pages))
+              for first in range(1, total_pages + 1, pages_per_shard)]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        try:
+            for first, last in shards:
+                pending.append((first, last, executor.submit(extract_page_range, path, first, last)))
+                while len(pending) >= workers * 2:
+                    yield from _shard_results(*pending.popleft())
+            while pending:
+                yield from _shard_results(*pending.popleft())
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+
+
+# 범위 하나의 결과를 돌려줍니다. worker 가 범위 전체를 처리하지 못했으면 모든 페이지를 실패로 표시합니다.
+def _shard_results(first: int, last: int, future):
+    try:
+        yield from future.result()
+    except Exception as e:
+        for page_number in range(first, last + 1):
+            yield page_number, None, f"{type(e).__name__}: {e}"
+
+
+# PDF 에서 페이지 순서대로 (page_number, text) 를 추출합니다.
+# - 추출에 실패한 페이지는 페이지 번호와 source(없으면 파일 경로)로 경고 로그를 남기고 건너뜁니다.
+def iter_page_texts(path: str, mode: Optional[str] = None, workers: Optional[int] = None,
+                    total_pages: Optional[int] = None, source: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    mode = mode or pdf_extract_mode
+    workers = workers or pdf_extract_workers or os.cpu_count() or 1
+
+    if mode == "process" and workers > 1:
+        total_pages = total_pages if total_pages is not None else get_page_count(path)
+        results = _iter_page_results_parallel(path, total_pages, workers, pdf_pages_per_shard)
+    elif mode in ("serial", "process"):
+        results = _iter_page_results_serial(path)
+    else:
+        raise ValueError(f"Unknown pdf extract mode: {mode}")
+
+    for page_number, text, error in results:
+        if error is not None:
+            logger.warning("failed to extract page %d of %s: %s", page_number, source or path, error)
+            continue
+        yield page_number, text
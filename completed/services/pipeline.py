@@ -0,0 +1,100 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+# 파이프라인 단계 사이의 큐 기본 크기입니다.
+# - 큐가 가득 차면 앞 단계가 기다리므로, 전체 메모리 사용량은 문서 크기와 상관없이 큐 크기로 제한됩니다.
+pipeline_queue_size = 32
+
+_DONE = object()
+_PUT_TIMEOUT = 0.1
+
+
+# 멈춤 신호를 확인하면서 큐에 item 을 넣습니다. 멈췄으면 False 를 돌려줍니다.
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+# iterable 을 백그라운드 스레드에서 실행하고, 결과를 bounded 큐를 통해 하나씩 돌려줍니다.
+# - 앞 단계(예: PDF 텍스트 추출)와 뒷 단계(예: 임베딩)가 동시에 진행됩니다.
+# - 백그라운드 스레드에서 발생한 예외는 호출한 쪽에서 다시 발생합니다.
+def iter_in_background(iterable: Iterable[T], maxsize: int = None, name: str = "pipeline") -> Iterator[T]:
+    q = queue.Queue(maxsize=maxsize or pipeline_queue_size)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(q, item, stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(q, _DONE, stop)
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        thread.join()
+
+
+class BackgroundConsumer:
+    """
+    Runs `consume(item)` on a background thread fed through a bounded queue.
+
+    Used as a context manager; leaving the block waits for the queue to drain
+    and re-raises the first error raised by `consume`.
+    """
+
+    def __init__(self, consume: Callable[[T], None], maxsize: int = None, name: str = "pipeline") -> None:
+        self._consume = consume
+        self._queue = queue.Queue(maxsize=maxsize or pipeline_queue_size)
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if self._errors:
+                continue
+            try:
+                self._consume(item)
+            except BaseException as e:
+                self._errors.append(e)
+                self._stop.set()
+
+    def put(self, item: T) -> None:
+        if self._errors:
+            raise self._errors[0]
+        _put(self._queue, item, self._stop)
+
+    def __enter__(self) -> "BackgroundConsumer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._queue.put(_DONE)
+        self._thread.join()
+        if exc_type is None and self._errors:
+            raise self._errors[0]
@@ -0,0 +1,65 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# SQL Chat 쿼리 로그 설정입니다.
+# - 실행한 SQL 마다 실행 시간, 행 수, 오류 코드와 EXPLAIN QUERY PLAN 결과를 JSON Lines 로 남깁니다.
+# - 인덱스 추천(index_advisor)은 이 로그를 모아서 반복되는 전체 스캔과 임시 B-tree 정렬을 찾습니다.
+# - 로그가 query_log_max_bytes 를 넘으면 이전 로그를 `<path>.1` 로 옮기고 새 파일에 이어 씁니다. 이전 로그는 하나만 남깁니다.
+query_log_enabled = True
+query_log_path = os.path.join(".cache", "sql_query_log.jsonl")
+query_log_max_bytes = 5 * 1024 * 1024
+
+_lock = threading.Lock()
+
+
+# 실행한 쿼리를 로그에 추가합니다.
+def record(database, result, path: Optional[str] = None) -> None:
+    if not query_log_enabled:
+        return
+    path = path or query_log_path
+    entry = {
+        "ts": time.time(),
+        "uri": database.uri,
+        "fingerprint": database.fingerprint,
+        "sql": result.executed_sql,
+        "elapsed_ms": round(result.elapsed * 1000, 3),
+        "rows": result.row_count,
+        "truncated": result.truncated,
+        "error_code": result.error_code,
+        "plan": result.plan,
+    }
+    with _lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if query_log_max_bytes and os.path.exists(path) and os.path.getsize(path) >= query_log_max_bytes:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+# 로그를 읽어옵니다. 옮겨 둔 이전 로그부터 시간 순서대로 읽습니다.
+# - fingerprint 를 넣으면 그 스키마에서 실행한 쿼리만 돌려줍니다.
+def read(path: Optional[str] = None, fingerprint: Optional[str] = None) -> List[Dict]:
+    path = path or query_log_path
+    entries = []
+    for file_path in (path + ".1", path):
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if fingerprint is None or entry.get("fingerprint") == fingerprint:
+                    entries.append(entry)
+    return entries
+
+
+def clear(path: Optional[str] = None) -> None:
+    path = path or query_log_path
+    with _lock:
+        for file_path in (path, path + ".1"):
+            if os.path.exists(file_path):
+                os.remove(file_path)
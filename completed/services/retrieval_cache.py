@@ -0,0 +1,118 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+from langchain_core.documents import Document
+
+# 검색 캐시 설정입니다.
+# - 1단계: (검색 방식, 정규화된 질문, k) → 검색된 Document 리스트. 인덱스 generation 이 바뀌면 모두 비웁니다.
+# - 2단계: (임베딩 모델, 정규화된 질문) → 질문 임베딩. 인덱스가 바뀌어도 그대로 재사용합니다.
+retrieval_cache_enabled = True
+retrieval_cache_max_entries = 256
+query_embedding_cache_max_entries = 1024
+
+_PUNCTUATION = re.compile(r"[\s?!.,~]+$")
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU map with hit/miss counters.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+_generation_lock = threading.Lock()
+_cached_generation: Optional[int] = None
+_documents = LRUCache(retrieval_cache_max_entries)
+_query_embeddings = LRUCache(query_embedding_cache_max_entries)
+
+
+# 질문을 캐시 키로 쓰기 위해 정규화합니다. (대소문자, 연속 공백, 끝의 물음표/마침표 차이를 무시합니다.)
+def normalize_query(query: str) -> str:
+    return _PUNCTUATION.sub("", " ".join(query.lower().split()))
+
+
+# 인덱스 generation 이 바뀌었으면 검색 결과 캐시를 비웁니다.
+def _sync_generation(generation: int) -> None:
+    global _cached_generation
+    with _generation_lock:
+        if _cached_generation != generation:
+            _documents.clear()
+            _cached_generation = generation
+
+
+# 캐시된 검색 결과를 가져옵니다.
+def get_documents(query: str, k: int, generation: int, mode: str = "vector") -> Optional[List[Document]]:
+    if not retrieval_cache_enabled:
+        return None
+    _sync_generation(generation)
+    docs = _documents.get((mode, normalize_query(query), k))
+    return list(docs) if docs is not None else None
+
+
+# 검색 결과를 캐시에 저장합니다. 검색하는 동안 인덱스가 바뀌었다면 저장하지 않습니다.
+def put_documents(query: str, k: int, generation: int, docs: List[Document], mode: str = "vector") -> None:
+    if not retrieval_cache_enabled or _cached_generation != generation:
+        return
+    _documents.put((mode, normalize_query(query), k), list(docs))
+
+
+# 캐시된 질문 임베딩을 가져옵니다.
+def get_query_embedding(model_id: str, query: str) -> Optional[List[float]]:
+    if not retrieval_cache_enabled:
+        return None
+    return _query_embeddings.get((model_id, normalize_query(query)))
+
+
+# 질문 임베딩을 캐시에 저장합니다.
+def put_query_embedding(model_id: str, query: str, vector: List[float]) -> None:
+    if retrieval_cache_enabled:
+        _query_embeddings.put((model_id, normalize_query(query)), vector)
+
+
+def clear() -> None:
+    _documents.clear()
+    _query_embeddings.clear()
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    return {"documents": _documents.stats(), "query_embeddings": _query_embeddings.stats()}
@@ -0,0 +1,203 @@
+import math
+import re
+import threading
+from collections import Counter, deque
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+import services.bedrock_service as bedrock_svc
+
+# 스키마 pruning 설정입니다.
+# - SQL 생성 프롬프트에 전체 스키마 대신 질문과 관련된 테이블과 그 FK 이웃 테이블만 넣습니다.
+# - "lexical": 테이블/컬럼 이름과 설명의 단어를 질문과 비교합니다. (추가 호출 없음)
+# - "embedding": 테이블 설명 임베딩과 질문 임베딩의 코사인 유사도를 사용합니다.
+schema_pruning_enabled = True
+schema_pruning_method = "lexical"
+schema_pruning_top_tables = 3
+
+# 점수가 가장 높은 테이블 점수에 비해 이 비율보다 낮은 테이블은 top 안에 들어도 제외합니다.
+schema_pruning_min_relative_score = 0.4
+
+# 고른 테이블이 FK 로 직접 참조하는 테이블(예: Track → Genre)도 넣을지 설정합니다.
+# - 고른 테이블들 사이의 조인 경로에 있는 테이블(예: Artist 와 Track 사이의 Album)은 항상 넣습니다.
+schema_pruning_fk_neighbors = True
+
+# 테이블 설명입니다. 이름과 컬럼만으로 알 수 없는 동의어(한국어 포함)를 적어둡니다.
+table_descriptions: Dict[str, str] = {
+    "Album": "album record release title 앨범 음반",
+    "Artist": "artist band singer musician performer 아티스트 가수 밴드 음악가",
+    "Customer": "customer client buyer person country city email company 고객 손님 구매자 회원 국가 도시",
+    "Employee": "employee staff sales support agent manager boss hire 직원 사원 영업 담당자 매니저 상사 입사",
+    "Genre": "genre style category music type rock jazz 장르 음악 종류",
+    "Invoice": "invoice order purchase buy bought sale sales revenue total spend billing year month date "
+               "송장 주문 구매 판매 매출 수익 총액 결제 청구 연도 월 날짜",
+    "InvoiceLine": "invoice line item quantity sold unit price purchased track 판매된 수량 단가 주문 항목 품목",
+    "MediaType": "media type format file mpeg aac 미디어 형식 포맷 파일",
+    "Playlist": "playlist list collection 플레이리스트 재생목록",
+    "PlaylistTrack": "playlist track membership 플레이리스트 곡",
+    "Track": "track song tune composer duration length milliseconds bytes price 트랙 곡 노래 작곡가 길이 재생시간 가격",
+}
+
+_WORD = re.compile(r"[A-Za-z]+|[0-9]+|[가-힣]+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+_STOP_WORDS = {"id", "the", "of", "and", "by", "for", "in", "to", "a", "an", "is", "are", "what", "which", "how",
+               "many", "much", "show", "list", "me", "all", "each", "per", "with", "top", "most", "name", "names"}
+
+# 테이블별로 단어가 나온 위치에 따른 가중치입니다.
+_FIELD_WEIGHTS = {"table": 3.0, "description": 2.0, "column": 1.0}
+
+
+def _terms(text: str) -> List[str]:
+    terms = []
+    for word in _WORD.findall(text):
+        parts = _CAMEL.findall(word) if word.isascii() else [word]
+        terms.extend(part.lower() for part in parts)
+    return [term for term in terms if term not in _STOP_WORDS]
+
+
+# 질문 단어가 스키마 단어와 같은 것으로 볼지 결정합니다.
+# - 복수형(tracks)이나 조사가 붙은 한국어(고객의)를 맞추기 위해 스키마 단어로 시작하는 질문 단어도 허용합니다.
+def _matches(question_term: str, schema_term: str) -> bool:
+    if question_term == schema_term:
+        return True
+    min_length = 1 if not schema_term.isascii() else 3
+    return len(schema_term) >= min_length and question_term.startswith(schema_term)
+
+
+class SchemaIndex:
+    """
+    Precomputed lexical (and optionally embedding) index over a database's
+    tables, with FK adjacency for expanding a selection to join partners.
+    """
+
+    def __init__(self, database) -> None:
+        metadata = database.db._metadata
+        usable = set(database.db.get_usable_table_names())
+        self.tables = sorted(name for name in metadata.tables if name in usable)
+
+        # 1. 테이블마다 (단어, 가중치) 를 모읍니다. 컬럼 이름은 CamelCase 를 나눠서 사용합니다.
+        self.fields: Dict[str, Dict[str, float]] = {}
+        for name in self.tables:
+            weights: Dict[str, float] = {}
+            # - 테이블 이름 전체(playlisttrack)만 테이블 가중치를 받고, 나눈 단어(playlist, track)는 컬럼 가중치를 받습니다.
+            for field, terms in (("column", _terms(" ".join(c.name for c in metadata.tables[name].columns) + " " + name)),
+                                 ("description", _terms(table_descriptions.get(name, ""))),
+                                 ("table", [name.lower()])):
+                for term in terms:
+                    weights[term] = max(weights.get(term, 0.0), _FIELD_WEIGHTS[field])
+            self.fields[name] = weights
+
+        # 2. 여러 테이블에 공통으로 나오는 단어(예: city, name)는 idf 로 가중치를 낮춥니다.
+        document_frequency = Counter(term for weights in self.fields.values() for term in weights)
+        self.idf = {term: math.log(1 + len(self.tables) / count) for term, count in document_frequency.items()}
+
+        # 3. FK 로 참조하는 테이블(outgoing)과 참조받는 테이블(incoming)을 모읍니다.
+        self.references: Dict[str, Set[str]] = {name: set() for name in self.tables}
+        self.referenced_by: Dict[str, Set[str]] = {name: set() for name in self.tables}
+        for name in self.tables:
+            for fk in metadata.tables[name].foreign_keys:
+                target = fk.column.table.name
+                if target != name and target in self.references:
+                    self.references[name].add(target)
+                    self.referenced_by[target].add(name)
+
+        self._embeddings: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def lexical_scores(self, question: str) -> Dict[str, float]:
+        question_terms = set(_terms(question))
+        scores = {}
+        for name, weights in self.fields.items():
+            scores[name] = sum(weight * self.idf[term] for term, weight in weights.items()
+                               if any(_matches(q, term) for q in question_terms))
+        return scores
+
+    def embedding_scores(self, question: str) -> Dict[str, float]:
+        embedding = bedrock_svc.get_embeddings()
+        with self._lock:
+            if self._embeddings is None:
+                documents = [f"{name}: {table_descriptions.get(name, '')} "
+                             f"columns {', '.join(sorted(self.fields[name]))}" for name in self.tables]
+                self._embeddings = _normalize(embedding.embed_documents(documents))
+        query = _normalize([embedding.embed_query(question)])[0]
+        return dict(zip(self.tables, (self._embeddings @ query).tolist()))
+
+    # 두 테이블 사이의 가장 짧은 FK 조인 경로에 있는 테이블들을 찾습니다.
+    def _join_path(self, source: str, target: str) -> List[str]:
+        previous = {source: None}
+        queue = deque([source])
+        while queue:
+            name = queue.popleft()
+            if name == target:
+                path = []
+                while name is not None:
+                    path.append(name)
+                    name = previous[name]
+                return path
+            for neighbor in sorted(self.references[name] | self.referenced_by[name]):
+                if neighbor not in previous:
+                    previous[neighbor] = name
+                    queue.append(neighbor)
+        return []
+
+    # 질문과 관련된 테이블을 고르고, 조인에 필요한 FK 이웃 테이블을 추가합니다.
+    # - 고른 테이블들을 잇는 조인 경로의 테이블(예: Artist - Album - Track)을 추가합니다.
+    # - schema_pruning_fk_neighbors 이면 고른 테이블이 참조하는 테이블도 추가합니다.
+    def select_tables(self, question: str, top: Optional[int] = None, method: Optional[str] = None) -> List[str]:
+        top = top or schema_pruning_top_tables
+        method = method or schema_pruning_method
+        if method == "lexical":
+            scores = self.lexical_scores(question)
+        elif method == "embedding":
+            scores = self.embedding_scores(question)
+        else:
+            raise ValueError(f"Unknown schema pruning method: {method}")
+
+        ranked = sorted(self.tables, key=lambda name: scores[name], reverse=True)
+        best = scores[ranked[0]] if ranked else 0.0
+        if best <= 0:
+            return list(self.tables)
+        selected = {name for name in ranked[:top] if scores[name] >= best * schema_pruning_min_relative_score}
+
+        neighbors = set()
+        ordered = [name for name in ranked if name in selected]
+        for i, source in enumerate(ordered):
+            for target in ordered[i + 1:]:
+                neighbors.update(self._join_path(source, target))
+        if schema_pruning_fk_neighbors:
+            for name in selected:
+                neighbors |= self.references[name]
+        return [name for name in self.tables if name in selected | neighbors]
+
+
+def _normalize(vectors) -> np.ndarray:
+    array = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return array / np.where(norms == 0, 1, norms)
+
+
+_index_lock = threading.Lock()
+_indexes: Dict[str, SchemaIndex] = {}
+
+
+# 데이터베이스 스키마 fingerprint 별로 한 번만 인덱스를 만듭니다.
+def get_schema_index(database) -> SchemaIndex:
+    key = f"{database.uri}:{database.fingerprint}"
+    index = _indexes.get(key)
+    if index is None:
+        with _index_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = SchemaIndex(database)
+                _indexes[key] = index
+    return index
+
+
+# 질문에 필요한 테이블만 담은 스키마 설명과 선택한 테이블 목록을 돌려줍니다.
+# - 관련된 테이블을 찾지 못하면 전체 스키마를 돌려줍니다.
+def get_pruned_table_info(database, question: str):
+    if not schema_pruning_enabled:
+        return database.table_info, list(get_schema_index(database).tables)
+    tables = get_schema_index(database).select_tables(question)
+    return database.get_table_info(tables), tables
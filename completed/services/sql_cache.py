@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import services.bedrock_service as bedrock_svc
+from services.answer_cache import CachedAnswer, SemanticAnswerCache
+from services.retrieval_cache import LRUCache, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# 질문 → SQL 캐시 설정입니다.
+# - (모델, 스키마 fingerprint, 정규화된 질문) → 실행에 성공한 SQL. 캐시에 있으면 SQL 생성 호출을 건너뜁니다.
+# - 스키마가 바뀌면 fingerprint 가 달라지므로 이전 SQL 은 더 이상 쓰이지 않습니다. (데이터만 바뀐 경우는 그대로 재사용합니다.)
+sql_cache_enabled = True
+sql_cache_max_entries = 512
+
+# 정규화한 질문이 같지 않아도 질문 임베딩의 코사인 유사도가 이 값 이상이면 재사용합니다. None 이면 사용하지 않습니다.
+# - "top 10" 과 "top 5" 처럼 숫자만 다른 질문도 유사도가 높게 나오므로 높은 값을 사용합니다.
+sql_cache_similarity_threshold: Optional[float] = None
+
+# 검증된 SQL 을 고정(pin)해 두는 파일입니다. 고정된 SQL 은 모델과 상관없이 사용되고 eviction 되지 않습니다.
+sql_cache_pins_path = os.path.join("db", "pinned_queries.json")
+
+
+class SqlCache:
+    """
+    Question → SQL cache with an LRU of generated queries, an optional
+    embedding-similarity fallback and a set of pinned, known-good queries.
+
+    Pinned entries are keyed by (fingerprint, question) and are never evicted;
+    a pin with fingerprint None applies to any schema. A pin whose SQL fails
+    is skipped until it is pinned again.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, similarity_threshold: Optional[float] = None,
+                 pins_path: Optional[str] = None) -> None:
+        self.similarity_threshold = similarity_threshold
+        self.pins_path = pins_path
+        self.pinned_hits = 0
+        self.similar_hits = 0
+        self.pin_failures = 0
+        self._failed_pins: set = set()
+        self._generated = LRUCache(max_entries or sql_cache_max_entries)
+        self._similar = SemanticAnswerCache(threshold=similarity_threshold or 1.0, ttl_seconds=float("inf"),
+                                            max_entries=max_entries or sql_cache_max_entries)
+        self._pins: Optional[Dict[Tuple[Optional[str], str], str]] = None
+        self._lock = threading.Lock()
+
+    # 고정된 SQL 을 파일에서 한 번만 읽어옵니다.
+    def _load_pins(self) -> Dict[Tuple[Optional[str], str], str]:
+        with self._lock:
+            if self._pins is None:
+                self._pins = {}
+                if self.pins_path and os.path.exists(self.pins_path):
+                    with open(self.pins_path, encoding="utf-8") as f:
+                        for pin in json.load(f):
+                            self._pins[(pin.get("fingerprint"), normalize_query(pin["question"]))] = pin["sql"]
+            return self._pins
+
+    def _save_pins(self) -> None:
+        if not self.pins_path:
+            return
+        pins = [{"question": question, "fingerprint": fingerprint, "sql": sql}
+                for (fingerprint, question), sql in sorted(self._pins.items(), key=lambda item: item[0][1])]
+        with open(self.pins_path, "w", encoding="utf-8") as f:
+            json.dump(pins, f, ensure_ascii=False, indent=2)
+
+    def lookup(self, question: str, model_id: str, fingerprint: str,
+               vector: Optional[List[float]] = None) -> Optional[str]:
+        normalized = normalize_query(question)
+        pins = self._load_pins()
+        for key in ((fingerprint, normalized), (None, normalized)):
+            if key in pins and key not in self._failed_pins:
+                self.pinned_hits += 1
+                return pins[key]
+
+        sql = self._generated.get((model_id, fingerprint, normalized))
+        if sql is not None or vector is None:
+            return sql
+        entry = self._similar.lookup((model_id, fingerprint), vector)
+        if entry is None:
+            return None
+        self.similar_hits += 1
+        return entry.answer
+
+    def store(self, question: str, model_id: str, fingerprint: str, sql: str, latency: float = 0.0,
+              vector: Optional[List[float]] = None) -> None:
+        self._generated.put((model_id, fingerprint, normalize_query(question)), sql)
+        if vector is not None:
+            self._similar.put((model_id, fingerprint), vector, CachedAnswer(question, sql, None, latency))
+
+    # 캐시에서 돌려준 sql 이 실패하거나 다시 생성되었을 때, 그 sql 을 돌려준 항목을 지웁니다.
+    # - 생성된 SQL 과 비슷한 질문으로 찾은 SQL 은 캐시에서 지웁니다.
+    # - 고정된 SQL 은 파일에서 지우지 않고, 다시 고정할 때까지 건너뛰도록 표시하고 경고를 남깁니다.
+    def discard(self, question: str, model_id: str, fingerprint: str, sql: str) -> None:
+        normalized = normalize_query(question)
+        key = (model_id, fingerprint, normalized)
+        generated = self._generated.pop(key)
+        if generated is not None and generated != sql:
+            self._generated.put(key, generated)
+        self._similar.discard((model_id, fingerprint), sql)
+
+        pins = self._load_pins()
+        with self._lock:
+            for pin_key in ((fingerprint, normalized), (None, normalized)):
+                if pins.get(pin_key) == sql and pin_key not in self._failed_pins:
+                    self._failed_pins.add(pin_key)
+                    self.pin_failures += 1
+                    logger.warning("pinned SQL for %r failed and is skipped until pinned again: %s", question, sql)
+
+    def pin(self, question: str, sql: str, fingerprint: Optional[str] = None) -> None:
+        pins = self._load_pins()
+        with self._lock:
+            pins[(fingerprint, normalize_query(question))] = sql
+            self._failed_pins.discard((fingerprint, normalize_query(question)))
+            self._save_pins()
+
+    def unpin(self, question: str, fingerprint: Optional[str] = None) -> bool:
+        pins = self._load_pins()
+        with self._lock:
+            removed = pins.pop((fingerprint, normalize_query(question)), None) is not None
+            self._failed_pins.discard((fingerprint, normalize_query(question)))
+            if removed:
+                self._save_pins()
+        return removed
+
+    def pinned(self) -> List[Dict[str, Optional[str]]]:
+        return [{"question": question, "fingerprint": fingerprint, "sql": sql}
+                for (fingerprint, question), sql in self._load_pins().items()]
+
+    def clear(self) -> None:
+        self._generated.clear()
+        self._similar.clear()
+
+    def stats(self) -> Dict[str, float]:
+        stats = self._generated.stats()
+        stats.update({"pinned": len(self._load_pins()), "pinned_hits": self.pinned_hits,
+                      "similar_hits": self.similar_hits, "pin_failures": self.pin_failures})
+        return stats
+
+
+_sql_cache = SqlCache(similarity_threshold=sql_cache_similarity_threshold, pins_path=sql_cache_pins_path)
+
+
+def get_sql_cache() -> SqlCache:
+    return _sql_cache
+
+
+# 질문 임베딩 비교를 사용할지 확인합니다.
+def uses_similarity() -> bool:
+    return _sql_cache.similarity_threshold is not None
+
+
+# 캐시된 SQL 을 찾습니다.
+# - 고정된 SQL → 같은 질문으로 생성된 SQL → (설정된 경우) 비슷한 질문으로 생성된 SQL 순서로 찾습니다.
+def lookup(question: str, model_id: str, fingerprint: str, vector: Optional[List[float]] = None) -> Optional[str]:
+    if not sql_cache_enabled:
+        return None
+    if uses_similarity() and vector is None:
+        vector = bedrock_svc.get_embeddings().embed_query(question)
+    return _sql_cache.lookup(question, model_id, fingerprint, vector)
+
+
+# 실행에 성공한 SQL 을 캐시에 저장합니다.
+def store(question: str, model_id: str, fingerprint: str, sql: str, latency: float = 0.0,
+          vector: Optional[List[float]] = None) -> None:
+    if not sql_cache_enabled:
+        return
+    if uses_similarity() and vector is None:
+        vector = bedrock_svc.get_embeddings().embed_query(question)
+    _sql_cache.store(question, model_id, fingerprint, sql, latency, vector)
+
+
+# 캐시에서 돌려준 SQL 이 실패하거나 다시 생성되었을 때 호출합니다. sql 에는 캐시가 돌려준 SQL 을 넣습니다.
+def discard(question: str, model_id: str, fingerprint: str, sql: str) -> None:
+    _sql_cache.discard(question, model_id, fingerprint, sql)
+
+
+# 검증된 SQL 을 고정합니다. fingerprint 를 넣으면 그 스키마에서만 사용합니다.
+def pin(question: str, sql: str, fingerprint: Optional[str] = None) -> None:
+    _sql_cache.pin(question, sql, fingerprint)
+
+
+def unpin(question: str, fingerprint: Optional[str] = None) -> bool:
+    return _sql_cache.unpin(question, fingerprint)
+
+
+def clear() -> None:
+    _sql_cache.clear()
+
+
+def stats() -> Dict[str, float]:
+    return _sql_cache.stats()
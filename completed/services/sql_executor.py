@@ -0,0 +1,412 @@
+import os
+import pathlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import services.database_service as db_svc
+import services.query_log as query_log
+
+# SQL 실행 결과 설정입니다.
+# - 결과는 커서에서 sql_fetch_size 행씩 가져오고, 행 수나 크기가 예산을 넘으면 거기서 멈춥니다.
+# - 답변 프롬프트에는 전체 결과 대신 행 수, 컬럼별 집계와 앞쪽 일부 행만 넣습니다.
+sql_max_rows = 1000
+sql_max_bytes = 1_000_000
+sql_fetch_size = 200
+sql_prompt_sample_rows = 20
+sql_cell_max_chars = 80
+
+# SQLite 실행 보호 설정입니다.
+# - 읽기 전용(mode=ro, query_only) 연결을 sql_pool_size 개까지 만들어 재사용합니다.
+# - 쿼리마다 sql_timeout_seconds 의 실행 시간 예산을 두고, progress handler 로 넘으면 중단합니다.
+# - LIMIT 이 없는 SELECT 에는 LIMIT (sql_max_rows + 1) 을 붙여서 필요한 행까지만 계산하게 합니다.
+sql_guard_enabled = True
+sql_pool_size = 4
+sql_timeout_seconds = 10.0
+sql_progress_steps = 10000
+
+# EXPLAIN QUERY PLAN 으로 실행 전에 확인하는 기준입니다.
+# - sql_large_table_rows 이상인 테이블을 인덱스 없이 전체 스캔하면 거절합니다.
+# - 인덱스 없이 스캔하는 테이블들의 행 수 곱(카테시안 조인 크기)이 sql_max_plan_rows 를 넘으면 거절합니다.
+sql_plan_check_enabled = True
+sql_large_table_rows = 1_000_000
+sql_max_plan_rows = 1_000_000
+
+# 거절되거나 실패한 SQL 의 오류를 프롬프트에 넣어서 다시 생성하는 횟수입니다.
+sql_max_retries = 1
+
+
+class QueryResult:
+    """
+    Rows fetched from one SQL query, bounded by a row/byte budget.
+
+    `truncated` is True when the cursor still had rows after the budget was
+    spent, so `row_count` is then a lower bound of the real result size.
+    """
+
+    def __init__(self, sql: str, columns: List[str], rows: List[tuple], truncated: bool,
+                 elapsed: float, error: Optional[str] = None, error_code: Optional[str] = None,
+                 plan: Optional[List[str]] = None, executed_sql: Optional[str] = None) -> None:
+        self.sql = sql
+        self.columns = columns
+        self.rows = rows
+        self.truncated = truncated
+        self.elapsed = elapsed
+        self.error = error
+        self.error_code = error_code or ("sql_error" if error else None)
+        self.plan = plan or []
+        self.executed_sql = executed_sql or sql
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    # 한 줄짜리 결과 설명입니다. (화면 표시용)
+    def describe(self) -> str:
+        if self.error:
+            return f"Error: {self.error}"
+        count = f"{self.row_count}+" if self.truncated else str(self.row_count)
+        return f"{count} rows × {len(self.columns)} columns in {self.elapsed * 1000:.0f} ms"
+
+    # 컬럼별 집계를 만듭니다. 숫자 컬럼은 min/max/sum/avg, 나머지는 고유값 수와 가장 많이 나온 값입니다.
+    def column_summaries(self) -> List[Dict[str, Any]]:
+        summaries = []
+        for i, column in enumerate(self.columns):
+            values = [row[i] for row in self.rows]
+            present = [value for value in values if value is not None]
+            summary: Dict[str, Any] = {"column": column, "nulls": len(values) - len(present)}
+            numbers = [value for value in present if isinstance(value, (int, float)) and not isinstance(value, bool)]
+            if present and len(numbers) == len(present):
+                summary.update({"min": min(numbers), "max": max(numbers), "sum": round(sum(numbers), 4),
+                                "avg": round(sum(numbers) / len(numbers), 4)})
+            elif present:
+                counts: Dict[str, int] = {}
+                for value in present:
+                    counts[str(value)] = counts.get(str(value), 0) + 1
+                top_value = max(counts, key=counts.get)
+                summary.update({"distinct": len(counts), "top": f"{_clip(top_value)} ({counts[top_value]})"})
+            summaries.append(summary)
+        return summaries
+
+    # 답변 프롬프트에 넣을 요약입니다. 결과가 아무리 커도 길이가 제한됩니다.
+    def summary(self, sample_rows: Optional[int] = None) -> str:
+        if self.error:
+            return f"Error: {self.error}"
+        sample_rows = sql_prompt_sample_rows if sample_rows is None else sample_rows
+
+        lines = [f"row_count: {self.row_count}" + (" (truncated, more rows exist)" if self.truncated else "")]
+        if not self.rows:
+            return lines[0]
+        aggregated = " of fetched rows" if self.truncated else ""
+        lines.append(f"columns{aggregated}:")
+        for summary in self.column_summaries():
+            stats = ", ".join(f"{key}={value}" for key, value in summary.items() if key != "column")
+            lines.append(f"- {summary['column']}: {stats}")
+        shown = self.rows[:sample_rows]
+        lines.append(f"first {len(shown)} rows:")
+        lines.append(" | ".join(self.columns))
+        lines.extend(" | ".join(_clip(value) for value in row) for row in shown)
+        return "\n".join(lines)
+
+    # 실패한 SQL 을 다시 생성할 때 프롬프트에 넣을 설명입니다.
+    def feedback(self) -> str:
+        lines = [f"SQL Query: {self.sql}", f"Error ({self.error_code}): {self.error}"]
+        if self.plan:
+            lines.append("Query plan: " + "; ".join(self.plan))
+        return "\n".join(lines)
+
+    # 화면에 페이지 단위로 보여줄 행들을 가져옵니다.
+    def page(self, number: int, size: int) -> List[tuple]:
+        return self.rows[number * size:(number + 1) * size]
+
+
+def _clip(value: Any) -> str:
+    text = "NULL" if value is None else str(value)
+    return text if len(text) <= sql_cell_max_chars else text[:sql_cell_max_chars - 1] + "…"
+
+
+def _row_bytes(row: tuple) -> int:
+    return sum(len(str(value)) for value in row)
+
+
+class QueryRejected(Exception):
+    """
+    Raised when a statement is refused before or during execution.
+    `code` is a short machine-readable reason (e.g. "timeout", "full_scan").
+    """
+
+    def __init__(self, code: str, message: str, plan: Optional[List[str]] = None) -> None:
+        super().__init__(message)
+        self.code = code
+        self.plan = plan or []
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only sqlite3 connections to one database file.
+    """
+
+    def __init__(self, path: str, size: int) -> None:
+        self.uri = pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    # 쉬고 있는 연결을 가져오고, 없으면 size 개까지 새로 만들고, 그 이상이면 반납될 때까지 timeout 초 기다립니다.
+    # - 연결을 만들다 실패하면 (DB 파일이 없거나 잠긴 경우 등) 만든 개수를 되돌려서 다음 호출이 다시 시도하게 합니다.
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                self._created += create
+            if create:
+                try:
+                    connection = self._connect()
+                except BaseException:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    connection = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise QueryRejected("timeout", f"No database connection became free within {timeout:g}s. "
+                                                   f"Try again in a moment.") from None
+        try:
+            yield connection
+        finally:
+            connection.set_progress_handler(None, 0)
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get_nowait().close()
+                self._created -= 1
+
+
+_pools_lock = threading.Lock()
+_pools: Dict[str, ConnectionPool] = {}
+_row_counts: Dict[Tuple, Dict[str, int]] = {}
+
+
+def get_pool(path: str) -> ConnectionPool:
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path, sql_pool_size)
+        return pool
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+        _row_counts.clear()
+
+
+_TOKEN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)|\w+|\S",
+                    re.DOTALL)
+_SCAN = re.compile(r"^SCAN (\w+)")
+_FROM_CLAUSE = re.compile(r"\bFROM\b(.*?)(?=\bWHERE\b|\bGROUP\s+BY\b|\bORDER\s+BY\b|\bHAVING\b|\bLIMIT\b|\bWINDOW\b"
+                          r"|\bUNION\b|\bEXCEPT\b|\bINTERSECT\b|[()]|$)", re.IGNORECASE | re.DOTALL)
+_FROM_SEPARATOR = re.compile(r",|\b(?:NATURAL\s+)?(?:(?:LEFT|RIGHT|FULL)\s+)?(?:(?:OUTER|INNER|CROSS)\s+)?JOIN\b",
+                             re.IGNORECASE)
+_FROM_ITEM = re.compile(r"^\s*[\"`\[]?(\w+)[\"`\]]?(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NOT_ALIAS = {"where", "join", "inner", "left", "right", "full", "cross", "natural", "on", "using", "group", "order",
+              "limit", "having", "union", "except", "intersect", "window"}
+
+
+# SQL 에서 주석을 지우고, 하나의 문장인지와 가장 바깥에 LIMIT 이 있는지 확인합니다.
+# - LIMIT 이 없으면 (max_rows + 1) 을 붙여서 돌려줍니다. 한 행을 더 가져와야 잘렸는지 알 수 있습니다.
+def _prepare(sql: str, max_rows: int) -> Tuple[str, bool]:
+    parts, tokens, end = [], [], 0
+    for match in _TOKEN.finditer(sql):
+        token = match.group()
+        if token.startswith(("--", "/*")):
+            continue
+        gap = sql[end:match.start()]
+        if parts:
+            parts.append(gap if gap.isspace() else " " if gap else "")
+        parts.append(token)
+        tokens.append(token)
+        end = match.end()
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+        parts = parts[:-2] if len(parts) > 1 else []
+    if not tokens or tokens[0].lower() not in ("select", "with"):
+        raise QueryRejected("not_select", "Only a single read-only SELECT statement is allowed.")
+
+    depth, has_limit = 0, False
+    for token in tokens:
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif token == ";":
+            raise QueryRejected("not_select", "Only a single statement is allowed; remove the extra statements.")
+        elif depth == 0 and token.lower() == "limit":
+            has_limit = True
+
+    cleaned = "".join(parts)
+    if has_limit:
+        return cleaned, False
+    return f"{cleaned} LIMIT {max_rows + 1}", True
+
+
+# SQL 의 FROM/JOIN 에서 별칭 → 테이블 이름을 찾습니다. (테이블 이름은 자기 자신으로 매핑합니다.)
+def table_aliases(sql: str) -> Dict[str, str]:
+    aliases = {}
+    for clause in _FROM_CLAUSE.finditer(sql):
+        for item in _FROM_SEPARATOR.split(clause.group(1)):
+            match = _FROM_ITEM.match(item)
+            if not match:
+                continue
+            table, alias = match.groups()
+            aliases[table] = table
+            if alias and alias.lower() not in _NOT_ALIAS:
+                aliases[alias] = table
+    return aliases
+
+
+# 테이블별 행 수를 가져옵니다. DB 파일이 바뀔 때까지 재사용합니다.
+def _table_rows(database, connection: sqlite3.Connection) -> Dict[str, int]:
+    key = (database.uri, database.version)
+    counts = _row_counts.get(key)
+    if counts is None:
+        names = [row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        counts = {name: connection.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0] for name in names}
+        _row_counts[key] = counts
+    return counts
+
+
+def _indexed_columns(connection: sqlite3.Connection, table: str) -> List[str]:
+    columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{table}")') if row[5]]
+    for index in connection.execute(f'PRAGMA index_list("{table}")').fetchall():
+        columns.extend(row[2] for row in connection.execute(f'PRAGMA index_info("{index[1]}")')
+                       if row[2] not in columns)
+    return columns
+
+
+# EXPLAIN QUERY PLAN 으로 실행 계획을 확인합니다.
+# - 같은 부모 아래의 SCAN/SEARCH 는 중첩 루프이므로, 인덱스 없이 SCAN 하는 테이블 행 수의 곱을 비용으로 봅니다.
+def _check_plan(database, connection: sqlite3.Connection, sql: str) -> List[str]:
+    rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    plan = [detail for _, _, _, detail in rows]
+    if not sql_plan_check_enabled:
+        return plan
+
+    table_rows = _table_rows(database, connection)
+    aliases = table_aliases(sql)
+
+    loops: Dict[int, List[Tuple[str, int]]] = {}
+    for _, parent, _, detail in rows:
+        scan = _SCAN.match(detail)
+        if scan:
+            table = aliases.get(scan.group(1), scan.group(1))
+            if table in table_rows:
+                loops.setdefault(parent, []).append((table, table_rows[table]))
+
+    for scans in loops.values():
+        for table, count in scans:
+            if count >= sql_large_table_rows:
+                columns = ", ".join(_indexed_columns(connection, table))
+                raise QueryRejected("full_scan", f"Full scan of large table {table} ({count} rows). "
+                                                 f"Filter on an indexed column ({columns}).", plan)
+        cost = 1
+        for _, count in scans:
+            cost *= max(count, 1)
+        if len(scans) > 1 and cost > sql_max_plan_rows:
+            tables = " x ".join(f"{table} ({count} rows)" for table, count in scans)
+            raise QueryRejected("cartesian_join", f"Join without a usable join condition: {tables} = {cost} row "
+                                                  f"combinations. Join the tables on their key columns.", plan)
+    return plan
+
+
+# 커서에서 결과를 예산만큼만 가져옵니다.
+def _fetch(fetchmany, max_rows: int, max_bytes: int) -> Tuple[List[tuple], bool]:
+    rows: List[tuple] = []
+    size = 0
+    while True:
+        batch = fetchmany(sql_fetch_size)
+        if not batch:
+            return rows, False
+        for row in batch:
+            row_size = _row_bytes(row)
+            if len(rows) >= max_rows or size + row_size > max_bytes:
+                return rows, True
+            rows.append(tuple(row))
+            size += row_size
+
+
+# 읽기 전용 연결에서 실행 계획을 확인한 뒤 시간 예산 안에서 SQL 을 실행합니다.
+def _execute_guarded(database, path: str, sql: str, max_rows: int, max_bytes: int,
+                     timeout: float) -> Tuple[List[str], List[tuple], bool, List[str], str]:
+    executed_sql, _ = _prepare(sql, max_rows)
+    with get_pool(path).connection(timeout) as connection:
+        deadline = time.perf_counter() + timeout
+        connection.set_progress_handler(lambda: time.perf_counter() > deadline, sql_progress_steps)
+        plan: List[str] = []
+        try:
+            plan = _check_plan(database, connection, executed_sql)
+            cursor = connection.execute(executed_sql)
+            columns = [column[0] for column in cursor.description or []]
+            rows, truncated = _fetch(cursor.fetchmany, max_rows, max_bytes) if columns else ([], False)
+            cursor.close()
+        except sqlite3.OperationalError as e:
+            if str(e) == "interrupted":
+                raise QueryRejected("timeout", f"Query exceeded the {timeout:g}s time budget. "
+                                               f"Add filters or avoid unbounded joins.", plan)
+            raise
+    return columns, rows, truncated, plan, executed_sql
+
+
+# SQL 을 실행하고 결과를 커서에서 예산만큼만 가져옵니다.
+# - sqlite 파일은 읽기 전용 연결 풀, 실행 계획 확인, LIMIT 추가와 시간 예산으로 보호해서 실행합니다.
+# - 예산을 넘으면 남은 행은 가져오지 않고 커서를 닫습니다.
+# - 거절과 실행 오류는 예외 대신 error/error_code 가 채워진 QueryResult 로 돌려줍니다.
+# - log 이면 실행 시간과 실행 계획을 쿼리 로그에 남깁니다.
+def execute_query(database, sql: str, max_rows: Optional[int] = None, max_bytes: Optional[int] = None,
+                  timeout: Optional[float] = None, log: bool = True) -> QueryResult:
+    result = _execute(database, sql, max_rows or sql_max_rows, max_bytes or sql_max_bytes,
+                      timeout or sql_timeout_seconds)
+    if log:
+        query_log.record(database, result)
+    return result
+
+
+def _execute(database, sql: str, max_rows: int, max_bytes: int, timeout: float) -> QueryResult:
+    start = time.perf_counter()
+    path = db_svc.get_sqlite_path(database.uri)
+    try:
+        if sql_guard_enabled and path is not None:
+            columns, rows, truncated, plan, executed_sql = _execute_guarded(
+                database, path, sql, max_rows, max_bytes, timeout)
+            return QueryResult(sql, columns, rows, truncated, time.perf_counter() - start,
+                               plan=plan, executed_sql=executed_sql)
+        with database.db._engine.connect() as connection:
+            result = connection.exec_driver_sql(sql)
+            columns = list(result.keys()) if result.returns_rows else []
+            rows, truncated = _fetch(result.fetchmany, max_rows, max_bytes) if columns else ([], False)
+            result.close()
+        return QueryResult(sql, columns, rows, truncated, time.perf_counter() - start)
+    except QueryRejected as e:
+        return QueryResult(sql, [], [], False, time.perf_counter() - start, error=str(e), error_code=e.code,
+                           plan=e.plan)
+    except Exception as e:
+        return QueryResult(sql, [], [], False, time.perf_counter() - start, error=str(e).split("\n")[0])
@@ -0,0 +1,215 @@
+import base64
+import binascii
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import services.bedrock_service as bedrock_svc
+
+# bedrock-runtime 엔드포인트를 대신하는 로컬 스텁 서버입니다.
+# - Anthropic Claude 와 Amazon Titan 임베딩 모델의 InvokeModel / InvokeModelWithResponseStream 을 제공합니다.
+# - 지연 시간과 스로틀링을 설정할 수 있어, AWS 없이 서비스를 실행하고 벤치마크할 수 있습니다. (batch.py --stub-bedrock, test/)
+EMBEDDING_DIMENSION = 1536
+DEFAULT_ANSWER = "안녕하세요! 저는 테스트용 Bedrock 스텁이 생성한 응답입니다. 질문에 대한 답변을 토큰 단위로 스트리밍합니다."
+
+_PATH_PATTERN = re.compile(r"^/model/(?P<model_id>[^/]+)/(?P<action>invoke|invoke-with-response-stream)$")
+
+
+# 텍스트로부터 결정적인(deterministic) 임베딩 벡터를 만듭니다.
+# - 같은 단어를 공유하는 텍스트끼리는 코사인 유사도가 높아지도록 단어 해시 기반으로 만듭니다.
+def fake_embedding(text: str, dimension: int = EMBEDDING_DIMENSION) -> List[float]:
+    vector = [0.0] * dimension
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dimension
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+# 응답 텍스트를 단어 단위의 토큰 리스트로 나눕니다.
+def split_tokens(text: str) -> List[str]:
+    return re.findall(r"\S+\s*", text)
+
+
+# AWS event stream 포맷으로 메시지 하나를 인코딩합니다.
+def encode_event(payload: bytes, event_type: str = "chunk") -> bytes:
+    headers = b""
+    for name, value in ((":event-type", event_type),
+                        (":content-type", "application/json"),
+                        (":message-type", "event")):
+        name_bytes = name.encode("utf-8")
+        value_bytes = value.encode("utf-8")
+        headers += struct.pack("!B", len(name_bytes)) + name_bytes
+        headers += struct.pack("!BH", 7, len(value_bytes)) + value_bytes
+
+    total_length = 12 + len(headers) + len(payload) + 4
+    prelude = struct.pack("!II", total_length, len(headers))
+    prelude += struct.pack("!I", binascii.crc32(prelude) & 0xFFFFFFFF)
+    message = prelude + headers + payload
+    return message + struct.pack("!I", binascii.crc32(message) & 0xFFFFFFFF)
+
+
+class StubBedrockServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server emulating bedrock-runtime.
+
+    latency: seconds to wait before answering each request.
+    token_latency: seconds to wait between streamed tokens.
+    throttle_rate: probability in [0, 1] that a request is rejected with ThrottlingException.
+    sql_answer: answer for SQL generation prompts (ending with "SQL Query:"), `answer` if None.
+    """
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, token_latency: float = 0.0,
+                 throttle_rate: float = 0.0, answer: str = DEFAULT_ANSWER, seed: Optional[int] = 0,
+                 sql_answer: Optional[str] = None):
+        super().__init__(("127.0.0.1", port), _StubBedrockHandler)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.throttle_rate = throttle_rate
+        self.answer = answer
+        self.sql_answer = sql_answer
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.throttled_count = 0
+        self.embedding_count = 0
+        self._thread = None
+
+    @property
+    def endpoint_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def should_throttle(self) -> bool:
+        with self.lock:
+            self.request_count += 1
+            throttled = self.random.random() < self.throttle_rate
+            if throttled:
+                self.throttled_count += 1
+            return throttled
+
+    # 요청의 마지막 메시지를 보고 돌려줄 답변을 고릅니다.
+    def answer_for(self, request: dict) -> str:
+        messages = request.get("messages") or [{}]
+        content = messages[-1].get("content", "")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        if self.sql_answer is not None and content.rstrip().endswith("SQL Query:"):
+            return self.sql_answer
+        return self.answer
+
+    def start(self) -> "StubBedrockServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class _StubBedrockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+        match = _PATH_PATTERN.match(self.path)
+        if match is None:
+            return self._send_json(404, {"message": f"Unknown path {self.path}"}, "ResourceNotFoundException")
+
+        server: StubBedrockServer = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.should_throttle():
+            return self._send_json(429, {"message": "Too many requests, please wait before trying again."},
+                                   "ThrottlingException")
+
+        model_id = match.group("model_id")
+        request = json.loads(body or b"{}")
+        if "embed" in model_id:
+            with server.lock:
+                server.embedding_count += 1
+            text = request.get("inputText", "")
+            return self._send_json(200, {"embedding": fake_embedding(text),
+                                         "inputTextTokenCount": len(split_tokens(text))})
+
+        input_tokens = sum(len(split_tokens(json.dumps(m.get("content", ""), ensure_ascii=False)))
+                           for m in request.get("messages", []))
+        answer = server.answer_for(request)
+        tokens = split_tokens(answer)
+        if match.group("action") == "invoke":
+            return self._send_json(200, {
+                "id": "msg_stub", "type": "message", "role": "assistant", "model": model_id,
+                "content": [{"type": "text", "text": answer}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": len(tokens)},
+            }, headers={"x-amzn-bedrock-input-token-count": input_tokens,
+                        "x-amzn-bedrock-output-token-count": len(tokens)})
+        return self._send_stream(model_id, tokens, input_tokens)
+
+    def _send_json(self, status: int, payload: dict, error_type: Optional[str] = None,
+                   headers: Optional[dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if error_type:
+            self.send_header("x-amzn-ErrorType", error_type)
+        # 실제 Bedrock 처럼 토큰 사용량을 응답 헤더로도 돌려줍니다. (ChatBedrock 은 non-streaming 에서 헤더를 읽습니다.)
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model_id: str, tokens: List[str], input_tokens: int):
+        server: StubBedrockServer = self.server
+        events = [{"type": "message_start", "message": {
+            "id": "msg_stub", "type": "message", "role": "assistant", "model": model_id, "content": [],
+            "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": 1}}},
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}]
+        events += [{"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}}
+                   for token in tokens]
+        events += [{"type": "content_block_stop", "index": 0},
+                   {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": len(tokens)}},
+                   {"type": "message_stop", "amazon-bedrock-invocationMetrics": {
+                       "inputTokenCount": input_tokens, "outputTokenCount": len(tokens),
+                       "invocationLatency": 0, "firstByteLatency": 0}}]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            if event["type"] == "content_block_delta" and server.token_latency:
+                time.sleep(server.token_latency)
+            payload = json.dumps({"bytes": base64.b64encode(json.dumps(event).encode("utf-8")).decode("ascii")})
+            message = encode_event(payload.encode("utf-8"))
+            self.wfile.write(f"{len(message):x}\r\n".encode("ascii") + message + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+# bedrock_service 가 스텁 서버를 바라보도록 설정합니다.
+# - boto3 가 서명할 수 있도록 가짜 자격 증명을 환경 변수에 넣습니다.
+def use_stub_bedrock(server: StubBedrockServer) -> None:
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "stub")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "stub")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+    bedrock_svc.bedrock_region_name = "us-west-2"
+    bedrock_svc.bedrock_endpoint_url = server.endpoint_url
+    bedrock_svc.reset_bedrock_clients()
@@ -0,0 +1,250 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# 채팅 한 턴의 단계별 실행 시간을 기록하는 트레이싱 설정입니다.
+# - 턴마다 Trace 하나를 만들고, 인덱스 확인, 질문 임베딩, 검색, SQL 실행 같은 단계를 span 으로 기록합니다.
+# - LLM 호출은 콜백으로 첫 토큰까지의 시간(ttft)과 Bedrock 이 돌려준 토큰 사용량을 함께 기록합니다.
+# - 끝난 Trace 는 최근 tracing_history_size 개를 메모리에 둡니다. 실행 중에 크기를 바꾸면 다음 Trace 부터 적용됩니다.
+# - tracing_export_enabled 이면 tracing_export_path 에 JSON Lines 로도 씁니다.
+#   파일이 tracing_export_max_bytes 를 넘으면 이전 파일을 `<path>.1` 로 옮기고 새 파일에 이어 씁니다.
+tracing_enabled = True
+tracing_history_size = 200
+tracing_export_enabled = False
+tracing_export_path = os.path.join(".cache", "traces.jsonl")
+tracing_export_max_bytes = 5 * 1024 * 1024
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_history: "deque[Trace]" = deque()
+_history_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+
+class Span:
+    """
+    One timed stage of a turn. `start` and `duration` are in seconds, with
+    `start` relative to the beginning of the trace.
+    """
+
+    def __init__(self, name: str, start: float, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.attributes = attributes or {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "start_ms": round(self.start * 1000, 2),
+                "duration_ms": round(self.duration * 1000, 2), **self.attributes}
+
+
+class Trace:
+    """
+    Spans and token usage recorded for one chat turn.
+    """
+
+    def __init__(self, mode: str, model_id: str) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.mode = mode
+        self.model_id = model_id
+        self.created_at = time.time()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def add_span(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def add_usage(self, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+    # 단계별 시간 합계입니다. 같은 이름의 span 이 여러 번 있으면 더합니다.
+    def stage_seconds(self) -> Dict[str, float]:
+        stages: Dict[str, float] = {}
+        for span in self.spans:
+            stages[span.name] = stages.get(span.name, 0.0) + span.duration
+            if "ttft_ms" in span.attributes:
+                key = f"{span.name}.ttft"
+                stages[key] = stages.get(key, 0.0) + span.attributes["ttft_ms"] / 1000
+        stages["total"] = self.duration
+        return stages
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"trace_id": self.trace_id, "ts": self.created_at, "mode": self.mode, "model_id": self.model_id,
+                "duration_ms": round(self.duration * 1000, 2), "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens, "error": self.error,
+                "spans": [span.to_dict() for span in sorted(self.spans, key=lambda span: span.start)]}
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Records each LLM call of a trace as a span, with time to first token and
+    the token usage Bedrock reports in `llm_output["usage"]`.
+    """
+
+    run_inline = True
+
+    def __init__(self, trace: Trace, name: str) -> None:
+        self.trace = trace
+        self.name = name
+        self._spans: Dict[Any, Span] = {}
+
+    def _start(self, run_id) -> None:
+        self._spans[run_id] = Span(self.name, self.trace.elapsed())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._start(run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs) -> None:
+        span = self._spans.get(run_id)
+        if span is not None and "ttft_ms" not in span.attributes:
+            span.attributes["ttft_ms"] = round((self.trace.elapsed() - span.start) * 1000, 2)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        span.duration = self.trace.elapsed() - span.start
+        usage = (response.llm_output or {}).get("usage") or {}
+        input_tokens, output_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        span.attributes.update(input_tokens=input_tokens, output_tokens=output_tokens)
+        self.trace.add_usage(input_tokens, output_tokens)
+        self.trace.add_span(span)
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.duration = self.trace.elapsed() - span.start
+            span.attributes["error"] = type(error).__name__
+            self.trace.add_span(span)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+# 한 턴의 Trace 를 시작합니다. 안에서 호출한 span() 과 llm_callbacks() 는 이 Trace 에 기록됩니다.
+# - asyncio task 와 asyncio.to_thread 로 실행한 함수에도 contextvars 로 전달됩니다.
+# - 이미 Trace 가 진행 중이면 새로 만들지 않고 그 Trace 에 이어서 기록합니다. (호출한 쪽이 Trace 를 받아볼 때)
+@contextmanager
+def start_trace(mode: str, model_id: str) -> Iterator[Optional[Trace]]:
+    if not tracing_enabled:
+        yield None
+        return
+    if _current.get() is not None:
+        yield _current.get()
+        return
+    trace = Trace(mode, model_id)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        trace.duration = trace.elapsed()
+        _finish(trace)
+
+
+# 코루틴 함수 호출 한 번을 Trace 하나로 기록하는 데코레이터입니다. 첫 번째 인자는 model_id 여야 합니다.
+def traced(mode: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(model_id: str, *args, **kwargs):
+            with start_trace(mode, model_id):
+                return await fn(model_id, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 현재 Trace 에 단계 하나의 실행 시간을 기록합니다. Trace 가 없으면 아무것도 하지 않습니다.
+# - 돌려주는 dict 에 값을 넣으면 span 속성(행 수, 캐시 적중 여부 등)으로 함께 기록됩니다.
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Dict[str, Any]]:
+    trace = _current.get()
+    if trace is None:
+        yield attributes
+        return
+    current = Span(name, trace.elapsed(), attributes)
+    try:
+        yield current.attributes
+    finally:
+        current.duration = trace.elapsed() - current.start
+        trace.add_span(current)
+
+
+# LLM 호출의 config["callbacks"] 에 추가할 콜백을 만듭니다. Trace 가 없으면 빈 리스트입니다.
+def llm_callbacks(name: str) -> List[BaseCallbackHandler]:
+    trace = _current.get()
+    return [TracingCallbackHandler(trace, name)] if trace is not None else []
+
+
+def _finish(trace: Trace) -> None:
+    global _history
+    with _history_lock:
+        if _history.maxlen != tracing_history_size:
+            _history = deque(_history, maxlen=tracing_history_size)
+        _history.append(trace)
+    if tracing_export_enabled:
+        export(trace)
+
+
+# Trace 를 JSON Lines 파일에 추가합니다.
+def export(trace: Trace, path: Optional[str] = None) -> None:
+    path = path or tracing_export_path
+    with _export_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if tracing_export_max_bytes and os.path.exists(path) and os.path.getsize(path) >= tracing_export_max_bytes:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+
+
+def recent_traces(mode: Optional[str] = None, limit: Optional[int] = None) -> List[Trace]:
+    with _history_lock:
+        traces = [trace for trace in _history if mode is None or trace.mode == mode]
+    return traces[-limit:] if limit else traces
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+# 단계별 실행 시간의 p50/p95 를 계산합니다. (밀리초)
+def aggregates(traces: Optional[List[Trace]] = None) -> Dict[str, Dict[str, float]]:
+    traces = recent_traces() if traces is None else traces
+    samples: Dict[str, List[float]] = {}
+    for trace in traces:
+        for name, seconds in trace.stage_seconds().items():
+            samples.setdefault(name, []).append(seconds * 1000)
+    return {name: {"count": len(values), "p50_ms": _percentile(values, 0.5), "p95_ms": _percentile(values, 0.95)}
+            for name, values in samples.items()}
+
+
+def clear() -> None:
+    with _history_lock:
+        _history.clear()
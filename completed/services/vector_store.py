@@ -0,0 +1,113 @@
+import asyncio
+import importlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+import services.hybrid_retrieval as hybrid_retrieval
+
+# 사용할 vector store backend 를 설정합니다.
+# - "opensearch": 원격 OpenSearch 도메인 (기본값)
+# - "local": 프로세스 안에서 동작하는 NumPy 기반 vector store (개발/오프라인 실행용)
+vector_store_backend = "opensearch"
+
+_BACKENDS = {
+    "opensearch": "services.opensearch_service:OpenSearchVectorStore",
+    "local": "services.local_vector_store:LocalVectorStore",
+}
+
+_lock = threading.Lock()
+_stores: Dict[str, "VectorStore"] = {}
+
+
+class VectorStore(ABC):
+    """
+    Storage backend for chunk embeddings used by RAG ingestion and retrieval.
+
+    Chunks are addressed by their content-addressed chunk id, so `add` with an
+    existing id overwrites it.
+    """
+
+    @abstractmethod
+    def index_exists(self) -> bool:
+        ...
+
+    @abstractmethod
+    def create_index(self) -> None:
+        ...
+
+    @abstractmethod
+    def delete_index(self) -> None:
+        ...
+
+    @abstractmethod
+    def get_ids_by_source(self, source: str) -> set:
+        ...
+
+    @abstractmethod
+    def add(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> int:
+        ...
+
+    @abstractmethod
+    def similarity_search_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        ...
+
+    @abstractmethod
+    def similarity_search_with_score_by_vector(self, vector: List[float], k: int) -> List[Tuple[Document, float]]:
+        ...
+
+    @abstractmethod
+    def keyword_search_with_score(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        ...
+
+    # BM25 검색과 벡터 검색 결과를 합칩니다. 한 번의 요청으로 둘 다 검색할 수 있는 backend 는 이 메서드를 재정의합니다.
+    def hybrid_search(self, query: str, vector: List[float], k: int) -> List[Document]:
+        depth = hybrid_retrieval.candidate_k(k)
+        return hybrid_retrieval.fuse(self.keyword_search_with_score(query, depth),
+                                     self.similarity_search_with_score_by_vector(vector, depth), k)
+
+    # 비동기 버전입니다. 비동기 Client 가 없는 backend 는 스레드에서 동기 메서드를 실행합니다.
+    async def aindex_exists(self) -> bool:
+        return await asyncio.to_thread(self.index_exists)
+
+    async def asimilarity_search_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        return await asyncio.to_thread(self.similarity_search_by_vector, vector, k)
+
+    async def ahybrid_search(self, query: str, vector: List[float], k: int) -> List[Document]:
+        return await asyncio.to_thread(self.hybrid_search, query, vector, k)
+
+
+# backend 이름을 클래스 경로("module:Class")에 등록합니다.
+def register_backend(name: str, path: str) -> None:
+    _BACKENDS[name] = path
+
+
+# 설정된 backend 의 vector store 를 가져옵니다. backend 별로 한 번만 생성합니다.
+# - backend 모듈은 처음 사용할 때 import 하므로, 사용하지 않는 backend 의 의존성은 필요하지 않습니다.
+def get_vector_store(backend: Optional[str] = None) -> VectorStore:
+    backend = backend or vector_store_backend
+    store = _stores.get(backend)
+    if store is not None:
+        return store
+
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown vector store backend: {backend}")
+    with _lock:
+        store = _stores.get(backend)
+        if store is None:
+            module_name, class_name = _BACKENDS[backend].split(":")
+            store = getattr(importlib.import_module(module_name), class_name)()
+            _stores[backend] = store
+    return store
+
+
+# 생성된 vector store 들을 비웁니다. 설정을 바꾼 뒤 다시 만들 때 사용합니다.
+def reset_vector_stores() -> None:
+    with _lock:
+        _stores.clear()
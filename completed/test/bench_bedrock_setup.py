@@ -0,0 +1,69 @@
+"""
+Micro-benchmark: per-turn ChatBedrock setup overhead, before vs. after the cached factory.
+
+Run from the `completed` directory:
+    python -m test.bench_bedrock_setup --turns 200
+"""
+import argparse
+import statistics
+import time
+
+from langchain_aws import ChatBedrock
+from langchain_core.messages import HumanMessage
+
+import services.bedrock_service as bedrock_svc
+from services.stub_bedrock import StubBedrockServer, use_stub_bedrock
+
+model_id = "anthropic.claude-3-haiku-20240307-v1:0"
+model_kwargs = {"temperature": 1.0, "top_p": 1.0, "top_k": 500, "max_tokens": 256}
+
+
+# 기존 방식: 매 턴마다 새 ChatBedrock (= 새 boto3 Session/Client) 을 만듭니다.
+def per_turn_uncached(endpoint_url: str) -> ChatBedrock:
+    return ChatBedrock(
+        model_id=model_id,
+        model_kwargs=model_kwargs,
+        streaming=False,
+        region_name="us-west-2",
+        endpoint_url=endpoint_url,
+    )
+
+
+# 새 방식: 캐시된 factory 에서 ChatBedrock 을 가져옵니다.
+def per_turn_cached(endpoint_url: str) -> ChatBedrock:
+    return bedrock_svc.get_chat_model(model_id=model_id, model_kwargs=model_kwargs, streaming=False)
+
+
+def run(name: str, factory, endpoint_url: str, turns: int) -> None:
+    messages = [HumanMessage(content="안녕?! 만나서 반가워")]
+    setup_times, turn_times = [], []
+    for _ in range(turns):
+        start = time.perf_counter()
+        llm = factory(endpoint_url)
+        setup_done = time.perf_counter()
+        llm.invoke(messages)
+        end = time.perf_counter()
+        setup_times.append((setup_done - start) * 1000)
+        turn_times.append((end - start) * 1000)
+
+    print(f"{name:>10} | setup p50 {statistics.median(setup_times):8.3f} ms"
+          f" | setup mean {statistics.mean(setup_times):8.3f} ms"
+          f" | turn p50 {statistics.median(turn_times):8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=100)
+    args = parser.parse_args()
+
+    server = StubBedrockServer().start()
+    try:
+        use_stub_bedrock(server)
+        run("before", per_turn_uncached, server.endpoint_url, args.turns)
+        run("after", per_turn_cached, server.endpoint_url, args.turns)
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
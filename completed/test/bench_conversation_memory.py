@@ -0,0 +1,80 @@
+"""
+Benchmark: History Chat prompt size over a long conversation, window memory
+vs. token-budgeted summary memory, against a local Bedrock stub.
+
+Run from the `completed` directory:
+    python -m test.bench_conversation_memory --turns 40 --window 10
+"""
+import argparse
+import time
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.callbacks import BaseCallbackHandler
+
+import services.async_runner as async_runner
+import services.chat_service as chat_svc
+import services.chunking_service as chunking_svc
+import services.conversation_memory as conversation_memory
+from services.stub_bedrock import StubBedrockServer, use_stub_bedrock
+
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+ANSWER = ("Amazon Bedrock 은 여러 파운데이션 모델을 API 로 제공하는 완전 관리형 서비스입니다. " * 12).strip()
+
+
+class PromptSizeHandler(BaseCallbackHandler):
+    """
+    Records the estimated token count of every prompt sent to the chat model.
+    """
+
+    def __init__(self) -> None:
+        self.sizes = []
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        self.sizes.append(sum(chunking_svc.estimate_tokens(m.content) for batch in messages for m in batch))
+
+
+def converse(mode: str, turns: int, window: int) -> dict:
+    conversation_memory.memory_mode = mode
+    history = ChatMessageHistory()
+    state = conversation_memory.SummaryState()
+    handler = PromptSizeHandler()
+    latencies = []
+    for turn in range(turns):
+        question = f"{turn + 1}번째 질문입니다. 제 이름은 홍길동이고, 이전에 말한 내용을 기억해서 Bedrock 에 대해 더 알려주세요."
+        start = time.perf_counter()
+        async_runner.run(chat_svc.aget_conversation_chat_response(
+            MODEL_ID, question, window, {"max_tokens": 1024}, handler, history, state))
+        latencies.append(time.perf_counter() - start)
+    result = {"mode": mode, "max_prompt_tokens": max(handler.sizes), "last_prompt_tokens": handler.sizes[-1],
+              "total_prompt_tokens": sum(handler.sizes), "seconds": sum(latencies),
+              "summarized_messages": state.summarized}
+    print(f"{mode:>8} | max prompt ~{result['max_prompt_tokens']:5d} tokens | last ~{result['last_prompt_tokens']:5d} | "
+          f"total ~{result['total_prompt_tokens']:7d} | {result['seconds']:.1f} s | "
+          f"{state.summarized} messages summarized")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=conversation_memory.memory_token_budget)
+    args = parser.parse_args()
+
+    server = StubBedrockServer(answer=ANSWER).start()
+    use_stub_bedrock(server)
+    conversation_memory.memory_token_budget = args.budget
+    try:
+        window = converse("window", args.turns, args.window)
+        summary = converse("summary", args.turns, args.window)
+        # 요약 프롬프트 크기도 예산 + 요약 + 마지막 턴 안에 있어야 합니다.
+        bound = args.budget + conversation_memory.memory_summary_max_tokens * 2 + 1000
+        assert summary["max_prompt_tokens"] <= bound, f"summary prompt grew past {bound} tokens"
+        print(f"prompt tokens sent: {window['total_prompt_tokens'] / summary['total_prompt_tokens']:.1f}x fewer "
+              f"with summary memory")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: index advisor on a SQL Chat workload. Replays a set of typical
+Chinook questions' SQL through the guarded executor (which writes the query
+log), asks the advisor for CREATE INDEX statements, applies them to a copy of
+the database and compares the replayed latency.
+
+Run from the `completed` directory:
+    python -m test.bench_index_advisor --turns 5
+    python -m test.bench_index_advisor --log .cache/sql_query_log.jsonl   # use the real query log
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import services.database_service as db_svc
+import services.index_advisor as index_advisor
+import services.query_log as query_log
+import services.sql_executor as sql_executor
+
+# SQL Chat 에서 자주 나오는 질문들에 대해 생성되는 SQL 입니다.
+WORKLOAD = [
+    "SELECT Name, Composer FROM Track WHERE Composer = 'AC/DC'",
+    "SELECT FirstName, LastName, Email FROM Customer WHERE Country = 'Brazil'",
+    "SELECT COUNT(*) FROM Customer WHERE Country = 'USA' AND State = 'CA'",
+    "SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice GROUP BY BillingCountry ORDER BY Revenue DESC",
+    "SELECT InvoiceId, Total FROM Invoice WHERE InvoiceDate >= '2012-01-01' AND InvoiceDate < '2013-01-01'",
+    "SELECT Name, Milliseconds FROM Track ORDER BY Milliseconds DESC LIMIT 10",
+    "SELECT t.Name, il.Quantity FROM Track t JOIN InvoiceLine il ON il.UnitPrice = t.UnitPrice WHERE t.TrackId < 50",
+    "SELECT Name FROM Track WHERE UnitPrice > 0.99",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=5, help="times each workload query is executed")
+    parser.add_argument("--log", help="existing query log to analyze instead of the built-in workload")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        log_path = args.log
+        if log_path is None:
+            log_path = os.path.join(workdir, "sql_query_log.jsonl")
+            query_log.query_log_path = log_path
+            database = db_svc.get_database()
+            for _ in range(args.turns):
+                for sql in WORKLOAD:
+                    result = sql_executor.execute_query(database, sql)
+                    assert not result.error, result.feedback()
+            print(f"logged {len(query_log.read(log_path))} queries")
+
+        suggestions, report = index_advisor.advise(log_path)
+        print("\nsuggested indexes:")
+        for suggestion in suggestions:
+            print(f"  {suggestion.statement()}  -- {suggestion.reason}, {suggestion.count} queries, "
+                  f"{suggestion.before_ms:.2f} -> {suggestion.after_ms:.2f} ms")
+
+        print("\nreplay (median per query × times logged):")
+        for query in sorted(report["queries"], key=lambda q: q["before_ms"] * q["count"], reverse=True):
+            print(f"  {query['before_ms']:7.3f} -> {query['after_ms']:7.3f} ms × {query['count']} | {query['sql'][:80]}")
+        before, after = report["before_ms"], report["after_ms"]
+        print(f"\nworkload: {before:.2f} ms -> {after:.2f} ms ({before / after:.1f}x)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
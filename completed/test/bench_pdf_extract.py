@@ -0,0 +1,44 @@
+"""
+Benchmark: serial vs. multi-process PDF text extraction on a generated PDF.
+
+Run from the `completed` directory:
+    python -m test.bench_pdf_extract --pages 400 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import services.pdf_service as pdf_svc
+from test.pdf_fixtures import make_page_texts, make_pdf
+
+
+def run(path: str, mode: str, workers: int) -> list:
+    start = time.perf_counter()
+    pages = list(pdf_svc.iter_page_texts(path, mode=mode, workers=workers))
+    elapsed = time.perf_counter() - start
+    print(f"{mode:>8} x{workers:<3} | {len(pages):5d} pages | {elapsed:7.2f}s | {len(pages) / elapsed:8.2f} pages/sec")
+    return pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(make_pdf(make_page_texts(args.pages)))
+        path = tmp.name
+    try:
+        print(f"cpu count: {os.cpu_count()}")
+        expected = run(path, "serial", 1)
+        for workers in sorted(set(args.workers)):
+            if workers > 1:
+                assert run(path, "process", workers) == expected, "page order or text differs from serial"
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: per-turn SQL Chat schema setup, before (new SQLDatabase + table_info
+every question) vs. after (cached database registry).
+
+Run from the `completed` directory:
+    python -m test.bench_schema_reflection --turns 20
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from langchain_community.utilities import SQLDatabase
+
+import services.database_service as db_svc
+
+
+# 기존 방식: 질문마다 엔진을 만들고 모든 테이블을 reflect 합니다.
+def per_turn_uncached(uri: str) -> str:
+    return SQLDatabase.from_uri(uri).table_info
+
+
+def per_turn_cached(uri: str) -> str:
+    return db_svc.get_database(uri).table_info
+
+
+def measure(label: str, fn, uri: str, turns: int) -> float:
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn(uri)
+        samples.append((time.perf_counter() - start) * 1000)
+    median = statistics.median(samples)
+    print(f"{label:>10} | first {samples[0]:8.2f} ms | median {median:8.2f} ms | max {max(samples):8.2f} ms")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    # 스키마 변경 감지를 확인할 수 있도록 DB 복사본을 사용합니다.
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "Chinook.db")
+    shutil.copy("db/Chinook.db", path)
+    uri = f"sqlite:///{path}"
+    try:
+        before = measure("uncached", per_turn_uncached, uri, args.turns)
+        after = measure("cached", per_turn_cached, uri, args.turns)
+        print(f"speedup: {before / after:.0f}x")
+
+        # 스키마를 바꾸면 다음 호출에서 다시 reflect 해야 합니다.
+        fingerprint = db_svc.get_database(uri).fingerprint
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE BenchNote (NoteId INTEGER PRIMARY KEY, Body TEXT)")
+        handle = db_svc.get_database(uri)
+        assert "BenchNote" in handle.table_info and handle.fingerprint != fingerprint, "schema change not detected"
+        print(f"schema change detected, re-reflected in {handle.reflect_seconds * 1000:.2f} ms")
+    finally:
+        db_svc.invalidate_database(uri)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: SQL Chat latency for repeated questions with and without the
+question → SQL cache, against a local Bedrock stub.
+
+Run from the `completed` directory:
+    python -m test.bench_sql_cache --latency 0.5 --repeats 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import services.async_runner as async_runner
+import services.chat_service as chat_svc
+import services.database_service as db_svc
+import services.query_log as query_log
+import services.sql_cache as sql_cache
+from services.stub_bedrock import StubBedrockServer, use_stub_bedrock
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+MODEL_KWARGS = {"max_tokens": 512}
+
+# 스텁은 모든 호출에 같은 텍스트를 돌려주므로, SQL 생성 단계에서 실행 가능한 SQL 을 답하게 합니다.
+STUB_SQL = ("SELECT c.FirstName, c.LastName, SUM(i.Total) AS Revenue FROM Customer c "
+            "JOIN Invoice i ON i.CustomerId = c.CustomerId GROUP BY c.CustomerId ORDER BY Revenue DESC LIMIT 10")
+QUESTIONS = [
+    "Top 10 customers by revenue",
+    "top 10 customers  by revenue?",
+    "매출이 가장 높은 고객 10명은 누구인가요?",
+]
+
+
+def ask(question: str) -> float:
+    start = time.perf_counter()
+    async_runner.run(chat_svc.aget_sql_chat_response(MODEL_ID, question, MODEL_KWARGS, BaseCallbackHandler()))
+    return time.perf_counter() - start
+
+
+def measure(label: str, repeats: int) -> float:
+    samples = [ask(question) for _ in range(repeats) for question in QUESTIONS]
+    median = statistics.median(samples)
+    print(f"{label:>10} | first {samples[0] * 1000:7.0f} ms | median {median * 1000:7.0f} ms | "
+          f"max {max(samples) * 1000:7.0f} ms")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per Bedrock call")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    server = StubBedrockServer(latency=args.latency, answer=STUB_SQL).start()
+    use_stub_bedrock(server)
+    workdir = tempfile.mkdtemp()
+    sql_cache._sql_cache = sql_cache.SqlCache(pins_path=os.path.join(workdir, "pinned_queries.json"))
+    query_log.query_log_path = os.path.join(workdir, "sql_query_log.jsonl")
+    try:
+        sql_cache.sql_cache_enabled = False
+        before = measure("uncached", args.repeats)
+        sql_cache.sql_cache_enabled = True
+        after = measure("cached", args.repeats)
+        print(f"speedup: {before / after:.2f}x  {sql_cache.stats()}")
+
+        # 스키마가 바뀌면 fingerprint 가 달라지므로 다시 생성해야 합니다.
+        fingerprint = db_svc.get_database().fingerprint
+        assert sql_cache.lookup(QUESTIONS[0], MODEL_ID, fingerprint) is not None
+        assert sql_cache.lookup(QUESTIONS[0], MODEL_ID, "other-schema") is None
+        print("schema fingerprint change misses the cache")
+
+        # 고정된 SQL 은 모델과 상관없이 사용됩니다.
+        sql_cache.pin("How many customers are there?", "SELECT COUNT(*) FROM Customer")
+        sql_cache.clear()
+        _, sql_query, result = async_runner.run(chat_svc.aget_sql_chat_response(
+            "anthropic.claude-3-sonnet-20240229-v1:0", "how many customers are there", MODEL_KWARGS,
+            BaseCallbackHandler()))
+        assert sql_query == "SELECT COUNT(*) FROM Customer" and result.rows == [(59,)], sql_query
+        print(f"pinned query used: {sql_query} -> {result.rows}")
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark: StreamHandler render calls and bytes pushed to Streamlit while
+streaming a long answer, per-token rendering vs. throttled vs. throttled with
+frozen paragraphs.
+
+The token stream is recorded once from the local Bedrock stub through
+ChatBedrock (or loaded from a JSON file recorded earlier with --record) and
+then replayed with its original inter-token timing.
+
+Run from the `completed` directory:
+    python -m test.bench_stream_render --tokens 4096 --token-latency 0.002
+"""
+import argparse
+import json
+import time
+import uuid
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langchain_core.outputs import Generation, LLMResult
+
+import services.bedrock_service as bedrock_svc
+import services.chat_service as chat_svc
+from services.stub_bedrock import StubBedrockServer, use_stub_bedrock
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+class FakeElement:
+    """
+    Stand-in for a Streamlit element that only counts what would be sent.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.children = []
+
+    def markdown(self, text: str) -> None:
+        self.text = text
+
+    def container(self) -> "FakeElement":
+        self.text = ""
+        self.children = []
+        return self
+
+    def empty(self) -> "FakeElement":
+        child = FakeElement()
+        self.children.append(child)
+        return child
+
+    def rendered(self) -> str:
+        return self.text + "".join(child.rendered() for child in self.children)
+
+
+class RecordingHandler(BaseCallbackHandler):
+    def __init__(self) -> None:
+        self.events = []
+        self.start = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        self.events.append([round(time.perf_counter() - self.start, 6), token])
+
+
+# 표, 목록, 코드 블록이 섞인 긴 마크다운 답변을 만듭니다.
+def make_answer(tokens: int) -> str:
+    sections, count, i = [], 0, 0
+    while count < tokens:
+        i += 1
+        section = (f"## {i}. 섹션 제목\n\n"
+                   f"이 문단은 스트리밍 렌더링을 측정하기 위한 설명입니다. Amazon Bedrock 이 생성한 답변이 토큰 단위로 "
+                   f"도착하면 화면에 점진적으로 표시됩니다. 문단 {i} 의 내용입니다.\n\n"
+                   f"- 첫 번째 항목 {i}\n- 두 번째 항목 {i}\n\n"
+                   f"```python\ndef handler_{i}(event):\n\n    return event['value'] * {i}\n```\n\n"
+                   f"| 열 | 값 |\n| --- | --- |\n| a | {i} |\n\n")
+        sections.append(section)
+        count += len(section.split())
+    return "".join(sections)
+
+
+# 스텁 Bedrock 의 스트리밍 응답을 ChatBedrock 으로 받아서 토큰과 도착 시간을 기록합니다.
+def record(tokens: int, token_latency: float) -> list:
+    server = StubBedrockServer(token_latency=token_latency, answer=make_answer(tokens)).start()
+    use_stub_bedrock(server)
+    try:
+        handler = RecordingHandler()
+        llm = bedrock_svc.get_chat_model(model_id=MODEL_ID, model_kwargs={"max_tokens": 4096}, streaming=True)
+        llm.invoke([HumanMessage(content="long answer")], config={"callbacks": [handler]})
+        return handler.events
+    finally:
+        server.stop()
+
+
+def replay(events: list, label: str, **kwargs) -> dict:
+    root = FakeElement()
+    handler = chat_svc.StreamHandler(root, **kwargs)
+    run_id = uuid.uuid4()
+    start = time.perf_counter()
+    render_seconds = 0.0
+    for offset, token in events:
+        delay = offset - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+        tick = time.perf_counter()
+        handler.on_llm_new_token(token, run_id=run_id)
+        render_seconds += time.perf_counter() - tick
+    text = "".join(token for _, token in events)
+    handler.on_llm_end(LLMResult(generations=[[Generation(text=text)]]), run_id=run_id)
+    assert root.rendered() == text, f"{label}: rendered text differs from the stream"
+    result = {"strategy": label, "render_calls": handler.render_calls, "rendered_bytes": handler.rendered_bytes,
+              "handler_ms": round(render_seconds * 1000, 1)}
+    print(f"{label:>18} | {handler.render_calls:6d} renders | {handler.rendered_bytes / 1024:10.1f} KiB pushed | "
+          f"{result['handler_ms']:8.1f} ms in handler")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=4096)
+    parser.add_argument("--token-latency", type=float, default=0.002)
+    parser.add_argument("--stream", help="JSON file with a recorded [[offset, token], ...] stream to replay")
+    parser.add_argument("--record", help="write the recorded stream to this JSON file")
+    args = parser.parse_args()
+
+    if args.stream:
+        with open(args.stream, encoding="utf-8") as f:
+            events = json.load(f)
+    else:
+        events = record(args.tokens, args.token_latency)
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as f:
+            json.dump(events, f, ensure_ascii=False)
+    text = "".join(token for _, token in events)
+    print(f"{len(events)} tokens, {len(text.encode('utf-8')) / 1024:.1f} KiB, {events[-1][0]:.1f} s stream")
+
+    baseline = replay(events, "per token", interval=0, max_tokens=1, blocks=False)
+    throttled = replay(events, "throttled", blocks=False)
+    blocks = replay(events, "throttled + blocks", blocks=True)
+    for result in (throttled, blocks):
+        print(f"{result['strategy']}: {baseline['rendered_bytes'] / result['rendered_bytes']:.0f}x fewer bytes, "
+              f"{baseline['render_calls'] / result['render_calls']:.0f}x fewer renders")
+
+
+if __name__ == "__main__":
+    main()
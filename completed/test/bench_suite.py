@@ -0,0 +1,264 @@
+"""
+Offline benchmark suite: end-to-end latency of Normal, History, RAG and SQL
+Chat, PDF ingestion pages/sec and memory peaks, without AWS.
+
+Bedrock is served by the local stub (streaming with configurable latency and
+throttling) and OpenSearch is replaced by the in-process local vector store.
+Results are written as JSON so runs on different commits can be compared.
+
+Run from the `completed` directory:
+    python -m test.bench_suite --turns 20 --pages 100
+    python -m test.bench_suite --compare .cache/bench/results-<commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.callbacks import BaseCallbackHandler
+
+import services.async_runner as async_runner
+import services.chat_service as chat_svc
+import services.conversation_memory as conversation_memory
+import services.embedding_cache as embedding_cache
+import services.local_vector_store as local_vector_store
+import services.opensearch_service as os_svc
+import services.query_log as query_log
+import services.retrieval_cache as retrieval_cache
+import services.sql_cache as sql_cache
+import services.tracing as tracing
+import services.vector_store as vector_store
+from test.pdf_fixtures import make_page_texts, make_pdf
+from services.stub_bedrock import StubBedrockServer, use_stub_bedrock
+
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+MODEL_KWARGS = {"max_tokens": 1024, "temperature": 0}
+STUB_ANSWER = ("Amazon Bedrock 은 여러 파운데이션 모델을 API 로 제공하는 완전 관리형 서비스입니다. " * 6).strip()
+STUB_SQL = "SELECT Country, COUNT(*) AS Customers FROM Customer GROUP BY Country ORDER BY Customers DESC"
+
+# 이 비율보다 더 나빠지면 --compare 에서 회귀로 표시합니다.
+DEFAULT_TOLERANCE = 0.2
+
+
+class FirstTokenHandler(BaseCallbackHandler):
+    """
+    Records when the first streamed token of a turn reaches the UI handler.
+    """
+
+    def __init__(self) -> None:
+        self.first_token: Optional[float] = None
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {"p50": round(_percentile(values, 0.5), 2), "p95": round(_percentile(values, 0.95), 2),
+            "mean": round(sum(values) / len(values), 2)}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _peak_rss_mb() -> float:
+    # Linux 는 KiB, macOS 는 byte 단위입니다.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# fn 을 실행하는 동안의 Python 힙 최대 사용량(MiB)을 잽니다.
+# - tracemalloc 은 실행을 느리게 하므로 시간을 재는 실행과 따로 돌립니다.
+def _measure_heap_peak(fn: Callable[[], None]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+    finally:
+        tracemalloc.stop()
+
+
+# 모드별로 한 턴을 실행하는 함수를 만듭니다. 질문은 캐시에 걸리지 않도록 턴마다 바꿉니다.
+def make_turn(mode: str) -> Callable[[int, BaseCallbackHandler], None]:
+    history, state = ChatMessageHistory(), conversation_memory.SummaryState()
+
+    def turn(i: int, handler: BaseCallbackHandler) -> None:
+        question = f"{i}번째 질문입니다. bedrock vector index 의 latency 와 throughput 에 대해 알려주세요."
+        if mode == "normal":
+            coro = chat_svc.aget_chat_response(MODEL_ID, question, MODEL_KWARGS, handler, use_answer_cache=False)
+        elif mode == "history":
+            coro = chat_svc.aget_conversation_chat_response(MODEL_ID, question, 10, MODEL_KWARGS, handler,
+                                                            history, state)
+        elif mode == "rag":
+            coro = chat_svc.aget_rag_chat_response(MODEL_ID, question, MODEL_KWARGS, handler, use_answer_cache=False)
+        else:
+            coro = chat_svc.aget_sql_chat_response(MODEL_ID, f"{i}번째: 나라별 고객 수를 알려주세요.", MODEL_KWARGS,
+                                                   handler)
+        async_runner.run(coro)
+
+    return turn
+
+
+def bench_chat(mode: str, turns: int, memory_turns: int) -> Dict:
+    turn = make_turn(mode)
+    turn(0, BaseCallbackHandler())  # warm-up: 클라이언트, 스키마, 모델 인스턴스 생성
+
+    latencies, ttfts = [], []
+    for i in range(1, turns + 1):
+        handler = FirstTokenHandler()
+        start = time.perf_counter()
+        turn(i, handler)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if handler.first_token is not None:
+            ttfts.append((handler.first_token - start) * 1000)
+
+    heap_peak = _measure_heap_peak(
+        lambda: [turn(turns + 1 + i, BaseCallbackHandler()) for i in range(memory_turns)])
+    result = {"turns": turns, "latency_ms": _summary(latencies), "ttft_ms": _summary(ttfts) if ttfts else None,
+              "heap_peak_mb": heap_peak}
+    ttft = f"ttft p50 {result['ttft_ms']['p50']:7.1f} ms" if ttfts else ""
+    print(f"{mode:>9} | p50 {result['latency_ms']['p50']:7.1f} ms | p95 {result['latency_ms']['p95']:7.1f} ms | "
+          f"{ttft} | heap peak {heap_peak:.1f} MiB")
+    return result
+
+
+# 생성한 PDF 를 create_index_from_pdf_file 로 새 local vector store 에 넣습니다.
+def _ingest(path: str, store_dir: str) -> float:
+    local_vector_store.local_vector_store_dir = store_dir
+    vector_store.reset_vector_stores()
+    os_svc.invalidate_index_state()
+    start = time.perf_counter()
+    os_svc.create_index_from_pdf_file(path)
+    return time.perf_counter() - start
+
+
+def bench_ingestion(pdf_path: str, pages: int, workdir: str) -> Dict:
+    # 반복 실행이 임베딩 캐시에서 응답하지 않도록 캐시를 끕니다.
+    embedding_cache.embedding_cache_enabled = False
+    heap_peak = _measure_heap_peak(lambda: _ingest(pdf_path, os.path.join(workdir, "store_memory")))
+    seconds = _ingest(pdf_path, os.path.join(workdir, "store"))
+    result = {"pages": pages, "seconds": round(seconds, 3), "pages_per_sec": round(pages / seconds, 2),
+              "heap_peak_mb": heap_peak}
+    print(f"{'ingestion':>9} | {pages} pages in {seconds:.2f} s | {result['pages_per_sec']:.1f} pages/sec | "
+          f"heap peak {heap_peak:.1f} MiB (main process)")
+    return result
+
+
+# (지표 경로, 클수록 좋은지) 목록입니다.
+def _metrics(results: Dict) -> Dict[str, tuple]:
+    metrics = {}
+    for mode, result in results["chat"].items():
+        metrics[f"{mode}.latency_p50_ms"] = (result["latency_ms"]["p50"], False)
+        metrics[f"{mode}.latency_p95_ms"] = (result["latency_ms"]["p95"], False)
+        if result["ttft_ms"]:
+            metrics[f"{mode}.ttft_p50_ms"] = (result["ttft_ms"]["p50"], False)
+        metrics[f"{mode}.heap_peak_mb"] = (result["heap_peak_mb"], False)
+    if results.get("ingestion"):
+        metrics["ingestion.pages_per_sec"] = (results["ingestion"]["pages_per_sec"], True)
+        metrics["ingestion.heap_peak_mb"] = (results["ingestion"]["heap_peak_mb"], False)
+    metrics["process.peak_rss_mb"] = (results["process"]["peak_rss_mb"], False)
+    return metrics
+
+
+# 이전 결과 파일과 비교해서 tolerance 보다 나빠진 지표를 돌려줍니다.
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    print(f"\ncompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('created_at')}):")
+    before, after = _metrics(baseline), _metrics(current)
+    regressions = []
+    for name, (value, higher_is_better) in after.items():
+        if name not in before or not before[name][0]:
+            continue
+        change = value / before[name][0] - 1
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"  {name:>28} | {before[name][0]:10.2f} -> {value:10.2f} | {change:+7.1%} {flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20, help="measured turns per chat mode")
+    parser.add_argument("--memory-turns", type=int, default=3, help="turns per mode run under tracemalloc")
+    parser.add_argument("--modes", nargs="+", default=["normal", "history", "rag", "sql"])
+    parser.add_argument("--pages", type=int, default=100, help="pages of the generated PDF to ingest")
+    parser.add_argument("--latency", type=float, default=0.02, help="stub Bedrock latency per request (s)")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="stub delay between streamed tokens (s)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="results file (default: .cache/bench/results-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    server = StubBedrockServer(latency=args.latency, token_latency=args.token_latency,
+                               throttle_rate=args.throttle_rate, answer=STUB_ANSWER, sql_answer=STUB_SQL).start()
+    use_stub_bedrock(server)
+    try:
+        # 1. 결과에 영향을 주는 파일 캐시와 로그는 모두 임시 디렉터리를 쓰게 합니다.
+        vector_store.vector_store_backend = "local"
+        embedding_cache.embedding_cache_dir = os.path.join(workdir, "embeddings")
+        query_log.query_log_path = os.path.join(workdir, "sql_query_log.jsonl")
+        tracing.tracing_export_path = os.path.join(workdir, "traces.jsonl")
+        sql_cache.clear()
+        retrieval_cache.clear()
+
+        # 2. PDF 적재 (RAG Chat 이 검색할 인덱스도 여기서 만들어집니다.)
+        pdf_path = os.path.join(workdir, "bench.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(make_pdf(make_page_texts(args.pages)))
+        ingestion = bench_ingestion(pdf_path, args.pages, workdir)
+
+        # 3. 모드별 end-to-end 지연 시간
+        chat = {mode: bench_chat(mode, args.turns, args.memory_turns) for mode in args.modes}
+
+        commit = _git_commit()
+        results = {
+            "meta": {"commit": commit, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                     "python": platform.python_version(), "platform": platform.platform(),
+                     "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+                     "stub_requests": server.request_count, "stub_throttled": server.throttled_count},
+            "ingestion": ingestion,
+            "chat": chat,
+            "process": {"peak_rss_mb": _peak_rss_mb()},
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(".cache", "bench", f"results-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"process peak RSS {results['process']['peak_rss_mb']:.1f} MiB\nresults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
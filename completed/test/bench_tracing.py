@@ -0,0 +1,130 @@
+"""
+Checks the tracing layer: runs every chat mode against the local Bedrock stub
+and the local vector store, verifies the recorded spans, token counts and the
+JSON Lines export, and prints p50/p95 per stage.
+
+Run from the `completed` directory:
+    python -m test.bench_tracing --turns 5
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
+
+import services.async_runner as async_runner
+import services.chat_service as chat_svc
+import services.conversation_memory as conversation_memory
+import services.embedding_cache as embedding_cache
+import services.local_vector_store as local_vector_store
+import services.opensearch_service as os_svc
+import services.query_log as query_log
+import services.tracing as tracing
+import services.vector_store as vector_store
+from services.stub_bedrock import StubBedrockServer, use_stub_bedrock
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+MODEL_KWARGS = {"max_tokens": 512}
+
+# 모드별로 Trace 에 있어야 하는 span 입니다.
+EXPECTED_SPANS = {
+    "normal": {"generation"},
+    "history": {"generation"},
+    "rag": {"index_exists", "query_embedding", "retrieval", "search", "generation"},
+    "sql": {"schema_load", "sql_cache", "sql_execution", "generation"},
+}
+
+
+def run_turns(turns: int) -> None:
+    handler = BaseCallbackHandler()
+    history, state = ChatMessageHistory(), conversation_memory.SummaryState()
+    for turn in range(turns):
+        question = f"{turn + 1}번째 질문: Amazon Bedrock 의 특징을 알려주세요."
+        async_runner.run(chat_svc.aget_chat_response(MODEL_ID, question, MODEL_KWARGS, handler,
+                                                     use_answer_cache=False))
+        async_runner.run(chat_svc.aget_conversation_chat_response(MODEL_ID, question, 10, MODEL_KWARGS, handler,
+                                                                  history, state))
+        async_runner.run(chat_svc.aget_rag_chat_response(MODEL_ID, question, MODEL_KWARGS, handler,
+                                                         use_answer_cache=False))
+        async_runner.run(chat_svc.aget_sql_chat_response(MODEL_ID, f"{turn + 1}번째: 고객 수를 알려주세요.",
+                                                         MODEL_KWARGS, handler))
+
+
+def check(traces: list, export_path: str) -> None:
+    for trace in traces:
+        names = {span.name for span in trace.spans}
+        missing = EXPECTED_SPANS[trace.mode] - names
+        assert not missing, f"{trace.mode}: missing spans {missing}"
+        assert trace.error is None, f"{trace.mode}: {trace.error}"
+        assert trace.input_tokens > 0 and trace.output_tokens > 0, f"{trace.mode}: no token usage recorded"
+        generation = [span for span in trace.spans if span.name == "generation"]
+        assert all("ttft_ms" in span.attributes for span in generation), f"{trace.mode}: no ttft on generation"
+        assert all(span.duration <= trace.duration for span in trace.spans)
+    with open(export_path, encoding="utf-8") as f:
+        exported = [json.loads(line) for line in f]
+    assert [record["trace_id"] for record in exported] == [trace.trace_id for trace in traces], "export mismatch"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--token-latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    server = StubBedrockServer(token_latency=args.token_latency).start()
+    use_stub_bedrock(server)
+    try:
+        # 1. 임시 디렉터리의 local vector store 에 문서를 몇 개 넣습니다.
+        vector_store.vector_store_backend = "local"
+        local_vector_store.local_vector_store_dir = os.path.join(workdir, "vector_store")
+        embedding_cache.embedding_cache_dir = os.path.join(workdir, "embeddings")
+        tracing.tracing_export_path = os.path.join(workdir, "traces.jsonl")
+        query_log.query_log_path = os.path.join(workdir, "sql_query_log.jsonl")
+
+        # 인덱스가 없으면 질문 임베딩과 검색 없이 바로 리젝 응답이 나갑니다.
+        tracing.clear()
+        answer, _ = async_runner.run(chat_svc.aget_rag_chat_response(MODEL_ID, "질문", MODEL_KWARGS,
+                                                                     BaseCallbackHandler(), use_answer_cache=False))
+        names = {span.name for span in tracing.recent_traces()[-1].spans}
+        assert answer == "업로드된 파일이 없습니다." and names == {"index_exists"}, names
+        print("rag without an index skipped embedding and retrieval")
+        tracing.tracing_export_enabled = True
+
+        os_svc.create_index_from_documents([
+            Document(page_content=f"Amazon Bedrock 문서 {i}: 파운데이션 모델을 API 로 제공합니다.",
+                     metadata={"source": "bench.pdf", "page": i}) for i in range(20)])
+
+        # 2. 모든 모드를 turns 번씩 실행하고 기록된 Trace 를 확인합니다.
+        tracing.clear()
+        run_turns(args.turns)
+        traces = tracing.recent_traces()
+        assert len(traces) == args.turns * len(EXPECTED_SPANS), f"{len(traces)} traces recorded"
+        check(traces, tracing.tracing_export_path)
+
+        for mode in EXPECTED_SPANS:
+            mode_traces = tracing.recent_traces(mode)
+            last = mode_traces[-1]
+            print(f"\n{mode}: last turn {last.duration * 1000:.1f} ms, "
+                  f"{last.input_tokens} in / {last.output_tokens} out tokens")
+            for name, stats in tracing.aggregates(mode_traces).items():
+                print(f"  {name:>20} | n={stats['count']:3d} | p50 {stats['p50_ms']:8.1f} ms | "
+                      f"p95 {stats['p95_ms']:8.1f} ms")
+        print(f"\nall {len(traces)} traces OK, exported to {tracing.tracing_export_path}")
+
+        # 3. 실행 중에 바꾼 tracing_history_size 는 다음 Trace 부터 적용됩니다.
+        tracing.tracing_history_size = 3
+        run_turns(1)
+        assert len(tracing.recent_traces()) == 3, f"{len(tracing.recent_traces())} traces kept"
+        print("history resized to 3 traces")
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
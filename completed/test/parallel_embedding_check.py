@@ -0,0 +1,63 @@
+"""
+Checks the parallel embedding stage against the local Bedrock stub with
+injected latency and throttling, and reports pages/sec against a serial run.
+
+Run from the `completed` directory:
+    python -m test.parallel_embedding_check --pages 300 --latency 0.05 --throttle-rate 0.2
+"""
+import argparse
+import time
+
+import services.bedrock_service as bedrock_svc
+import services.embedding_cache as embedding_cache
+import services.embedding_service as embedding_svc
+from services.stub_bedrock import StubBedrockServer, fake_embedding, use_stub_bedrock
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--throttle-rate", type=float, default=0.2)
+    args = parser.parse_args()
+
+    texts = [f"page {i} 문서 내용 chunk number {i} about topic {i % 17}" for i in range(args.pages)]
+    expected = [fake_embedding(text) for text in texts]
+
+    server = StubBedrockServer(latency=args.latency, throttle_rate=args.throttle_rate).start()
+    try:
+        # botocore 의 자체 재시도를 끄고 embedding_service 의 backoff 만으로 Throttling 을 처리하게 합니다.
+        bedrock_svc.bedrock_max_attempts = 1
+        bedrock_svc.bedrock_retry_mode = "standard"
+        # 두 번째 실행이 캐시에서 응답하지 않도록 임베딩 캐시를 끕니다.
+        embedding_cache.embedding_cache_enabled = False
+        use_stub_bedrock(server)
+        embedding_svc.embedding_base_delay = 0.01
+
+        # 1. 순차 실행 (worker 1개)
+        start = time.perf_counter()
+        serial = embedding_svc.embed_texts(texts, max_workers=1)
+        serial_elapsed = time.perf_counter() - start
+
+        # 2. 병렬 실행
+        throttled_before = server.throttled_count
+        start = time.perf_counter()
+        parallel = embedding_svc.embed_texts(texts, max_workers=args.workers)
+        parallel_elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    assert serial == expected, "serial embeddings do not match the stub"
+    assert parallel == expected, "parallel embeddings are out of order or wrong"
+    if args.throttle_rate > 0:
+        assert server.throttled_count > throttled_before, "stub did not throttle any request"
+
+    print(f"serial   : {args.pages / serial_elapsed:8.2f} pages/sec ({serial_elapsed:.2f}s)")
+    print(f"parallel : {args.pages / parallel_elapsed:8.2f} pages/sec ({parallel_elapsed:.2f}s, "
+          f"{args.workers} workers)")
+    print(f"throttled: {server.throttled_count} of {server.request_count} requests, results in order: OK")
+
+
+if __name__ == "__main__":
+    main()
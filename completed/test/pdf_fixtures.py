@@ -0,0 +1,49 @@
+"""
+Generates simple text-only PDFs for ingestion tests and benchmarks, without
+any PDF-writing dependency.
+"""
+import random
+from typing import List, Optional
+
+_WORDS = ("bedrock opensearch vector index embedding chunk query retrieval latency throughput "
+          "document page model token stream cache cluster shard replica search answer context "
+          "database schema table column invoice customer track album artist genre playlist").split()
+
+
+# 페이지마다 줄 단위 텍스트를 가진 PDF 바이트를 만듭니다.
+def make_pdf(pages: List[str]) -> bytes:
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode("ascii"))
+    font_id = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode("ascii"))
+        lines = "".join(f"({_escape(line)}) Tj 0 -12 Td " for line in text.split("\n"))
+        stream = f"BT /F1 10 Tf 40 760 Td {lines}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+# 무작위 단어로 채운 페이지 텍스트를 만듭니다.
+def make_page_texts(page_count: int, lines_per_page: int = 60, words_per_line: int = 12,
+                    seed: Optional[int] = 0) -> List[str]:
+    rng = random.Random(seed)
+    return ["\n".join(f"{page}.{line} " + " ".join(rng.choice(_WORDS) for _ in range(words_per_line))
+                      for line in range(lines_per_page))
+            for page in range(1, page_count + 1)]
@@ -0,0 +1,79 @@
+"""
+Offline check: schema pruning keeps every table a Chinook question needs,
+while sending far fewer schema tokens than the full table_info.
+
+Run from the `completed` directory:
+    python -m test.schema_pruning_check
+"""
+import argparse
+
+import services.chunking_service as chunking_svc
+import services.database_service as db_svc
+import services.schema_pruning as schema_pruning
+
+# (질문, 정답 SQL 에 필요한 테이블)
+QUESTIONS = [
+    ("10명의 고객 이름을 보여주세요.", {"Customer"}),
+    ("Show me the names of 10 customers.", {"Customer"}),
+    ("How many customers are from Brazil?", {"Customer"}),
+    ("국가별 고객 수를 알려주세요.", {"Customer"}),
+    ("List all employees and their managers.", {"Employee"}),
+    ("직원들의 입사일을 보여주세요.", {"Employee"}),
+    ("Which sales agent has the most customers?", {"Employee", "Customer"}),
+    ("각 영업 담당자가 관리하는 고객 수는?", {"Employee", "Customer"}),
+    ("Top 10 customers by revenue", {"Customer", "Invoice"}),
+    ("매출이 가장 높은 고객 5명은 누구인가요?", {"Customer", "Invoice"}),
+    ("What is the total sales per year?", {"Invoice"}),
+    ("2010년 월별 매출 합계를 보여주세요.", {"Invoice"}),
+    ("Which country has the highest invoice total?", {"Invoice"}),
+    ("How many albums does each artist have?", {"Album", "Artist"}),
+    ("아티스트별 앨범 수를 알려주세요.", {"Album", "Artist"}),
+    ("Which artist has the most tracks?", {"Artist", "Album", "Track"}),
+    ("List all tracks in the Rock genre.", {"Track", "Genre"}),
+    ("장르별 곡 수를 보여주세요.", {"Track", "Genre"}),
+    ("What is the longest track?", {"Track"}),
+    ("가장 긴 노래 5곡은?", {"Track"}),
+    ("Which tracks are in the playlist named Music?", {"Playlist", "PlaylistTrack", "Track"}),
+    ("플레이리스트별 곡 수는?", {"Playlist", "PlaylistTrack"}),
+    ("What are the best selling tracks by quantity sold?", {"Track", "InvoiceLine"}),
+    ("가장 많이 판매된 트랙 10개를 알려주세요.", {"Track", "InvoiceLine"}),
+    ("Which genre generates the most revenue?", {"Genre", "Track", "InvoiceLine"}),
+    ("How many tracks use each media type?", {"Track", "MediaType"}),
+    ("미디어 형식별 트랙 수는?", {"Track", "MediaType"}),
+    ("Which customers bought tracks by AC/DC?", {"Customer", "Invoice", "InvoiceLine", "Track", "Album", "Artist"}),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--method", choices=["lexical", "embedding"], default="lexical")
+    parser.add_argument("--top", type=int, default=schema_pruning.schema_pruning_top_tables)
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    args = parser.parse_args()
+
+    database = db_svc.get_database()
+    index = schema_pruning.get_schema_index(database)
+    full_tokens = chunking_svc.estimate_tokens(database.table_info)
+
+    complete, pruned_tokens, table_counts = 0, [], []
+    for question, expected in QUESTIONS:
+        tables = index.select_tables(question, top=args.top, method=args.method)
+        missing = expected - set(tables)
+        complete += not missing
+        pruned_tokens.append(chunking_svc.estimate_tokens(database.get_table_info(tables)))
+        table_counts.append(len(tables))
+        status = "ok  " if not missing else "MISS"
+        print(f"{status} | {len(tables):2d} tables | {question} -> {', '.join(tables)}"
+              + (f"  (missing {', '.join(sorted(missing))})" if missing else ""))
+
+    recall = complete / len(QUESTIONS)
+    average_tokens = sum(pruned_tokens) / len(pruned_tokens)
+    print(f"\nquestions with all required tables: {complete}/{len(QUESTIONS)} ({recall:.0%})")
+    print(f"average tables: {sum(table_counts) / len(table_counts):.1f} of {len(index.tables)}")
+    print(f"average schema tokens: ~{average_tokens:.0f} of ~{full_tokens} "
+          f"({1 - average_tokens / full_tokens:.0%} fewer)")
+    assert recall >= args.min_recall, f"pruning recall {recall:.0%} is below {args.min_recall:.0%}"
+
+
+if __name__ == "__main__":
+    main()
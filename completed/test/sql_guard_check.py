@@ -0,0 +1,100 @@
+"""
+Offline check: the guarded SQLite executor rejects writes, multi-statement
+input, cartesian joins and over-budget queries with structured errors, and
+injects a LIMIT into unbounded SELECTs. The connection pool recovers from
+failed connects and times out instead of blocking when it is exhausted.
+The query log rotates once it reaches its size limit.
+
+Run from the `completed` directory:
+    python -m test.sql_guard_check
+"""
+import concurrent.futures
+import os
+import sqlite3
+import tempfile
+import time
+
+import services.database_service as db_svc
+import services.query_log as query_log
+import services.sql_executor as sql_executor
+
+# (SQL, 기대하는 error_code)
+CASES = [
+    ("SELECT * FROM Track", None),
+    ("SELECT c.FirstName, SUM(i.Total) FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId "
+     "GROUP BY c.CustomerId ORDER BY 2 DESC LIMIT 10", None),
+    ("SELECT COUNT(*) FROM Genre, MediaType", None),
+    ("SELECT * FROM Track t, InvoiceLine il", "cartesian_join"),
+    ("DELETE FROM Track", "not_select"),
+    ("VALUES (1), (2)", "not_select"),
+    ("SELECT 1; DROP TABLE Track", "not_select"),
+    ("WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r) SELECT COUNT(*) FROM r", "timeout"),
+    ("SELECT * FROM NoSuchTable", "sql_error"),
+]
+
+
+def main() -> None:
+    # 실제 쿼리 로그(.cache/sql_query_log.jsonl)에 남지 않도록 임시 디렉터리에 씁니다.
+    query_log.query_log_path = os.path.join(tempfile.mkdtemp(), "sql_query_log.jsonl")
+    database = db_svc.get_database()
+    for sql, expected in CASES:
+        start = time.perf_counter()
+        result = sql_executor.execute_query(database, sql, timeout=1.0)
+        elapsed = time.perf_counter() - start
+        print(f"{str(result.error_code):>14} | {elapsed * 1000:6.0f} ms | {sql[:60]}")
+        assert result.error_code == expected, result.feedback()
+        assert elapsed < 2.0, f"{sql} took {elapsed:.1f}s"
+
+    result = sql_executor.execute_query(database, "SELECT * FROM Track -- no limit", max_rows=50)
+    assert result.executed_sql == "SELECT * FROM Track LIMIT 51" and result.row_count == 50 and result.truncated
+    print(f"LIMIT injected: {result.executed_sql}")
+
+    sql_executor.sql_large_table_rows = 3000
+    result = sql_executor.execute_query(database, "SELECT * FROM Track WHERE Name LIKE '%love%'")
+    assert result.error_code == "full_scan", result.describe()
+    print(f"retry feedback:\n{result.feedback()}")
+    sql_executor.sql_large_table_rows = 1_000_000
+
+    # 동시에 실행해도 연결은 sql_pool_size 개까지만 만듭니다.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        counts = list(executor.map(lambda _: sql_executor.execute_query(database, "SELECT * FROM Genre").row_count,
+                                   range(64)))
+    pool = sql_executor.get_pool(db_svc.get_sqlite_path(database.uri))
+    assert set(counts) == {25} and pool._created <= sql_executor.sql_pool_size
+    print(f"64 concurrent queries served by {pool._created} read-only connections")
+
+    # 연결을 만들다 실패해도 만든 개수를 되돌리므로, 실패가 pool 크기보다 많아도 기다리지 않고 오류가 납니다.
+    missing = sql_executor.ConnectionPool(os.path.join(tempfile.mkdtemp(), "missing.db"), size=2)
+    for _ in range(missing.size + 2):
+        try:
+            with missing.connection(timeout=0.5):
+                raise AssertionError("connected to a missing database")
+        except sqlite3.OperationalError:
+            pass
+    assert missing._created == 0
+    print(f"{missing.size + 2} failed connects left the pool empty")
+
+    # 모든 연결이 사용 중이면 timeout 만큼만 기다리고 timeout 으로 거절합니다.
+    busy = sql_executor.ConnectionPool(db_svc.get_sqlite_path(database.uri), size=1)
+    with busy.connection():
+        start = time.perf_counter()
+        try:
+            with busy.connection(timeout=0.2):
+                raise AssertionError("got a second connection from a pool of one")
+        except sql_executor.QueryRejected as e:
+            assert e.code == "timeout"
+    print(f"exhausted pool rejected after {(time.perf_counter() - start) * 1000:.0f} ms")
+    busy.close()
+
+    # 쿼리 로그가 크기 제한을 넘으면 이전 로그 하나만 남기고 새 파일에 씁니다.
+    logged = len(query_log.read())
+    query_log.query_log_max_bytes = os.path.getsize(query_log.query_log_path)
+    for _ in range(3):
+        sql_executor.execute_query(database, "SELECT * FROM Genre")
+    assert os.path.getsize(query_log.query_log_path + ".1") >= query_log.query_log_max_bytes
+    assert len(query_log.read()) == logged + 3
+    print(f"query log rotated at {query_log.query_log_max_bytes} bytes, {logged + 3} entries readable")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Sweep: recall@k against exact search and p50/p99 query latency for each
+index_template profile, on synthetic clustered vectors.
+
+Run from the `completed` directory, against the in-process backend:
+    python -m test.sweep_index_profiles --rows 20000 --dim 256 --k 10
+or against an OpenSearch-compatible endpoint (e.g. a local docker container):
+    python -m test.sweep_index_profiles --target opensearch --endpoint http://localhost:9200
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+import services.index_template as index_template
+from services.local_vector_store import LocalVectorStore
+
+
+# 클러스터가 있는 벡터 집합과, 그 주변의 질문 벡터를 만듭니다.
+def make_vectors(rows: int, dim: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, rows // 200), dim)).astype(np.float32)
+    data = centers[rng.integers(len(centers), size=rows)] + 0.5 * rng.normal(size=(rows, dim)).astype(np.float32)
+    picks = rng.integers(rows, size=queries)
+    query = data[picks] + 0.3 * rng.normal(size=(queries, dim)).astype(np.float32)
+    return index_template.normalize(data), index_template.normalize(query)
+
+
+# float32 전체 탐색으로 정답 top-k 를 구합니다.
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    scores = queries @ data.T
+    return [set(np.argpartition(-row, k)[:k].tolist()) for row in scores]
+
+
+def measure(search: Callable[[np.ndarray], List[int]], queries: np.ndarray, truth: List[set], k: int) -> Dict:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        hits += len(expected.intersection(found[:k]))
+    latencies = np.array(latencies) * 1000
+    return {"recall": hits / (k * len(queries)),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99))}
+
+
+def sweep_local(name: str, data: np.ndarray, queries: np.ndarray, truth: List[set], k: int) -> Dict:
+    profile = index_template.get_profile(name)
+    path = tempfile.mkdtemp(prefix=f"sweep-{name}-")
+    try:
+        store = LocalVectorStore(path, data_type=profile["data_type"], ann_min_rows=0, nprobe=profile["nprobe"])
+        for start in range(0, len(data), 5000):
+            rows = range(start, min(start + 5000, len(data)))
+            store.add([str(i) for i in rows], [""] * len(rows), data[rows.start:rows.stop],
+                      [{"row": i} for i in rows])
+        store.similarity_search_by_vector(queries[0], k)  # IVF 를 미리 만듭니다.
+
+        def search(query):
+            return [doc.metadata["row"] for doc in store.similarity_search_by_vector(query, k)]
+
+        result = measure(search, queries, truth, k)
+        result["bytes_per_vector"] = store._matrix.dtype.itemsize * data.shape[1]
+        return result
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def sweep_opensearch(name: str, endpoint: str, data: np.ndarray, queries: np.ndarray, truth: List[set], k: int) -> Dict:
+    from opensearchpy import OpenSearch
+    from opensearchpy.helpers import bulk
+
+    profile = index_template.get_profile(name)
+    profile["replicas"] = 0
+    client = OpenSearch(hosts=[endpoint], timeout=120)
+    index = f"sweep-{name}"
+    field = index_template.vector_field
+    if client.indices.exists(index):
+        client.indices.delete(index=index)
+    client.indices.create(index=index, body=index_template.build_index_body(profile, data.shape[1]))
+    try:
+        bulk(client, ({"_index": index, "_id": str(i), field: index_template.to_index_vector(vector, profile)}
+                      for i, vector in enumerate(data.tolist())), chunk_size=1000)
+        client.indices.refresh(index=index)
+
+        def search(query):
+            body = {"size": k, "_source": False,
+                    "query": {"knn": {field: {"vector": index_template.to_index_vector(query.tolist(), profile),
+                                              "k": k}}}}
+            return [int(hit["_id"]) for hit in client.search(index=index, body=body)["hits"]["hits"]]
+
+        result = measure(search, queries, truth, k)
+        result["bytes_per_vector"] = {"float": 4, "fp16": 2, "byte": 1}[profile["data_type"]] * data.shape[1]
+        return result
+    finally:
+        client.indices.delete(index=index)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["local", "opensearch"], default="local")
+    parser.add_argument("--endpoint", default="http://localhost:9200")
+    parser.add_argument("--profiles", nargs="+", default=list(index_template.index_profiles))
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    data, queries = make_vectors(args.rows, args.dim, args.queries)
+    truth = exact_top_k(data, queries, args.k)
+    print(f"target={args.target} rows={args.rows} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'profile':>10} | {'recall@k':>8} | {'p50 ms':>7} | {'p99 ms':>7} | bytes/vector")
+    for name in args.profiles:
+        if args.target == "local":
+            result = sweep_local(name, data, queries, truth, args.k)
+        else:
+            result = sweep_opensearch(name, args.endpoint, data, queries, truth, args.k)
+        print(f"{name:>10} | {result['recall']:8.3f} | {result['p50_ms']:7.2f} | {result['p99_ms']:7.2f} | "
+              f"{result['bytes_per_vector']}")
+
+
+if __name__ == "__main__":
+    main()